@@ -18,9 +18,72 @@ class Settings(BaseSettings):
     # Caminhos Absolutos (Baseados na localização deste arquivo)
     BASE_DIR: Path = Path(__file__).resolve().parent.parent
     MODEL_PATH: Path = BASE_DIR / "app" / "model" / "pipeline.joblib"
+    # Distribuições de referência do treino (gerado por src.train / src.drift)
+    REFERENCE_PROFILE_PATH: Path = BASE_DIR / "app" / "model" / "reference_profile.json"
+    # Limiares calibrados (src.threshold_sweep); ausente = 0.75/0.80/0.85 e decisão do modelo
+    THRESHOLDS_PATH: Path = BASE_DIR / "app" / "model" / "thresholds.json"
+
+    # Armazenamento local (SQLite) dos scores por RA, com reavaliação incremental
+    SCORE_STORE_PATH: Path = BASE_DIR / "data" / "scores.db"
+
+    # Cache LRU das features transformadas por grupo de colunas (entradas por grupo; 0 desativa)
+    FEATURE_CACHE_SIZE: int = 10_000
+
+    # Aquecimento na inicialização: rodadas de inferência com entradas representativas
+    # antes de /health/ready responder 200 (0 rodadas ou WARMUP_ENABLED=false desativa)
+    WARMUP_ENABLED: bool = True
+    WARMUP_ROUNDS: int = 2
+
+    # Tamanho máximo dos endpoints em lote (ex: /predict/explain/batch)
+    MAX_BATCH_SIZE: int = 1000
+    # Máximo de cenários avaliados por chamada ao /predict/whatif
+    WHATIF_MAX_SCENARIOS: int = 5000
+    # Ranking de coortes: máximo de alunos no JSON e tamanho máximo do CSV enviado
+    RANKING_MAX_ROSTER: int = 20000
+    RANKING_MAX_UPLOAD_MB: int = 200
+
+    # Monitoramento de drift em memória (janela deslizante em buckets de tempo)
+    DRIFT_WINDOW_MINUTES: int = 60
+    DRIFT_BUCKET_SECONDS: int = 60
+
+    # Champion/Challenger: artefatos avaliados em modo sombra (shadow)
+    # Ex (env): CHALLENGER_MODEL_PATHS='["app/model/challenger_rf.joblib"]'
+    CHALLENGER_MODEL_PATHS: list[Path] = []
+    # Pontuações sombra pendentes; acima disso são descartadas (challenger lento)
+    SHADOW_MAX_PENDING: int = 1000
+
+    # Feedback de desfechos: predições servidas retidas por RA e métricas em janela deslizante
+    FEEDBACK_STORE_SIZE: int = 100_000
+    FEEDBACK_MAX_AGE_DAYS: int = 365
+    FEEDBACK_WINDOW_DAYS: int = 30
+    FEEDBACK_BUCKET_MINUTES: int = 60
+
+    # Latência por rota (percentis móveis) e amostragem de requisições lentas
+    LATENCY_WINDOW_SIZE: int = 1000
+    SLOW_REQUEST_THRESHOLD_MS: float = 500.0
+    SLOW_REQUEST_BUFFER_SIZE: int = 100
+    # Endpoints /debug/* (entradas amostradas, uso de memória): desligados em
+    # produção; habilite explicitamente em desenvolvimento (DEBUG_ENDPOINTS_ENABLED=true)
+    DEBUG_ENDPOINTS_ENABLED: bool = False
+
+    # Perfil de memória (opt-in: tracemalloc encarece as alocações). Fração das
+    # requisições com pico de alocação medido e quadros guardados por alocação
+    MEMORY_PROFILING_ENABLED: bool = False
+    MEMORY_SAMPLE_RATE: float = 0.1
+    MEMORY_TRACE_FRAMES: int = 1
 
     # Configuração de Observabilidade
     LOG_LEVEL: str = "INFO"
+    # Modo de logging: 'text' ou 'json'; LOG_ASYNC move a escrita para uma thread de fundo
+    LOG_FORMAT: str = "text"
+    LOG_ASYNC: bool = False
+    # Amostragem por ponto de chamada: até BURST registros/s, depois 1 a cada EVERY (0 desativa)
+    LOG_SAMPLE_BURST: int = 0
+    LOG_SAMPLE_EVERY: int = 100
+    # Rotação dos logs em logs/ (segmentos antigos são comprimidos em segundo plano)
+    LOG_MAX_MB: int = 50
+    LOG_ROTATION_HOURS: int = 24
+    LOG_BACKUP_COUNT: int = 30
 
     # Configuração do Pydantic V2
     model_config = SettingsConfigDict(
@@ -34,3 +97,11 @@ class Settings(BaseSettings):
 
 # Singleton: Instância única importada por toda a aplicação
 settings = Settings()
+
+# Política de rotação dos arquivos de log (tamanho/idade e retenção), comum a
+# todos os loggers da API: loggers do mesmo arquivo compartilham o handler
+LOG_ROTATION = {
+    "max_bytes": settings.LOG_MAX_MB * 1024 * 1024,
+    "rotation_seconds": settings.LOG_ROTATION_HOURS * 3600,
+    "backup_count": settings.LOG_BACKUP_COUNT,
+}
@@ -0,0 +1,168 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from src.memory import shared_mapping_sizeof
+from src.risk_bands import BAND_NAMES
+
+# Ordem das células da matriz de confusão (como confusion_matrix().ravel())
+CONFUSION_CELLS = ["tn", "fp", "fn", "tp"]
+
+
+class ServedPredictionStore:
+    """
+    Predições servidas recentemente, indexadas por RA (memória limitada).
+
+    - Inserção, consulta e remoção em O(1) (dict ordenado por inserção).
+    - Acima de 'max_size' entradas, as mais antigas são descartadas.
+    - Entradas mais velhas que 'max_age_seconds' não são associadas ao feedback.
+    - Uma nova predição do mesmo RA substitui a anterior.
+    """
+
+    def __init__(
+        self, max_size: int = 100_000, max_age_seconds: float = None, clock=time.time
+    ):
+        self.max_size = max_size
+        self.max_age_seconds = max_age_seconds
+        self.clock = clock
+        self._entries = OrderedDict()
+        self.evicted = 0
+        self._lock = threading.Lock()
+
+    def add(self, ra: str, proba: float, risco: bool, faixa: int):
+        """Registra a predição servida para o RA."""
+        entry = (self.clock(), float(proba), bool(risco), int(faixa))
+        with self._lock:
+            self._entries[ra] = entry
+            self._entries.move_to_end(ra)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evicted += 1
+
+    def pop(self, ra: str):
+        """
+        Remove e retorna a predição do RA (cada predição é associada a um único
+        desfecho). Retorna None se ausente ou expirada.
+        """
+        with self._lock:
+            entry = self._entries.pop(ra, None)
+        if entry is None:
+            return None
+        if (
+            self.max_age_seconds is not None
+            and self.clock() - entry[0] > self.max_age_seconds
+        ):
+            return None
+        served_at, proba, risco, faixa = entry
+        return {
+            "servida_em": served_at,
+            "probabilidade": proba,
+            "risco": risco,
+            "faixa": faixa,
+        }
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def memory_bytes(self) -> int:
+        """Memória ocupada pelas entradas retidas (bytes), sem bloquear /predict."""
+        return shared_mapping_sizeof(self._entries, self._lock)
+
+
+class RollingConfusion:
+    """
+    Matriz de confusão de produção em janela deslizante (buckets de tempo).
+
+    Mesmo desenho do StreamingDriftMonitor: anel circular de buckets, com
+    buckets expirados zerados no momento da escrita. Cada feedback atualiza
+    uma célula da matriz e a contagem da faixa de risco em O(1).
+    """
+
+    def __init__(
+        self,
+        window_seconds: int = 30 * 86400,
+        bucket_seconds: int = 3600,
+        clock=time.time,
+    ):
+        self.bucket_seconds = bucket_seconds
+        self.n_buckets = max(1, math.ceil(window_seconds / bucket_seconds))
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._bucket_ids = np.full(self.n_buckets, -1, dtype=np.int64)
+        self._counts = np.zeros((self.n_buckets, 4), dtype=np.int64)
+        # Por faixa de risco: [desfechos negativos, desfechos positivos]
+        self._band_counts = np.zeros(
+            (self.n_buckets, len(BAND_NAMES), 2), dtype=np.int64
+        )
+        self._total = np.zeros(4, dtype=np.int64)
+
+    def update(self, predicted: bool, observed: bool, faixa: int):
+        """Registra um desfecho observado para uma predição servida."""
+        cell = int(observed) * 2 + int(predicted)
+        epoch = int(self.clock() // self.bucket_seconds)
+        slot = epoch % self.n_buckets
+        with self._lock:
+            if self._bucket_ids[slot] != epoch:
+                self._bucket_ids[slot] = epoch
+                self._counts[slot] = 0
+                self._band_counts[slot] = 0
+            self._counts[slot, cell] += 1
+            self._band_counts[slot, faixa, int(observed)] += 1
+            self._total[cell] += 1
+
+    def snapshot(self, window_seconds: int = None) -> dict:
+        """
+        Matriz de confusão, recall/precisão e taxa observada por faixa na janela.
+
+        Args:
+            window_seconds (int): Tamanho da janela (limitado à janela configurada).
+        """
+        n_window = self.n_buckets
+        if window_seconds is not None:
+            n_window = min(
+                self.n_buckets, max(1, math.ceil(window_seconds / self.bucket_seconds))
+            )
+        current = int(self.clock() // self.bucket_seconds)
+
+        with self._lock:
+            active = (self._bucket_ids > current - n_window) & (self._bucket_ids >= 0)
+            counts = self._counts[active].sum(axis=0)
+            bands = self._band_counts[active].sum(axis=0)
+            total = self._total.copy()
+
+        return {
+            "janela_segundos": n_window * self.bucket_seconds,
+            **confusion_metrics(counts),
+            "por_faixa": {
+                name: {
+                    "n": int(bands[i].sum()),
+                    "taxa_defasagem_observada": (
+                        round(float(bands[i, 1]) / bands[i].sum(), 4)
+                        if bands[i].sum()
+                        else None
+                    ),
+                }
+                for i, name in enumerate(BAND_NAMES)
+            },
+            "desde_inicio": confusion_metrics(total),
+        }
+
+
+def confusion_metrics(counts: np.ndarray) -> dict:
+    """Contagens tn/fp/fn/tp e as métricas derivadas (None sem denominador)."""
+    tn, fp, fn, tp = (int(c) for c in counts)
+    n = tn + fp + fn + tp
+
+    def ratio(num, den):
+        return round(num / den, 4) if den else None
+
+    return {
+        "n": n,
+        "matriz_confusao": dict(zip(CONFUSION_CELLS, (tn, fp, fn, tp))),
+        "recall": ratio(tp, tp + fn),
+        "precisao": ratio(tp, tp + fp),
+        "acuracia": ratio(tn + tp, n),
+    }
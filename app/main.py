@@ -1,44 +1,120 @@
+import math
+import tempfile
+import time
+import uuid
+from typing import Literal, Optional
+import numpy as np
 import pandas as pd
 import joblib
-import logging
 import sklearn
 import warnings
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import RedirectResponse
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from sklearn.pipeline import Pipeline
+from fastapi.responses import JSONResponse, RedirectResponse
 from contextlib import asynccontextmanager
-from app.schemas import AlunoInput, PredicaoOutput
-from app.config import settings
-from src.utils import setup_logger
+from app.schemas import (
+    ALUNO_RULES,
+    AlunoInput,
+    ContribuicaoFeature,
+    ExplicacaoOutput,
+    FeedbackInput,
+    PredicaoOutput,
+    WhatIfInput,
+)
+from app.config import LOG_ROTATION, settings
+from app.shadow import ChallengerRunner, load_challengers
+from app.feedback import CONFUSION_CELLS, RollingConfusion, ServedPredictionStore
+from app.warmup import run_warmup
+from app.observability import (
+    LatencyObserver,
+    MemoryProfiler,
+    TimedRoute,
+    begin_request_timing,
+    end_request_timing,
+    server_timing_header,
+    timed_stage,
+)
+from src.explain import LinearExplainer
+from src.feature_cache import FeatureCache
+from src.memory import object_size_report, process_memory
+from src.preprocessing import iter_dataset_chunks
+from src.ranking import rank_roster
+from src.risk_bands import (
+    BAND_MESSAGES,
+    BAND_NAMES,
+    DEFAULT_THRESHOLDS,
+    assign_bands,
+    load_thresholds,
+)
+from src.score_store import ScoreStore, model_version, score_incremental
+from src.whatif import expand_sweep, run_whatif, sweep_size
+from src.utils import (
+    configure_logging,
+    request_id_var,
+    setup_csv_logger,
+    setup_logger,
+)
+from src.drift import (
+    StreamingDriftMonitor,
+    format_drift_record,
+    load_reference_profile,
+)
 
 # IMPORTANTE: Necessário para o joblib reconstruir o pipeline corretamente
-from src.feature_engineering import PedraMapper, BinaryCleaner  # noqa: F401
+from src.feature_engineering import (  # noqa: F401
+    PedraMapper,
+    BinaryCleaner,
+    IncrementalPreprocessor,
+)
 
 # 1. Configuração de Silenciamento de Warnings (Polimento de Logs)
 warnings.filterwarnings("ignore", category=UserWarning, module="sklearn")
 # Garante output pandas também na inferência
 sklearn.set_config(transform_output="pandas")
+# Modo de logging (texto/JSON, síncrono/assíncrono, amostragem) para todos os loggers
+configure_logging(
+    async_mode=settings.LOG_ASYNC,
+    json_format=settings.LOG_FORMAT == "json",
+    sample_burst=settings.LOG_SAMPLE_BURST,
+    sample_every=settings.LOG_SAMPLE_EVERY,
+)
 # Configuração de Logs da Aplicação
-app_logger = setup_logger("api", "api.log", level=settings.LOG_LEVEL)
+app_logger = setup_logger("api", "api.log", level=settings.LOG_LEVEL, **LOG_ROTATION)
 
 
 # Configuração do Logger de Drift (Isolado)
 def get_drift_logger():
     """Configura logger específico para monitoramento de dados (Drift)."""
-    logger = logging.getLogger("drift_monitor")
-    logger.setLevel(logging.INFO)
-    logger.propagate = False
-    if not logger.handlers:
-        log_dir = settings.BASE_DIR / "logs"
-        log_dir.mkdir(exist_ok=True)
-        file_handler = logging.FileHandler(log_dir / "drift_data.csv")
-        formatter = logging.Formatter("%(asctime)s,%(message)s")
-        file_handler.setFormatter(formatter)
-        logger.addHandler(file_handler)
-    return logger
+    return setup_csv_logger(
+        "drift_monitor", settings.BASE_DIR / "logs" / "drift_data.csv", **LOG_ROTATION
+    )
 
 
 drift_logger = get_drift_logger()
+latency_observer = LatencyObserver(
+    window_size=settings.LATENCY_WINDOW_SIZE,
+    slow_threshold_ms=settings.SLOW_REQUEST_THRESHOLD_MS,
+    buffer_size=settings.SLOW_REQUEST_BUFFER_SIZE,
+)
+# Perfil de memória (None = desativado, ver MEMORY_PROFILING_ENABLED)
+memory_profiler = None
 model = None
+model_version_id = None
+score_store = None
+feature_cache = None
+# Limiares das faixas e de decisão (None = regra do próprio classificador)
+risk_thresholds = dict(DEFAULT_THRESHOLDS)
+decision_threshold = None
+served_predictions = None
+production_metrics = None
+explainer = None
+challenger_runner = None
+reference_profile = None
+drift_monitor = None
+# Readiness: modelo carregado e aquecimento concluído (ver /health/ready)
+ready = False
+warmup_info = None
 
 
 # --- Lifespan ---
@@ -47,18 +123,109 @@ async def lifespan(app: FastAPI):
     """
     Gerencia o ciclo de vida da aplicação.
     Carrega o modelo serializado (.joblib) na inicialização para memória.
+    Se configurados, carrega também os challengers (modo sombra) e o perfil
+    de referência do treino usado no monitoramento de drift.
     """
-    global model
+    global model, model_version_id, feature_cache, explainer, challenger_runner
+    global reference_profile, drift_monitor, risk_thresholds, decision_threshold
+    global served_predictions, production_metrics, ready, warmup_info
+    global memory_profiler
     if settings.MODEL_PATH.exists():
         try:
             model = joblib.load(settings.MODEL_PATH)
+            model_version_id = model_version(settings.MODEL_PATH)
+            if isinstance(model, Pipeline):
+                # set_config é thread-local: fixa a saída pandas no próprio pipeline,
+                # pois os endpoints síncronos rodam no threadpool do FastAPI.
+                model.set_output(transform="pandas")
             app_logger.info(f"Modelo carregado com sucesso de: {settings.MODEL_PATH}")
         except Exception as e:
             app_logger.critical(f"Falha crítica ao carregar modelo: {e}")
             model = None
     else:
         app_logger.warning(f"Modelo não encontrado em {settings.MODEL_PATH}.")
+
+    if isinstance(model, Pipeline) and settings.FEATURE_CACHE_SIZE > 0:
+        try:
+            feature_cache = FeatureCache(model, max_entries=settings.FEATURE_CACHE_SIZE)
+        except Exception as e:
+            app_logger.warning(f"Cache de features indisponível: {e}")
+
+    if isinstance(model, Pipeline):
+        try:
+            explainer = LinearExplainer(model, preprocessor=feature_cache)
+        except Exception as e:
+            app_logger.warning(f"Explicação por feature indisponível: {e}")
+
+    try:
+        risk_thresholds, decision_threshold = load_thresholds(settings.THRESHOLDS_PATH)
+    except (ValueError, KeyError) as e:
+        app_logger.error(f"Limiares calibrados inválidos, usando os padrões: {e}")
+        risk_thresholds, decision_threshold = dict(DEFAULT_THRESHOLDS), None
+
+    served_predictions = ServedPredictionStore(
+        max_size=settings.FEEDBACK_STORE_SIZE,
+        max_age_seconds=settings.FEEDBACK_MAX_AGE_DAYS * 86400,
+    )
+    production_metrics = RollingConfusion(
+        window_seconds=settings.FEEDBACK_WINDOW_DAYS * 86400,
+        bucket_seconds=settings.FEEDBACK_BUCKET_MINUTES * 60,
+    )
+
+    reference_profile = load_reference_profile(settings.REFERENCE_PROFILE_PATH)
+    if reference_profile is not None:
+        drift_monitor = StreamingDriftMonitor(
+            reference_profile,
+            window_seconds=settings.DRIFT_WINDOW_MINUTES * 60,
+            bucket_seconds=settings.DRIFT_BUCKET_SECONDS,
+        )
+
+    if model is not None and settings.CHALLENGER_MODEL_PATHS:
+        try:
+            challengers = load_challengers(settings.CHALLENGER_MODEL_PATHS, model)
+        except Exception as e:
+            app_logger.error(f"Falha ao carregar challengers: {e}")
+            challengers = {}
+        if challengers:
+            challenger_runner = ChallengerRunner(
+                challengers,
+                shadow_logger=setup_csv_logger(
+                    "shadow_monitor",
+                    settings.BASE_DIR / "logs" / "shadow_data.csv",
+                    **LOG_ROTATION,
+                ),
+                max_pending=settings.SHADOW_MAX_PENDING,
+            )
+    if model is not None:
+        ready = warm_up()
+    if settings.MEMORY_PROFILING_ENABLED:
+        # Linha de base após carga e aquecimento: o crescimento posterior
+        # aponta vazamentos no atendimento, não a inicialização
+        memory_profiler = MemoryProfiler(
+            sample_rate=settings.MEMORY_SAMPLE_RATE,
+            window_size=settings.LATENCY_WINDOW_SIZE,
+            n_frames=settings.MEMORY_TRACE_FRAMES,
+        )
+        memory_profiler.start()
+        app_logger.info(
+            f"Perfil de memória ativo (amostragem {settings.MEMORY_SAMPLE_RATE:.0%})."
+        )
     yield
+    if memory_profiler is not None:
+        memory_profiler.stop()
+        memory_profiler = None
+    ready = False
+    warmup_info = None
+    if challenger_runner is not None:
+        challenger_runner.shutdown()
+        challenger_runner = None
+    reference_profile = None
+    drift_monitor = None
+    served_predictions = None
+    production_metrics = None
+    explainer = None
+    feature_cache = None
+    model_version_id = None
     model = None
 
 
@@ -80,6 +247,90 @@ app = FastAPI(
     """,
     lifespan=lifespan,
 )
+# Todas as rotas medem o tempo do handler (ver header Server-Timing)
+app.router.route_class = TimedRoute
+
+
+# --- Middleware ---
+@app.middleware("http")
+async def request_context(request: Request, call_next):
+    """
+    Define o request_id da requisição (header X-Request-ID ou UUID gerado),
+    disponível em todos os logs emitidos durante o atendimento, e registra a
+    latência total da requisição (campo latencia_ms no formato JSON).
+
+    Também devolve o header Server-Timing (total, handler e etapas) e alimenta
+    os percentis por rota e a amostragem de requisições lentas (/debug/latency).
+    Com o perfil de memória ativo, mede o pico de alocação das requisições
+    amostradas (/debug/memory).
+    """
+    request_id = request.headers.get("X-Request-ID") or uuid.uuid4().hex
+    token = request_id_var.set(request_id)
+    timing, timing_token = begin_request_timing()
+    profiler = memory_profiler
+    memory_sample = profiler.begin() if profiler is not None else None
+    start = time.perf_counter()
+    try:
+        response = await call_next(request)
+        if profiler is not None:
+            profiler.end(timing.get("rota", "<nao_mapeada>"), memory_sample)
+            memory_sample = None
+        total_ms = (time.perf_counter() - start) * 1000
+        latencia_ms = round(total_ms, 3)
+        response.headers["X-Request-ID"] = request_id
+        response.headers["Server-Timing"] = server_timing_header(total_ms, timing)
+        latency_observer.record(
+            request.method,
+            # Template da rota (ex: /predict); rotas inexistentes são agrupadas
+            timing.get("rota", "<nao_mapeada>"),
+            response.status_code,
+            total_ms,
+            timing,
+            request_id=request_id,
+        )
+        app_logger.info(
+            f"{request.method} {request.url.path} {response.status_code} "
+            f"em {latencia_ms:.1f}ms",
+            extra={"latencia_ms": latencia_ms, "status_code": response.status_code},
+        )
+        return response
+    finally:
+        if memory_sample is not None:
+            # Requisição com exceção: libera a amostragem sem registrar
+            profiler.end(timing.get("rota", "<nao_mapeada>"), memory_sample)
+        end_request_timing(timing_token)
+        request_id_var.reset(token)
+
+
+def warm_up() -> bool:
+    """
+    Aquece os caminhos de inferência antes de a API ser marcada como pronta.
+
+    Returns:
+        bool: False se o aquecimento falhou (a API segue viva, mas não pronta).
+    """
+    global warmup_info
+    if not settings.WARMUP_ENABLED or settings.WARMUP_ROUNDS <= 0:
+        app_logger.info("Aquecimento desativado.")
+        return True
+    try:
+        warmup_info = run_warmup(
+            model,
+            prepare_batch_dataframe,
+            feature_cache=feature_cache,
+            explainer=explainer,
+            challengers=challenger_runner.challengers if challenger_runner else None,
+            rounds=settings.WARMUP_ROUNDS,
+        )
+    except Exception as e:
+        app_logger.critical(f"Falha no aquecimento do modelo: {e}")
+        return False
+    app_logger.info(
+        f"Aquecimento concluído em {warmup_info['duracao_ms']:.1f}ms "
+        f"({warmup_info['rodadas']} rodadas, {warmup_info['amostras']} amostras): "
+        + ", ".join(f"{k}={v:.1f}ms" for k, v in warmup_info["caminhos_ms"].items())
+    )
+    return True
 
 
 def prepare_input_dataframe(data: AlunoInput) -> pd.DataFrame:
@@ -88,8 +339,12 @@ def prepare_input_dataframe(data: AlunoInput) -> pd.DataFrame:
     Preenche colunas estruturais (RA, Nome) com valores dummy para satisfazer
     a estrutura esperada pelo modelo, sem afetar a predição.
     """
-    input_dict = data.model_dump()
-    df = pd.DataFrame([input_dict])
+    return prepare_batch_dataframe([data])
+
+
+def prepare_batch_dataframe(alunos: list) -> pd.DataFrame:
+    """Versão em lote de prepare_input_dataframe (uma linha por aluno)."""
+    df = pd.DataFrame([aluno.model_dump() for aluno in alunos])
 
     # Injetamos apenas colunas estruturais necessárias
     defaults = {
@@ -105,6 +360,33 @@ def prepare_input_dataframe(data: AlunoInput) -> pd.DataFrame:
     return df
 
 
+def get_score_store() -> ScoreStore:
+    """Score store local, criado sob demanda no caminho configurado."""
+    global score_store
+    if score_store is None or score_store.path != settings.SCORE_STORE_PATH:
+        score_store = ScoreStore(settings.SCORE_STORE_PATH)
+    return score_store
+
+
+def get_risk_message(proba: float) -> str:
+    """Mensagem pedagógica da faixa de risco (limiares configurados)."""
+    return BAND_MESSAGES[BAND_NAMES[int(assign_bands(proba, risk_thresholds))]]
+
+
+def register_served_prediction(ra: Optional[str], proba: float, risco: bool):
+    """Guarda a predição servida para associação com o desfecho (/feedback)."""
+    if served_predictions is not None and ra not in (None, "API_REQ"):
+        band = int(assign_bands(proba, risk_thresholds))
+        served_predictions.add(ra, proba, risco, band)
+
+
+def is_at_risk(proba: float) -> bool:
+    """Decisão de risco: limiar calibrado, se configurado, ou a regra do classificador."""
+    if decision_threshold is not None:
+        return bool(proba >= decision_threshold)
+    return bool(proba > 0.5)
+
+
 @app.get(
     "/model/info",
     tags=["Auditoria"],
@@ -121,6 +403,15 @@ def get_model_info():
         "versao_api": settings.VERSION,
         "tipo_modelo": "Pipeline Scikit-Learn (Logistic Regression)",
         "status": "Ativo",
+        "versao_artefato": model_version_id,
+        "limiares_risco": {**risk_thresholds, "decisao": decision_threshold},
+        "metricas_producao": (
+            production_metrics.snapshot()["desde_inicio"]
+            if production_metrics is not None
+            else None
+        ),
+        "perfil_referencia_drift": reference_profile is not None,
+        "cache_features": feature_cache.stats() if feature_cache is not None else None,
         "features_principais": [
             "Indicadores Psicossociais (IEG, IAA, IPS)",
             "Histórico de Classificação (Pedras)",
@@ -129,6 +420,24 @@ def get_model_info():
     }
 
 
+@app.get(
+    "/model/challengers",
+    tags=["Auditoria"],
+    summary="Comparar Champion x Challengers",
+    description="Retorna a concordância e os deltas de probabilidade entre o modelo em produção e os challengers executados em modo sombra, além das pontuações sombra descartadas por fila cheia.",
+)
+def get_challengers_summary():
+    """Resumo da comparação champion/challenger acumulada desde a inicialização."""
+    if challenger_runner is None:
+        raise HTTPException(status_code=404, detail="Nenhum challenger configurado.")
+
+    return {
+        "champion": settings.MODEL_PATH.name,
+        "challengers": challenger_runner.summary(),
+        "descartados_fila_cheia": challenger_runner.dropped_count(),
+    }
+
+
 @app.post(
     "/predict",
     response_model=PredicaoOutput,
@@ -170,7 +479,8 @@ def get_model_info():
     ---
 
     🧠 Lógica de Decisão (Saída)
-    O modelo retorna uma probabilidade (0 a 1) que é traduzida nas seguintes categorias de intervenção:
+    O modelo retorna uma probabilidade (0 a 1) que é traduzida nas seguintes categorias de intervenção
+    (limiares padrão; calibráveis com `python -m src.threshold_sweep`, via `THRESHOLDS_PATH`):
 
     | Probabilidade | Classificação | Ação Recomendada |
     | :--- | :--- | :--- |
@@ -204,7 +514,7 @@ def predict(aluno: AlunoInput):
     """
     Realiza a predição de risco de defasagem escolar.
 
-    Regras de Negócio para Mensagens:
+    Regras de Negócio para Mensagens (limiares padrão, sobrescritos por THRESHOLDS_PATH):
     - Probabilidade >= 0.85: Risco CRÍTICO (Intervenção imediata).
     - Probabilidade >= 0.80: ALERTA (Alto risco).
     - Probabilidade >= 0.75: ATENÇÃO (Risco moderado).
@@ -219,42 +529,55 @@ def predict(aluno: AlunoInput):
 
     try:
         # 1. Prepara DataFrame
-        df_input = prepare_input_dataframe(aluno)
+        with timed_stage("preparacao"):
+            df_input = prepare_input_dataframe(aluno)
 
         # 2. Predição
-        prediction = model.predict(df_input)[0]
+        with timed_stage("inferencia"):
+            if feature_cache is not None:
+                # Blocos reaproveitados do cache (também compartilhados com os challengers)
+                features = feature_cache.transform(df_input)
+                estimator = model[-1]
+            elif challenger_runner is not None:
+                # Pré-processamento executado uma única vez e compartilhado com os challengers
+                features = model[:-1].transform(df_input)
+                estimator = model[-1]
+            else:
+                features, estimator = df_input, model
 
-        # Tenta pegar probabilidade
-        if hasattr(model, "predict_proba"):
-            try:
-                proba = model.predict_proba(df_input)[0][1]
-            except IndexError:
+            prediction = estimator.predict(features)[0]
+
+            # Tenta pegar probabilidade
+            if hasattr(estimator, "predict_proba"):
+                try:
+                    proba = estimator.predict_proba(features)[0][1]
+                except IndexError:
+                    proba = 1.0 if prediction == 1 else 0.0
+            else:
                 proba = 1.0 if prediction == 1 else 0.0
+
+        if decision_threshold is not None:
+            risco = is_at_risk(proba)
         else:
-            proba = 1.0 if prediction == 1 else 0.0
+            risco = bool(prediction == 1)
 
-        risco = bool(prediction == 1)
+        # Challengers pontuados de forma assíncrona (fora da latência do /predict)
+        if challenger_runner is not None:
+            challenger_runner.submit(features, float(proba), risco)
 
         # Lógica Pedagógica de Resposta
-        if proba >= 0.85:
-            mensagem = "CRÍTICO: Risco muito alto de defasagem. Intervenção pedagógica imediata recomendada."
-        elif proba >= 0.80:
-            mensagem = (
-                "ALERTA: Alto risco de defasagem. Acompanhamento próximo sugerido."
-            )
-        elif proba >= 0.75:
-            mensagem = "ATENÇÃO: Risco moderado. Monitorar indicadores de engajamento."
-        else:
-            mensagem = (
-                "ESTÁVEL: Aluno com bom prognóstico. Manter acompanhamento padrão."
-            )
+        mensagem = get_risk_message(proba)
 
         # 3. Log para Monitoramento de Drift
-        try:
-            log_msg = f"{proba:.4f},{risco},{aluno.genero},{aluno.instituicao_de_ensino},{aluno.pedra_20}"
-            drift_logger.info(log_msg)
-        except Exception as e:
-            app_logger.error(f"Falha não-bloqueante ao registrar log de drift: {e}")
+        with timed_stage("monitoramento"):
+            try:
+                record = aluno.model_dump()
+                drift_logger.info(format_drift_record(record, proba, risco))
+                if drift_monitor is not None:
+                    drift_monitor.update(record, float(proba))
+            except Exception as e:
+                app_logger.error(f"Falha não-bloqueante ao registrar log de drift: {e}")
+            register_served_prediction(aluno.ra, float(proba), risco)
 
         return PredicaoOutput(
             risco_defasagem=risco,
@@ -275,6 +598,458 @@ def predict(aluno: AlunoInput):
         )
 
 
+def explain_students(alunos: list, top_k: int) -> list:
+    """
+    Predição explicada em lote: probabilidade e contribuições na mesma passada vetorizada.
+    O risco segue o limiar de decisão configurado (padrão: probabilidade > 0.5).
+    """
+    if explainer is None:
+        raise HTTPException(
+            status_code=501,
+            detail="Explicação disponível apenas para o modelo linear em produção.",
+        )
+
+    try:
+        with timed_stage("preparacao"):
+            df_input = prepare_batch_dataframe(alunos)
+        with timed_stage("inferencia"):
+            proba, top, contributions = explainer.explain(df_input, top_k=top_k)
+    except ValueError as ve:
+        app_logger.error(f"Erro de validação do modelo: {ve}")
+        raise HTTPException(
+            status_code=422,
+            detail=f"Dados de entrada inválidos para o modelo: {str(ve)}",
+        )
+
+    for aluno, p in zip(alunos, proba):
+        register_served_prediction(aluno.ra, float(p), is_at_risk(p))
+
+    features = explainer.features
+    return [
+        ExplicacaoOutput(
+            risco_defasagem=is_at_risk(p),
+            probabilidade_risco=round(float(p), 4),
+            mensagem=get_risk_message(p),
+            principais_fatores=[
+                ContribuicaoFeature(
+                    feature=features[i],
+                    contribuicao=round(float(c), 4),
+                    direcao="aumenta_risco" if c > 0 else "reduz_risco",
+                )
+                for i, c in zip(row_top, row_contrib)
+            ],
+        )
+        for p, row_top, row_contrib in zip(proba, top, contributions)
+    ]
+
+
+@app.post(
+    "/predict/explain",
+    response_model=ExplicacaoOutput,
+    tags=["Predição"],
+    summary="Calcular Risco com Explicação por Feature",
+    description="Mesma predição do /predict, acompanhada das features que mais contribuíram para o risco (coef × valor transformado, agregadas por feature original, ex: `ieg`, `pedra_21`, `instituicao_de_ensino`). Contribuições positivas aumentam o risco; para as features padronizadas, o efeito é em relação ao aluno médio do treino, e para categorias (ex: `instituicao_de_ensino`) é o coeficiente da categoria, em relação a zero.",
+)
+def predict_explain(
+    aluno: AlunoInput,
+    top_k: int = Query(5, ge=1, le=20, description="Número de fatores retornados."),
+):
+    """Predição explicada para um aluno."""
+    if not model:
+        raise HTTPException(
+            status_code=503, detail="Modelo não carregado ou indisponível no servidor."
+        )
+    return explain_students([aluno], top_k)[0]
+
+
+@app.post(
+    "/predict/explain/batch",
+    response_model=list[ExplicacaoOutput],
+    tags=["Predição"],
+    summary="Calcular Risco com Explicação em Lote",
+    description="Versão em lote do /predict/explain: uma única passada vetorizada para todos os alunos (máximo de MAX_BATCH_SIZE por requisição).",
+)
+def predict_explain_batch(
+    alunos: list[AlunoInput],
+    top_k: int = Query(5, ge=1, le=20, description="Número de fatores retornados."),
+):
+    """Predição explicada para um lote de alunos (ordem preservada)."""
+    if not model:
+        raise HTTPException(
+            status_code=503, detail="Modelo não carregado ou indisponível no servidor."
+        )
+    if not alunos:
+        return []
+    if len(alunos) > settings.MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Lote acima do limite de {settings.MAX_BATCH_SIZE} alunos.",
+        )
+    return explain_students(alunos, top_k)
+
+
+@app.post(
+    "/predict/whatif",
+    tags=["Predição"],
+    summary="Análise What-If (Sensibilidade)",
+    description="Avalia como a probabilidade de risco do aluno muda ao variar indicadores (0-10) ou níveis de Pedra. Todos os cenários são pontuados em uma única chamada vetorizada; retorna a superfície de probabilidades e a menor alteração que cruza cada limiar de faixa de risco (atenção/alerta/crítico).",
+)
+def predict_whatif(entrada: WhatIfInput):
+    """Análise de sensibilidade vetorizada para um aluno."""
+    if not model:
+        raise HTTPException(
+            status_code=503, detail="Modelo não carregado ou indisponível no servidor."
+        )
+
+    # Tamanho calculado antes de expandir: a grade só é alocada dentro do limite
+    sizes = [
+        sweep_size(v.feature, v.valores, v.inicio, v.fim, v.passo)
+        for v in entrada.variacoes
+    ]
+    n_scenarios = math.prod(sizes) if entrada.modo == "grade" else sum(sizes)
+    if n_scenarios > settings.WHATIF_MAX_SCENARIOS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"{n_scenarios} cenários excedem o limite de "
+            f"{settings.WHATIF_MAX_SCENARIOS}.",
+        )
+
+    sweeps = {}
+    for variacao in entrada.variacoes:
+        sweeps[variacao.feature] = expand_sweep(
+            variacao.feature,
+            variacao.valores,
+            variacao.inicio,
+            variacao.fim,
+            variacao.passo,
+        )
+
+    try:
+        with timed_stage("preparacao"):
+            base = prepare_input_dataframe(entrada.aluno)
+        with timed_stage("inferencia"):
+            return run_whatif(
+                model, base, sweeps, mode=entrada.modo, thresholds=risk_thresholds
+            )
+    except ValueError as ve:
+        app_logger.error(f"Erro de validação do modelo: {ve}")
+        raise HTTPException(
+            status_code=422,
+            detail=f"Dados de entrada inválidos para o modelo: {str(ve)}",
+        )
+
+
+@app.post(
+    "/ranking",
+    tags=["Predição"],
+    summary="Ranking dos Alunos de Maior Risco",
+    description="Pontua uma lista de alunos em uma única passada e retorna os k de maior probabilidade de risco (seleção parcial, sem ordenar a lista inteira), opcionalmente por `turma` ou `fase`.",
+)
+def rank_students(
+    alunos: list[AlunoInput],
+    k: int = Query(10, ge=1, le=1000, description="Alunos por grupo."),
+    agrupar_por: Optional[Literal["turma", "fase"]] = Query(
+        None, description="Agrupamento opcional do ranking."
+    ),
+):
+    """Top-k de risco para uma lista de alunos no formato da API."""
+    if not model:
+        raise HTTPException(
+            status_code=503, detail="Modelo não carregado ou indisponível no servidor."
+        )
+    if len(alunos) > settings.RANKING_MAX_ROSTER:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Lista acima do limite de {settings.RANKING_MAX_ROSTER} alunos; "
+            "use /ranking/csv para listas maiores.",
+        )
+
+    try:
+        with timed_stage("preparacao"):
+            df_input = prepare_batch_dataframe(alunos) if alunos else pd.DataFrame()
+        with timed_stage("inferencia"):
+            return rank_roster(
+                model,
+                [df_input],
+                k=k,
+                group_by=agrupar_por,
+                thresholds=risk_thresholds,
+            )
+    except ValueError as ve:
+        app_logger.error(f"Erro de validação do modelo: {ve}")
+        raise HTTPException(
+            status_code=422,
+            detail=f"Dados de entrada inválidos para o modelo: {str(ve)}",
+        )
+
+
+@app.post(
+    "/ranking/csv",
+    tags=["Predição"],
+    summary="Ranking de Risco a partir de CSV",
+    description="Recebe o CSV no formato bruto do PEDE (corpo `text/csv`) e retorna o top-k de risco. O arquivo é recebido em streaming para disco e pontuado em blocos, mantendo apenas o top-k corrente em memória. Linhas fora do contrato do AlunoInput (ex: nota fora de 0-10, Pedra desconhecida) são descartadas em uma validação vetorizada por bloco e contadas em `alunos_invalidos`/`erros_por_campo`.",
+)
+async def rank_students_csv(
+    request: Request,
+    k: int = Query(10, ge=1, le=1000, description="Alunos por grupo."),
+    agrupar_por: Optional[Literal["turma", "fase"]] = Query(
+        None, description="Agrupamento opcional do ranking."
+    ),
+    chunksize: int = Query(50_000, ge=100, description="Linhas por bloco."),
+):
+    """Top-k de risco para um CSV arbitrariamente grande."""
+    if not model:
+        raise HTTPException(
+            status_code=503, detail="Modelo não carregado ou indisponível no servidor."
+        )
+
+    max_bytes = settings.RANKING_MAX_UPLOAD_MB * 1024 * 1024
+    # Até 8 MB em memória; acima disso o corpo é despejado em arquivo temporário
+    with tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024) as buffer:
+        received = 0
+        async for part in request.stream():
+            received += len(part)
+            if received > max_bytes:
+                raise HTTPException(
+                    status_code=413,
+                    detail=f"CSV acima de {settings.RANKING_MAX_UPLOAD_MB} MB.",
+                )
+            buffer.write(part)
+        buffer.seek(0)
+
+        try:
+            with timed_stage("inferencia"):
+                return await run_in_threadpool(
+                    rank_roster,
+                    model,
+                    iter_dataset_chunks(buffer, chunksize=chunksize),
+                    k=k,
+                    group_by=agrupar_por,
+                    thresholds=risk_thresholds,
+                    rules=ALUNO_RULES,
+                )
+        except (ValueError, KeyError, pd.errors.ParserError) as e:
+            app_logger.error(f"CSV inválido para ranking: {e}")
+            raise HTTPException(
+                status_code=422, detail=f"CSV inválido para o modelo: {str(e)}"
+            )
+
+
+@app.post(
+    "/scores/batch",
+    tags=["Predição"],
+    summary="Pontuação Incremental por RA",
+    description="Pontua uma lista de alunos (com `ra` preenchido) e grava o resultado no score store local. Apenas alunos novos, com dados alterados ou pontuados por outra versão do modelo passam pelo modelo; os demais reaproveitam o score armazenado.",
+)
+def score_students(
+    alunos: list[AlunoInput],
+    forcar: bool = Query(False, description="Reavalia todos os alunos."),
+):
+    """Pontuação incremental de um lote, registrando os scores por RA."""
+    if not model:
+        raise HTTPException(
+            status_code=503, detail="Modelo não carregado ou indisponível no servidor."
+        )
+    if len(alunos) > settings.MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Lote acima do limite de {settings.MAX_BATCH_SIZE} alunos.",
+        )
+    if any(aluno.ra in (None, "API_REQ") for aluno in alunos):
+        raise HTTPException(
+            status_code=422, detail="Todos os alunos devem ter o RA preenchido."
+        )
+    if not alunos:
+        return {
+            "total": 0,
+            "reavaliados": 0,
+            "reaproveitados": 0,
+            "sem_ra": 0,
+            "invalidos": 0,
+        }
+
+    try:
+        with timed_stage("preparacao"):
+            df_input = prepare_batch_dataframe(alunos)
+        with timed_stage("inferencia"):
+            stats = score_incremental(
+                model,
+                [df_input],
+                get_score_store(),
+                model_version_id,
+                force=forcar,
+            )
+    except ValueError as ve:
+        app_logger.error(f"Erro de validação do modelo: {ve}")
+        raise HTTPException(
+            status_code=422,
+            detail=f"Dados de entrada inválidos para o modelo: {str(ve)}",
+        )
+    return {**stats, "versao_modelo": model_version_id}
+
+
+@app.get(
+    "/scores/{ra}",
+    tags=["Predição"],
+    summary="Consultar Score Armazenado",
+    description="Retorna o último score registrado para o RA, sem acionar o modelo. `desatualizado` indica que o score foi gerado por outra versão do modelo.",
+)
+def get_score(ra: str):
+    """Consulta o score armazenado de um aluno."""
+    stored = get_score_store().get(ra, thresholds=risk_thresholds)
+    if stored is None:
+        raise HTTPException(status_code=404, detail=f"RA {ra} sem score registrado.")
+    stored["desatualizado"] = stored["versao_modelo"] != model_version_id
+    return stored
+
+
+@app.get(
+    "/scores",
+    tags=["Predição"],
+    summary="Listar Scores Armazenados",
+    description="Lista os scores registrados (maior risco primeiro), filtrando por turma e/ou faixa de risco, sem acionar o modelo.",
+)
+def list_scores(
+    turma: Optional[str] = Query(None, description="Filtra pela turma."),
+    faixa: Optional[Literal["estavel", "atencao", "alerta", "critico"]] = Query(
+        None, description="Filtra pela faixa de risco."
+    ),
+    limite: int = Query(100, ge=1, le=10_000, description="Máximo de alunos."),
+):
+    """Scores armazenados por turma/faixa."""
+    return get_score_store().query(
+        turma=turma, faixa=faixa, limit=limite, thresholds=risk_thresholds
+    )
+
+
+@app.post(
+    "/feedback",
+    tags=["Monitoramento"],
+    summary="Registrar Desfecho Observado",
+    description="Recebe o desfecho real (defasagem) de um aluno e o associa à última predição servida para o mesmo RA (memória limitada, indexada por RA). Atualiza em O(1) a matriz de confusão de produção exposta em /metrics.",
+)
+def post_feedback(feedback: FeedbackInput):
+    """Associa o desfecho observado à predição servida e atualiza as métricas."""
+    if served_predictions is None or production_metrics is None:
+        raise HTTPException(status_code=503, detail="Serviço de feedback indisponível.")
+
+    served = served_predictions.pop(feedback.ra)
+    if served is None:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Nenhuma predição recente registrada para o RA {feedback.ra}.",
+        )
+
+    production_metrics.update(served["risco"], feedback.defasagem, served["faixa"])
+    cell = int(feedback.defasagem) * 2 + int(served["risco"])
+    return {
+        "ra": feedback.ra,
+        "probabilidade_risco": round(served["probabilidade"], 4),
+        "risco_previsto": served["risco"],
+        "defasagem_observada": feedback.defasagem,
+        "resultado": CONFUSION_CELLS[cell],
+    }
+
+
+@app.get(
+    "/metrics",
+    tags=["Monitoramento"],
+    summary="Métricas de Produção (Feedback)",
+    description="Matriz de confusão, recall e precisão em produção a partir dos desfechos recebidos em /feedback, na janela deslizante configurada (ou menor), com a taxa de defasagem observada por faixa de risco.",
+)
+def get_production_metrics(
+    janela_horas: int = Query(
+        None, ge=1, description="Janela de análise (padrão: janela configurada)."
+    ),
+):
+    """Métricas de produção acumuladas em memória."""
+    if production_metrics is None:
+        raise HTTPException(status_code=503, detail="Serviço de feedback indisponível.")
+
+    window = janela_horas * 3600 if janela_horas else None
+    return {
+        **production_metrics.snapshot(window_seconds=window),
+        "predicoes_pendentes": len(served_predictions),
+    }
+
+
+@app.get(
+    "/drift",
+    tags=["Monitoramento"],
+    summary="Scores de Data Drift em Tempo Real",
+    description="Compara a distribuição das entradas e da probabilidade de risco na janela recente com o perfil de referência do treino (PSI/KS, quantis e proporções). Calculado a partir de agregados em memória, sem releitura de logs.",
+)
+def get_drift(
+    janela_minutos: int = Query(
+        None, ge=1, description="Janela de análise (padrão: janela configurada)."
+    ),
+):
+    """Retorna os scores de drift por feature na janela deslizante."""
+    if drift_monitor is None:
+        raise HTTPException(
+            status_code=503, detail="Perfil de referência de drift indisponível."
+        )
+
+    window = janela_minutos * 60 if janela_minutos else None
+    return drift_monitor.snapshot(window_seconds=window)
+
+
+@app.get(
+    "/debug/latency",
+    tags=["Monitoramento"],
+    summary="Latência por Rota e Requisições Lentas",
+    description="Percentis móveis (p50/p95/p99) de latência por rota e as amostras mais recentes de requisições acima do limiar configurado, com detalhamento por etapa e entrada anonimizada.",
+)
+def get_latency_debug(
+    limite: int = Query(20, ge=1, description="Máximo de requisições lentas."),
+):
+    """Retorna os percentis de latência e o buffer de requisições lentas."""
+    if not settings.DEBUG_ENDPOINTS_ENABLED:
+        raise HTTPException(status_code=404, detail="Endpoints de debug desativados.")
+
+    return {
+        "limiar_lento_ms": settings.SLOW_REQUEST_THRESHOLD_MS,
+        "percentis_por_rota": latency_observer.percentiles(),
+        "requisicoes_lentas": latency_observer.slow_requests()[:limite],
+    }
+
+
+@app.get(
+    "/debug/memory",
+    tags=["Monitoramento"],
+    summary="Uso de Memória do Worker",
+    description="RSS do processo, tamanho em memória do modelo (por etapa do pipeline) e das estruturas em memória (cache de features, predições servidas). Com MEMORY_PROFILING_ENABLED: maiores pontos de alocação, crescimento desde a inicialização (detecção de vazamentos) e pico de alocação por rota nas requisições amostradas.",
+)
+def get_memory_debug(
+    limite: int = Query(10, ge=1, le=100, description="Máximo de alocadores listados."),
+):
+    """Retorna o uso de memória do worker e, se ativo, o perfil de alocações."""
+    if not settings.DEBUG_ENDPOINTS_ENABLED:
+        raise HTTPException(status_code=404, detail="Endpoints de debug desativados.")
+
+    return {
+        "processo": process_memory(),
+        "modelo": object_size_report(model) if model is not None else None,
+        "estruturas_mb": {
+            "cache_features": (
+                round(feature_cache.memory_bytes() / 2**20, 3)
+                if feature_cache is not None
+                else None
+            ),
+            "predicoes_servidas": (
+                round(served_predictions.memory_bytes() / 2**20, 3)
+                if served_predictions is not None
+                else None
+            ),
+        },
+        "perfil_alocacoes": (
+            memory_profiler.snapshot(limit=limite)
+            if memory_profiler is not None
+            else {"ativo": False}
+        ),
+    }
+
+
 @app.get("/", include_in_schema=False)
 def root():
     return RedirectResponse(url="/docs")
@@ -284,11 +1059,38 @@ def root():
     "/health",
     tags=["Monitoramento"],
     summary="Verificar Status da API",
-    description="Endpoint de Health Check para monitoramento (Liveness/Readiness Probe). Retorna o status da aplicação e se o modelo de ML está carregado em memória.",
+    description="Endpoint de Health Check para monitoramento. Retorna o status da aplicação, se o modelo de ML está carregado em memória e se a API está pronta (aquecimento concluído). Para probes separadas: /health/live e /health/ready.",
 )
 def health_check():
     return {
         "project": settings.PROJECT_NAME,
         "status": "online",
         "model_loaded": model is not None,
+        "ready": ready,
+    }
+
+
+@app.get(
+    "/health/live",
+    tags=["Monitoramento"],
+    summary="Liveness Probe",
+    description="Indica apenas que o processo está respondendo. Não depende do modelo: uma falha aqui justifica reiniciar o container.",
+)
+def liveness():
+    return {"status": "online"}
+
+
+@app.get(
+    "/health/ready",
+    tags=["Monitoramento"],
+    summary="Readiness Probe",
+    description="Retorna 200 somente com o modelo carregado e o aquecimento concluído (caso contrário 503): o pod só recebe tráfego depois que a primeira requisição deixa de pagar a inicialização do pipeline.",
+    responses={503: {"description": "Modelo indisponível ou aquecimento com falha."}},
+)
+def readiness():
+    body = {
+        "status": "pronto" if ready else "indisponivel",
+        "model_loaded": model is not None,
+        "aquecimento": warmup_info,
     }
+    return JSONResponse(status_code=200 if ready else 503, content=body)
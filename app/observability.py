@@ -0,0 +1,306 @@
+import contextvars
+import json
+import random
+import threading
+import time
+import tracemalloc
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+import numpy as np
+from fastapi.routing import APIRoute
+
+from src.memory import top_allocations
+
+# Campos que identificam o aluno: nunca armazenados nas amostras de requisições lentas
+IDENTIFYING_FIELDS = {"nome", "ra", "ano_nasc", "turma"}
+ANONYMIZED_VALUE = "***"
+
+# Medições da requisição corrente (dict mutável compartilhado entre middleware,
+# rota e etapas do handler, inclusive no threadpool dos endpoints síncronos)
+_timing_var = contextvars.ContextVar("request_timing", default=None)
+
+
+def begin_request_timing():
+    """Inicia as medições da requisição corrente. Retorna (timing, token)."""
+    timing = {"etapas": {}}
+    return timing, _timing_var.set(timing)
+
+
+def end_request_timing(token):
+    _timing_var.reset(token)
+
+
+@contextmanager
+def timed_stage(name: str):
+    """Mede uma etapa do handler (ex: inferência) e a registra na requisição corrente."""
+    timing = _timing_var.get()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        if timing is not None:
+            timing["etapas"][name] = (time.perf_counter() - start) * 1000
+
+
+class TimedRoute(APIRoute):
+    """
+    Rota que mede o tempo do handler (validação + endpoint + serialização)
+    e registra o template da rota e o corpo da requisição para o middleware.
+    """
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+        path = self.path
+        # Só rotas com corpo declarado: o FastAPI já leu (e guardou em cache) o corpo.
+        # Rotas que consomem o stream diretamente (ex: upload de CSV) ficam de fora.
+        captures_body = self.body_field is not None
+
+        async def timed_handler(request):
+            timing = _timing_var.get()
+            start = time.perf_counter()
+            try:
+                return await handler(request)
+            finally:
+                if timing is not None:
+                    timing["handler_ms"] = (time.perf_counter() - start) * 1000
+                    timing["rota"] = path
+                    if captures_body:
+                        timing["corpo"] = await request.body()
+
+        return timed_handler
+
+
+def server_timing_header(total_ms: float, timing: dict) -> str:
+    """Monta o header Server-Timing (total, handler e etapas)."""
+    parts = [f"total;dur={total_ms:.2f}"]
+    if "handler_ms" in timing:
+        parts.append(f"handler;dur={timing['handler_ms']:.2f}")
+    parts.extend(f"{name};dur={ms:.2f}" for name, ms in timing["etapas"].items())
+    return ", ".join(parts)
+
+
+def anonymize_payload(body: bytes):
+    """
+    Anonimiza o corpo JSON de uma requisição para armazenamento em debug.
+    Identificadores são mascarados em qualquer nível (ex: 'aluno' do
+    /predict/whatif, listas dos endpoints em lote) e valores numéricos
+    arredondados a 1 casa.
+    """
+    try:
+        payload = json.loads(body)
+    except (TypeError, ValueError):
+        return None
+    return _anonymize(payload)
+
+
+def _anonymize(value):
+    if isinstance(value, dict):
+        return {
+            key: ANONYMIZED_VALUE if key in IDENTIFYING_FIELDS else _anonymize(item)
+            for key, item in value.items()
+        }
+    if isinstance(value, list):
+        return [_anonymize(item) for item in value]
+    if isinstance(value, float):
+        return round(value, 1)
+    return value
+
+
+class LatencyObserver:
+    """
+    Agrega latências por rota e amostra requisições lentas.
+
+    - Percentis móveis (p50/p95/p99) sobre as últimas 'window_size' requisições de cada rota.
+    - Requisições acima de 'slow_threshold_ms' têm o detalhamento por etapa e a
+      entrada anonimizada guardados em um buffer circular de 'buffer_size' posições.
+    """
+
+    def __init__(
+        self,
+        window_size: int = 1000,
+        slow_threshold_ms: float = 500.0,
+        buffer_size: int = 100,
+    ):
+        self.window_size = window_size
+        self.slow_threshold_ms = slow_threshold_ms
+        self._latencies = {}
+        self._counts = {}
+        self._slow = deque(maxlen=buffer_size)
+        self._lock = threading.Lock()
+
+    def record(
+        self,
+        method: str,
+        route: str,
+        status_code: int,
+        total_ms: float,
+        timing: dict,
+        request_id: str = None,
+    ):
+        """Registra a latência de uma requisição concluída."""
+        key = f"{method} {route}"
+        slow = total_ms >= self.slow_threshold_ms
+        sample = None
+        if slow:
+            sample = {
+                "timestamp": datetime.now(timezone.utc).isoformat(),
+                "request_id": request_id,
+                "rota": key,
+                "status_code": status_code,
+                "total_ms": round(total_ms, 3),
+                "handler_ms": round(timing.get("handler_ms", 0.0), 3),
+                "etapas_ms": {k: round(v, 3) for k, v in timing["etapas"].items()},
+                "entrada": (
+                    anonymize_payload(timing["corpo"]) if "corpo" in timing else None
+                ),
+            }
+
+        with self._lock:
+            window = self._latencies.get(key)
+            if window is None:
+                window = self._latencies[key] = deque(maxlen=self.window_size)
+                self._counts[key] = 0
+            window.append(total_ms)
+            self._counts[key] += 1
+            if sample is not None:
+                self._slow.append(sample)
+
+    def percentiles(self) -> dict:
+        """Percentis de latência (ms) por rota na janela móvel."""
+        with self._lock:
+            windows = {key: list(values) for key, values in self._latencies.items()}
+            counts = dict(self._counts)
+
+        summary = {}
+        for key, values in sorted(windows.items()):
+            p50, p95, p99 = np.percentile(values, [50, 95, 99])
+            summary[key] = {
+                "requisicoes": counts[key],
+                "janela": len(values),
+                "p50_ms": round(float(p50), 3),
+                "p95_ms": round(float(p95), 3),
+                "p99_ms": round(float(p99), 3),
+                "max_ms": round(float(max(values)), 3),
+            }
+        return summary
+
+    def slow_requests(self) -> list:
+        """Amostras de requisições lentas (mais recentes primeiro)."""
+        with self._lock:
+            return list(reversed(self._slow))
+
+
+class MemoryProfiler:
+    """
+    Perfil de memória dos workers (opt-in: tracemalloc custa CPU a cada alocação).
+
+    - Pico de alocação por requisição: uma fração 'sample_rate' das requisições
+      zera o pico do tracemalloc na entrada e lê o pico na saída. Só uma
+      requisição é amostrada por vez; alocações de requisições concorrentes
+      entram na mesma medição, que é portanto um limite superior.
+    - Memória retida por requisição (alocado - liberado): persistentemente
+      positiva indica vazamento.
+    - Linha de base de alocações (após o carregamento do modelo), comparada
+      com o estado atual para apontar os pontos de crescimento.
+    """
+
+    def __init__(
+        self,
+        sample_rate: float = 0.1,
+        window_size: int = 1000,
+        n_frames: int = 1,
+        rng=random.random,
+    ):
+        self.sample_rate = sample_rate
+        self.window_size = window_size
+        self.n_frames = n_frames
+        self.rng = rng
+        self.baseline = None
+        self._peaks = {}
+        self._retained = {}
+        self._sampled = {}
+        self._sampling = threading.Lock()
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Inicia o tracemalloc e grava a linha de base das alocações."""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.n_frames)
+        self.baseline = tracemalloc.take_snapshot()
+
+    def stop(self):
+        self.baseline = None
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    def begin(self):
+        """
+        Decide se a requisição corrente é amostrada.
+
+        Returns:
+            int | None: Memória traçada na entrada (bytes) ou None se não amostrada.
+        """
+        if not tracemalloc.is_tracing() or self.rng() >= self.sample_rate:
+            return None
+        if not self._sampling.acquire(blocking=False):
+            return None
+        tracemalloc.reset_peak()
+        return tracemalloc.get_traced_memory()[0]
+
+    def end(self, route: str, start_bytes):
+        """Registra pico e memória retida da requisição amostrada."""
+        if start_bytes is None:
+            return
+        try:
+            current, peak = tracemalloc.get_traced_memory()
+        finally:
+            self._sampling.release()
+
+        with self._lock:
+            if route not in self._peaks:
+                self._peaks[route] = deque(maxlen=self.window_size)
+                self._retained[route] = deque(maxlen=self.window_size)
+                self._sampled[route] = 0
+            self._peaks[route].append((peak - start_bytes) / 1024)
+            self._retained[route].append((current - start_bytes) / 1024)
+            self._sampled[route] += 1
+
+    def request_summary(self) -> dict:
+        """Pico de alocação (KB) e memória retida por rota nas requisições amostradas."""
+        with self._lock:
+            peaks = {route: list(values) for route, values in self._peaks.items()}
+            retained = {route: list(v) for route, v in self._retained.items()}
+            sampled = dict(self._sampled)
+
+        summary = {}
+        for route, values in sorted(peaks.items()):
+            p50, p95 = np.percentile(values, [50, 95])
+            summary[route] = {
+                "amostradas": sampled[route],
+                "pico_p50_kb": round(float(p50), 2),
+                "pico_p95_kb": round(float(p95), 2),
+                "pico_max_kb": round(float(max(values)), 2),
+                "retida_media_kb": round(float(np.mean(retained[route])), 2),
+            }
+        return summary
+
+    def snapshot(self, limit: int = 10) -> dict:
+        """Memória traçada, maiores alocadores e crescimento desde a linha de base."""
+        if not tracemalloc.is_tracing():
+            return {"ativo": False}
+        current, peak = tracemalloc.get_traced_memory()
+        snapshot = tracemalloc.take_snapshot()
+        return {
+            "ativo": True,
+            "tracado_mb": round(current / 2**20, 3),
+            "tracado_pico_mb": round(peak / 2**20, 3),
+            "maiores_alocadores": top_allocations(snapshot, limit),
+            "crescimento_desde_inicio": (
+                top_allocations(snapshot, limit, baseline=self.baseline)
+                if self.baseline is not None
+                else None
+            ),
+            "por_rota": self.request_summary(),
+        }
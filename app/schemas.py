@@ -1,5 +1,7 @@
-from pydantic import BaseModel, ConfigDict, Field
-from typing import Optional, Literal
+from pydantic import BaseModel, ConfigDict, Field, model_validator
+from typing import Optional, Literal, Union
+
+from src.validation import derive_rules
 
 
 class AlunoInput(BaseModel):
@@ -100,6 +102,10 @@ class AlunoInput(BaseModel):
     )
 
 
+# Regras do AlunoInput para validação vetorizada de lotes (src/validation.py)
+ALUNO_RULES = derive_rules(AlunoInput)
+
+
 class PredicaoOutput(BaseModel):
     """
     Schema de saída da API de Predição.
@@ -115,3 +121,96 @@ class PredicaoOutput(BaseModel):
     mensagem: str = Field(
         ..., description="Mensagem explicativa com recomendação pedagógica."
     )
+
+
+class ContribuicaoFeature(BaseModel):
+    """Contribuição de uma feature original para o log-odds do risco."""
+
+    feature: str = Field(..., description="Nome da feature original (ex: ieg).")
+    contribuicao: float = Field(
+        ...,
+        description="Contribuição no log-odds (positivo aumenta o risco). Para "
+        "indicadores, notas, Pedras e Sim/Não (padronizados), em relação ao aluno "
+        "médio do treino; para categorias (ex: instituicao_de_ensino), o "
+        "coeficiente da categoria do aluno, em relação a zero.",
+    )
+    direcao: Literal["aumenta_risco", "reduz_risco"] = Field(
+        ..., description="Sentido do efeito da feature sobre o risco."
+    )
+
+
+class ExplicacaoOutput(PredicaoOutput):
+    """
+    Schema de saída da predição explicada.
+    Inclui os fatores que mais contribuíram para a probabilidade de risco.
+    """
+
+    principais_fatores: list[ContribuicaoFeature] = Field(
+        ..., description="Features ordenadas pela magnitude da contribuição."
+    )
+
+
+class VariacaoFeature(BaseModel):
+    """
+    Variação de uma feature na análise what-if.
+    Informe 'valores' (grade explícita) ou o intervalo inicio/fim/passo (indicadores).
+    Para as Pedras, sem 'valores', todos os níveis são avaliados.
+    """
+
+    feature: Literal[
+        "iaa",
+        "ieg",
+        "ips",
+        "ida",
+        "ipp",
+        "ipv",
+        "matem",
+        "portug",
+        "ingles",
+        "pedra_20",
+        "pedra_21",
+    ] = Field(..., description="Feature a variar.")
+    valores: Optional[list[Union[float, str]]] = Field(
+        None, description="Valores explícitos (ex: [5, 7.5, 10] ou ['Ágata'])."
+    )
+    inicio: float = Field(0.0, ge=0, le=10, description="Início do intervalo.")
+    fim: float = Field(10.0, ge=0, le=10, description="Fim do intervalo.")
+    passo: float = Field(
+        1.0, ge=0.01, le=10, description="Passo do intervalo (mínimo 0.01)."
+    )
+
+    @model_validator(mode="after")
+    def validar_valores(self):
+        if not self.valores:
+            return self
+        if self.feature.startswith("pedra_"):
+            invalid = [
+                v
+                for v in self.valores
+                if v not in ("Quartzo", "Ágata", "Ametista", "Topázio")
+            ]
+            if invalid:
+                raise ValueError(f"Pedra inválida para {self.feature}: {invalid}")
+        elif any(isinstance(v, str) or not 0 <= v <= 10 for v in self.valores):
+            raise ValueError(f"Valores de {self.feature} devem estar entre 0 e 10.")
+        return self
+
+
+class WhatIfInput(BaseModel):
+    """Entrada da análise what-if: aluno base e variações a avaliar."""
+
+    aluno: AlunoInput
+    variacoes: list[VariacaoFeature] = Field(..., min_length=1)
+    modo: Literal["individual", "grade"] = Field(
+        "individual",
+        description="'individual': uma feature por vez; 'grade': todas as combinações.",
+    )
+
+
+class FeedbackInput(BaseModel):
+    """Desfecho observado de um aluno, associado à última predição servida para o RA."""
+
+    ra: str = Field(..., min_length=1, description="Registro do Aluno (RA).")
+    defasagem: bool = Field(
+        ..., description="Desfecho observado: o aluno entrou em defasagem?"
+    )
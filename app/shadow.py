@@ -0,0 +1,176 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import joblib
+import pandas as pd
+from sklearn.pipeline import Pipeline
+
+from app.config import LOG_ROTATION, settings
+from src.utils import setup_logger
+
+logger = setup_logger("shadow", "api.log", level=settings.LOG_LEVEL, **LOG_ROTATION)
+
+
+def load_challengers(paths: list, champion: Pipeline) -> dict:
+    """
+    Carrega os classificadores challengers que compartilham o pré-processamento do champion.
+
+    Cada artefato pode ser um classificador isolado ou um Pipeline completo treinado
+    com o mesmo create_pipeline (nesse caso, apenas o estimador final é mantido).
+    O challenger só é aceito se as features que ele espera forem exatamente as
+    produzidas pelo pré-processamento ajustado do champion.
+
+    Args:
+        paths (list): Caminhos dos artefatos .joblib dos challengers.
+        champion (Pipeline): Pipeline em produção.
+
+    Returns:
+        dict: Mapa nome do challenger -> classificador.
+    """
+    expected = list(champion[:-1].get_feature_names_out())
+    challengers = {}
+
+    for path in map(Path, paths):
+        try:
+            artifact = joblib.load(path)
+        except Exception as e:
+            logger.error(f"Falha ao carregar challenger {path}: {e}")
+            continue
+
+        classifier = artifact[-1] if isinstance(artifact, Pipeline) else artifact
+        features = list(getattr(classifier, "feature_names_in_", []))
+        if features != expected:
+            logger.warning(
+                f"Challenger {path.name} ignorado: features incompatíveis com o "
+                "pré-processamento do champion."
+            )
+            continue
+
+        challengers[path.stem] = classifier
+        logger.info(f"Challenger carregado: {path.stem}")
+
+    return challengers
+
+
+class ChallengerRunner:
+    """
+    Executa os challengers em modo sombra (shadow), fora do caminho da requisição.
+
+    O champion responde de forma síncrona; as features já transformadas são
+    enfileiradas para uma thread dedicada que pontua cada challenger e registra
+    a concordância e o delta de probabilidade em relação ao champion.
+    A latência do /predict não inclui o custo dos challengers.
+
+    A fila é limitada a 'max_pending' pontuações: com challengers mais lentos
+    que o champion sob carga sustentada, novas pontuações são descartadas (e
+    contadas) em vez de acumular features em memória sem limite.
+    """
+
+    def __init__(self, challengers: dict, shadow_logger=None, max_pending: int = 1000):
+        self.challengers = challengers
+        self.shadow_logger = shadow_logger
+        # Worker único: preserva a ordem e isola o custo em uma thread de fundo
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="challenger"
+        )
+        self._pending = threading.BoundedSemaphore(max_pending)
+        self.dropped = 0
+        self._lock = threading.Lock()
+        self._stats = {
+            name: {
+                "n": 0,
+                "concordancias": 0,
+                "soma_delta": 0.0,
+                "soma_delta_abs": 0.0,
+                "max_delta_abs": 0.0,
+                "erros": 0,
+            }
+            for name in challengers
+        }
+
+    def submit(
+        self, features: pd.DataFrame, champion_proba: float, champion_risco: bool
+    ):
+        """
+        Enfileira a pontuação dos challengers para as features já transformadas.
+        Com a fila cheia, a pontuação é descartada sem bloquear a requisição.
+        """
+        if not self._pending.acquire(blocking=False):
+            with self._lock:
+                self.dropped += 1
+            return
+        try:
+            self._executor.submit(self._score, features, champion_proba, champion_risco)
+        except RuntimeError:
+            # Executor já encerrado (shutdown)
+            self._pending.release()
+
+    def _score(
+        self, features: pd.DataFrame, champion_proba: float, champion_risco: bool
+    ):
+        try:
+            self._score_challengers(features, champion_proba, champion_risco)
+        finally:
+            self._pending.release()
+
+    def _score_challengers(
+        self, features: pd.DataFrame, champion_proba: float, champion_risco: bool
+    ):
+        for name, classifier in self.challengers.items():
+            try:
+                proba = float(classifier.predict_proba(features)[0][1])
+                risco = bool(classifier.predict(features)[0] == 1)
+            except Exception as e:
+                logger.error(f"Falha ao pontuar challenger {name}: {e}")
+                with self._lock:
+                    self._stats[name]["erros"] += 1
+                continue
+
+            delta = proba - champion_proba
+            concorda = risco == champion_risco
+
+            with self._lock:
+                stats = self._stats[name]
+                stats["n"] += 1
+                stats["concordancias"] += int(concorda)
+                stats["soma_delta"] += delta
+                stats["soma_delta_abs"] += abs(delta)
+                stats["max_delta_abs"] = max(stats["max_delta_abs"], abs(delta))
+
+            if self.shadow_logger is not None:
+                self.shadow_logger.info(
+                    f"{name},{champion_proba:.4f},{proba:.4f},{delta:.4f},{concorda}"
+                )
+
+    def drain(self):
+        """Aguarda a conclusão das pontuações já enfileiradas."""
+        self._executor.submit(lambda: None).result()
+
+    def summary(self) -> dict:
+        """Resumo da comparação champion x challengers."""
+        with self._lock:
+            resumo = {}
+            for name, stats in self._stats.items():
+                n = stats["n"]
+                resumo[name] = {
+                    "predicoes": n,
+                    "taxa_concordancia": (
+                        round(stats["concordancias"] / n, 4) if n else None
+                    ),
+                    "delta_medio": round(stats["soma_delta"] / n, 4) if n else None,
+                    "delta_abs_medio": (
+                        round(stats["soma_delta_abs"] / n, 4) if n else None
+                    ),
+                    "delta_abs_max": round(stats["max_delta_abs"], 4),
+                    "erros": stats["erros"],
+                }
+            return resumo
+
+    def dropped_count(self) -> int:
+        """Pontuações descartadas por fila cheia desde a inicialização."""
+        with self._lock:
+            return self.dropped
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
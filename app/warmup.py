@@ -0,0 +1,136 @@
+import time
+
+from sklearn.pipeline import Pipeline
+
+from app.schemas import AlunoInput
+from app.config import LOG_ROTATION, settings
+from src.utils import setup_logger
+
+logger = setup_logger("warmup", "api.log", level=settings.LOG_LEVEL, **LOG_ROTATION)
+
+# Entradas representativas: aluno completo, aluno novo (Pedras nulas, sem
+# inglês), grafias e extremos das escalas, cobrindo os ramos dos transformers
+# (PedraMapper, BinaryCleaner, imputação de nulos e one-hot).
+WARMUP_PAYLOADS = [
+    AlunoInput.model_config["json_schema_extra"]["example"],
+    {
+        "genero": "Menino",
+        "instituicao_de_ensino": "Rede Decisão",
+        "pedra_20": None,
+        "pedra_21": None,
+        "iaa": 0.0,
+        "ieg": 0.0,
+        "ips": 0.0,
+        "ida": 0.0,
+        "ipp": 0.0,
+        "ipv": 0.0,
+        "matem": 0.0,
+        "portug": 0.0,
+        "indicado": "Sim",
+        "atingiu_pv": "Sim",
+        "ponto_virada": "Sim",
+        "indicado_bolsa": "Sim",
+    },
+    {
+        "genero": "Menina",
+        "instituicao_de_ensino": "Escola JP II",
+        "pedra_20": "Quartzo",
+        "pedra_21": "Topázio",
+        "iaa": 10.0,
+        "ieg": 10.0,
+        "ips": 10.0,
+        "ida": 10.0,
+        "ipp": 10.0,
+        "ipv": 10.0,
+        "matem": 10.0,
+        "portug": 10.0,
+        "ingles": 10.0,
+        "indicado": "Não",
+        "atingiu_pv": "Sim",
+        "ponto_virada": "Não",
+        "indicado_bolsa": "Sim",
+    },
+]
+
+
+def run_warmup(
+    model,
+    prepare,
+    feature_cache=None,
+    explainer=None,
+    challengers: dict = None,
+    rounds: int = 2,
+) -> dict:
+    """
+    Executa os caminhos de inferência com entradas representativas antes de a
+    API ser marcada como pronta, pagando as inicializações preguiçosas do
+    pandas/sklearn/transformers fora da primeira requisição real.
+
+    Caminhos: linha a linha como no /predict (com o cache de features, se
+    ativo), lote completo pelo pipeline (ranking, score store, what-if),
+    explicação (/predict/explain) e challengers. Nada é registrado nos logs de
+    drift, nas predições servidas ou nas métricas. O cache de features mantém
+    os blocos aquecidos (gênero/instituição e Pedras/binárias se repetem entre
+    alunos reais), mas tem os contadores zerados para não distorcer a taxa de
+    acerto.
+
+    Args:
+        model: Pipeline (ou estimador) em produção.
+        prepare: Função lista de AlunoInput -> DataFrame (prepare_batch_dataframe).
+        feature_cache (FeatureCache): Cache de features em uso pelo /predict.
+        explainer (LinearExplainer): Explicador em uso pelos endpoints de explicação.
+        challengers (dict): Challengers em modo sombra (nome -> classificador).
+        rounds (int): Repetições de cada caminho.
+
+    Returns:
+        dict: Duração total e por caminho (ms), rodadas e amostras usadas.
+    """
+    alunos = [AlunoInput(**payload) for payload in WARMUP_PAYLOADS]
+    is_pipeline = isinstance(model, Pipeline)
+    timings = {}
+
+    def timed(path: str, func):
+        started = time.perf_counter()
+        for _ in range(rounds):
+            func()
+        timings[path] = round((time.perf_counter() - started) * 1000, 2)
+
+    def single_rows():
+        for aluno in alunos:
+            df = prepare([aluno])
+            if feature_cache is not None:
+                features, estimator = feature_cache.transform(df), model[-1]
+            else:
+                features, estimator = df, model
+            estimator.predict(features)
+            estimator.predict_proba(features)
+
+    def batch():
+        model.predict_proba(prepare(alunos))
+
+    started = time.perf_counter()
+    timed("linha_a_linha", single_rows)
+    timed("lote", batch)
+    if explainer is not None:
+        timed("explicacao", lambda: explainer.explain(prepare(alunos), top_k=5))
+    if challengers and is_pipeline:
+
+        def shadow():
+            features = model[:-1].transform(prepare(alunos))
+            for name, classifier in challengers.items():
+                try:
+                    classifier.predict_proba(features)
+                except Exception as e:
+                    logger.warning(f"Aquecimento do challenger {name} falhou: {e}")
+
+        timed("challengers", shadow)
+
+    if feature_cache is not None:
+        feature_cache.reset_stats()
+
+    return {
+        "duracao_ms": round((time.perf_counter() - started) * 1000, 2),
+        "rodadas": rounds,
+        "amostras": len(alunos),
+        "caminhos_ms": timings,
+    }
@@ -0,0 +1,89 @@
+import contextlib
+import warnings
+from pathlib import Path
+
+import joblib
+import sklearn
+
+from src.feature_engineering import BinaryCleaner, PedraMapper
+from src.preprocessing import load_dataset
+from src.validation import validate_frame
+
+sklearn.set_config(transform_output="pandas")
+
+# Aluno típico de uma chamada ao /predict (formato AlunoInput)
+SAMPLE_PAYLOAD = {
+    "genero": "Menina",
+    "instituicao_de_ensino": "Escola Pública",
+    "pedra_20": "Ametista",
+    "pedra_21": "Ágata",
+    "iaa": 8.5,
+    "ieg": 7.2,
+    "ips": 6.8,
+    "ida": 5.5,
+    "ipp": 7.0,
+    "ipv": 7.2,
+    "matem": 6.0,
+    "portug": 7.5,
+    "ingles": 5.0,
+    "indicado": "Não",
+    "atingiu_pv": "Não",
+    "ponto_virada": "Não",
+    "indicado_bolsa": "Não",
+}
+
+
+def get_project_root() -> Path:
+    return Path(__file__).resolve().parent.parent
+
+
+def build_cases(stack: contextlib.ExitStack) -> dict:
+    """
+    Monta os casos do benchmark: nome -> função sem argumentos.
+
+    Toda a preparação (modelo, dataset, cliente HTTP) acontece aqui, fora da
+    medição; cada função executa apenas o caminho quente medido. Casos de
+    "lote" usam o CSV do PEDE distribuído no repositório (860 alunos).
+
+    Args:
+        stack (ExitStack): Recebe os recursos a liberar ao final (ex: TestClient).
+    """
+    from fastapi.testclient import TestClient
+
+    from app.main import app, prepare_input_dataframe
+    from app.schemas import ALUNO_RULES, AlunoInput
+
+    root = get_project_root()
+    raw_csv = root / "data" / "raw" / "dataset_pede_passos.csv"
+    pipeline = joblib.load(root / "app" / "model" / "pipeline.joblib")
+    pipeline.set_output(transform="pandas")
+
+    aluno = AlunoInput(**SAMPLE_PAYLOAD)
+    row = prepare_input_dataframe(aluno)
+    batch = load_dataset(raw_csv)
+    pedra_mapper, binary_cleaner = PedraMapper(), BinaryCleaner()
+    preprocessor = pipeline.named_steps["preprocessor"]
+    batch_mapped = binary_cleaner.transform(pedra_mapper.transform(batch))
+
+    client = stack.enter_context(TestClient(app))
+
+    def predict_endpoint():
+        response = client.post("/predict", json=SAMPLE_PAYLOAD)
+        assert response.status_code == 200
+
+    def load_csv():
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            load_dataset(raw_csv)
+
+    return {
+        "prepare_input_dataframe": lambda: prepare_input_dataframe(aluno),
+        "pedra_mapper_transform": lambda: pedra_mapper.transform(batch),
+        "binary_cleaner_transform": lambda: binary_cleaner.transform(batch),
+        "column_transformer_transform": lambda: preprocessor.transform(batch_mapped),
+        "predict_proba_linha": lambda: pipeline.predict_proba(row),
+        "predict_proba_lote": lambda: pipeline.predict_proba(batch),
+        "predict_endpoint": predict_endpoint,
+        "load_dataset_csv": load_csv,
+        "validate_frame_lote": lambda: validate_frame(batch, ALUNO_RULES),
+    }
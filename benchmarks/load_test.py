@@ -0,0 +1,323 @@
+import argparse
+import asyncio
+import contextlib
+import itertools
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+
+import httpx
+import numpy as np
+
+from app.schemas import ALUNO_RULES, AlunoInput
+from benchmarks.cases import SAMPLE_PAYLOAD, get_project_root
+from src.preprocessing import load_dataset
+from src.utils import setup_logger
+from src.validation import validate_frame
+
+logger = setup_logger("load_test")
+
+TRAFFIC_PATH = get_project_root() / "reports" / "traffic.ndjson"
+PREDICT_PATH = "/predict"
+BATCH_PATH = "/predict/explain/batch"
+STARTUP_TIMEOUT = 60
+
+
+def payloads_from_dataset(csv_path: Path) -> list:
+    """
+    Converte o CSV bruto do PEDE em payloads AlunoInput (um por aluno).
+
+    Campos exigidos pela API e ausentes no CSV (ex: ipp, indicado_bolsa) vêm do
+    payload de exemplo; linhas que não passam na validação do AlunoInput
+    (ex: nota fora de 0-10) são descartadas pela validação vetorizada
+    (ALUNO_RULES), sem instanciar um AlunoInput por aluno.
+    """
+    df = load_dataset(csv_path)
+    fields = [f for f in AlunoInput.model_fields if f in df.columns]
+    frame = df[fields].assign(
+        **{f: v for f, v in SAMPLE_PAYLOAD.items() if f not in df.columns}
+    )
+    valid = validate_frame(frame, ALUNO_RULES) == 0
+    records = frame[valid].astype(object).where(frame[valid].notna(), None)
+
+    payloads = records.to_dict(orient="records")
+    logger.info(f"{len(payloads)} de {len(df)} alunos convertidos em payloads.")
+    return payloads
+
+
+def read_ndjson(path: Path) -> list:
+    """Lê um arquivo NDJSON (um payload AlunoInput por linha)."""
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def write_ndjson(payloads: list, path: Path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        for payload in payloads:
+            f.write(json.dumps(payload, ensure_ascii=False) + "\n")
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@contextlib.contextmanager
+def local_server(workers: int = 1, env: dict = None):
+    """
+    Sobe a API com uvicorn em um subprocesso e aguarda o modelo carregar.
+
+    Args:
+        workers (int): Processos do uvicorn (--workers).
+        env (dict): Variáveis de ambiente extras (ex: FEATURE_CACHE_SIZE=0).
+
+    Yields:
+        str: URL base do servidor.
+    """
+    port = free_port()
+    command = [
+        sys.executable,
+        "-m",
+        "uvicorn",
+        "app.main:app",
+        "--host",
+        "127.0.0.1",
+        "--port",
+        str(port),
+        "--workers",
+        str(workers),
+        "--no-access-log",
+    ]
+    base_url = f"http://127.0.0.1:{port}"
+    with tempfile.TemporaryFile() as server_log:
+        process = subprocess.Popen(
+            command,
+            cwd=get_project_root(),
+            env={**os.environ, **(env or {})},
+            stdout=server_log,
+            stderr=subprocess.STDOUT,
+        )
+        try:
+            deadline = time.monotonic() + STARTUP_TIMEOUT
+            while True:
+                if process.poll() is not None or time.monotonic() > deadline:
+                    server_log.seek(0)
+                    tail = server_log.read().decode(errors="replace")[-2000:]
+                    raise RuntimeError(f"Servidor não ficou pronto:\n{tail}")
+                try:
+                    health = httpx.get(f"{base_url}/health", timeout=1).json()
+                    if health.get("model_loaded"):
+                        break
+                except httpx.HTTPError:
+                    pass
+                time.sleep(0.2)
+            yield base_url
+        finally:
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+
+async def replay(
+    base_url: str,
+    payloads: list,
+    n_requests: int,
+    concurrency: int = 8,
+    rate: float = None,
+    batch_size: int = 1,
+    timeout: float = 30.0,
+) -> dict:
+    """
+    Reproduz os payloads contra a API (em ciclo, se houver menos payloads que
+    requisições).
+
+    - Sem 'rate' (laço fechado): até 'concurrency' requisições em voo, cada uma
+      disparada assim que outra termina; mede a capacidade máxima.
+    - Com 'rate' (laço aberto): requisições agendadas a 'rate' por segundo,
+      independente das respostas. A latência conta a partir do horário
+      agendado, incluindo a espera por uma conexão livre (evita a omissão
+      coordenada, que esconde a fila nos percentis altos).
+    - 'batch_size' > 1 agrupa os alunos em chamadas a /predict/explain/batch.
+
+    Returns:
+        dict: Latências (s), status por requisição e tempo total.
+    """
+    stream = itertools.cycle(payloads)
+    if batch_size > 1:
+        path = BATCH_PATH
+        bodies = [[next(stream) for _ in range(batch_size)] for _ in range(n_requests)]
+    else:
+        path = PREDICT_PATH
+        bodies = [next(stream) for _ in range(n_requests)]
+
+    latencies = np.zeros(n_requests)
+    statuses = [None] * n_requests
+    semaphore = asyncio.Semaphore(concurrency)
+    limits = httpx.Limits(max_connections=concurrency)
+
+    async with httpx.AsyncClient(
+        base_url=base_url, timeout=timeout, limits=limits
+    ) as client:
+        started = time.perf_counter()
+
+        async def send(i: int):
+            scheduled = None
+            if rate:
+                scheduled = started + i / rate
+                await asyncio.sleep(max(0.0, scheduled - time.perf_counter()))
+            async with semaphore:
+                t0 = scheduled if scheduled is not None else time.perf_counter()
+                try:
+                    response = await client.post(path, json=bodies[i])
+                    statuses[i] = response.status_code
+                except httpx.HTTPError as e:
+                    statuses[i] = type(e).__name__
+                latencies[i] = time.perf_counter() - t0
+
+        await asyncio.gather(*(send(i) for i in range(n_requests)))
+        elapsed = time.perf_counter() - started
+
+    return {"latencias": latencies, "status": statuses, "tempo_segundos": elapsed}
+
+
+def summarize_run(run: dict, batch_size: int = 1) -> dict:
+    """Vazão, percentis de latência (ms) e taxa de erro de uma execução."""
+    latencies_ms = np.asarray(run["latencias"]) * 1000
+    n = len(latencies_ms)
+    errors = sum(1 for s in run["status"] if not (isinstance(s, int) and s < 400))
+    p50, p95, p99 = np.percentile(latencies_ms, [50, 95, 99])
+    return {
+        "requisicoes": n,
+        "tempo_segundos": round(run["tempo_segundos"], 3),
+        "vazao_rps": round(n / run["tempo_segundos"], 2),
+        "alunos_por_segundo": round(n * batch_size / run["tempo_segundos"], 2),
+        "latencia_ms": {
+            "p50": round(float(p50), 2),
+            "p95": round(float(p95), 2),
+            "p99": round(float(p99), 2),
+            "max": round(float(latencies_ms.max()), 2),
+        },
+        "taxa_erro": round(errors / n, 4),
+        "status": dict(Counter(str(s) for s in run["status"])),
+    }
+
+
+def run_configuration(
+    payloads: list,
+    workers: int,
+    cache: bool,
+    batch_size: int,
+    n_requests: int,
+    concurrency: int,
+    rate: float = None,
+    warmup: int = 20,
+) -> dict:
+    """Sobe um servidor com a configuração, aquece e mede uma execução."""
+    env = {} if cache else {"FEATURE_CACHE_SIZE": "0"}
+    with local_server(workers=workers, env=env) as base_url:
+        if warmup:
+            asyncio.run(
+                replay(base_url, payloads, warmup, concurrency, batch_size=batch_size)
+            )
+        run = asyncio.run(
+            replay(base_url, payloads, n_requests, concurrency, rate, batch_size)
+        )
+    return {
+        "workers": workers,
+        "cache": cache,
+        "lote": batch_size,
+        "concorrencia": concurrency,
+        "taxa_alvo_rps": rate,
+        **summarize_run(run, batch_size),
+    }
+
+
+if __name__ == "__main__":
+    root = get_project_root()
+    parser = argparse.ArgumentParser(
+        description="Teste de carga local: reproduz tráfego NDJSON contra o uvicorn."
+    )
+    parser.add_argument(
+        "--trafego",
+        type=Path,
+        default=TRAFFIC_PATH,
+        help="NDJSON de payloads AlunoInput (gerado a partir do CSV bruto se ausente).",
+    )
+    parser.add_argument("--requisicoes", type=int, default=500)
+    parser.add_argument("--concorrencia", type=int, default=8)
+    parser.add_argument(
+        "--taxa",
+        type=float,
+        default=None,
+        help="Requisições por segundo (laço aberto); sem valor, laço fechado.",
+    )
+    parser.add_argument("--aquecimento", type=int, default=20)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1])
+    parser.add_argument("--cache", nargs="+", choices=["on", "off"], default=["on"])
+    parser.add_argument(
+        "--lote",
+        type=int,
+        nargs="+",
+        default=[1],
+        help="Alunos por requisição (>1 usa /predict/explain/batch).",
+    )
+    parser.add_argument(
+        "--output", type=Path, default=root / "reports" / "load_test.json"
+    )
+    args = parser.parse_args()
+
+    if not args.trafego.exists():
+        write_ndjson(
+            payloads_from_dataset(root / "data" / "raw" / "dataset_pede_passos.csv"),
+            args.trafego,
+        )
+        logger.info(f"Tráfego gerado em: {args.trafego}")
+    payloads = read_ndjson(args.trafego)
+
+    results = []
+    for workers, cache, batch_size in itertools.product(
+        args.workers, args.cache, args.lote
+    ):
+        logger.info(f"Executando: workers={workers} cache={cache} lote={batch_size}")
+        results.append(
+            run_configuration(
+                payloads,
+                workers=workers,
+                cache=cache == "on",
+                batch_size=batch_size,
+                n_requests=args.requisicoes,
+                concurrency=args.concorrencia,
+                rate=args.taxa,
+                warmup=args.aquecimento,
+            )
+        )
+
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(
+            {"trafego": str(args.trafego), "execucoes": results},
+            f,
+            indent=2,
+            ensure_ascii=False,
+        )
+
+    for r in results:
+        latency = r["latencia_ms"]
+        logger.info(
+            f"workers={r['workers']} cache={'on' if r['cache'] else 'off'} "
+            f"lote={r['lote']} | {r['vazao_rps']} req/s "
+            f"({r['alunos_por_segundo']} alunos/s) | p50={latency['p50']}ms "
+            f"p95={latency['p95']}ms p99={latency['p99']}ms max={latency['max']}ms "
+            f"| erros={r['taxa_erro']:.1%}"
+        )
+    logger.info(f"Resultados salvos em: {args.output}")
@@ -0,0 +1,236 @@
+import argparse
+import contextlib
+import json
+import logging
+import os
+import platform
+import sys
+import timeit
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+
+from benchmarks.cases import build_cases, get_project_root
+from src.memory import process_memory
+from src.utils import setup_logger
+
+logger = setup_logger("benchmark")
+
+BASELINE_PATH = Path(__file__).resolve().parent / "baseline.json"
+# Regressão tolerada sobre o melhor tempo da linha de base (0.5 = até 50% mais lento)
+DEFAULT_TOLERANCE = 0.5
+# Casos acima da tolerância são medidos de novo antes de falhar (ruído da máquina)
+DEFAULT_RETRIES = 2
+# Loggers silenciados durante a medição (custo de logging: python -m src.log_benchmark)
+QUIET_LOGGERS = ["api", "preprocessing", "drift_monitor"]
+
+
+def measure(func, repeat: int = 7, min_time: float = 0.2) -> dict:
+    """
+    Mede uma função com timeit: calibra o número de chamadas por rodada para
+    durar ao menos 'min_time' e repete 'repeat' rodadas.
+
+    Returns:
+        dict: Mediana, mínimo e máximo do tempo por chamada (ms) e chamadas por rodada.
+    """
+    timer = timeit.Timer(func)
+    number, elapsed = timer.autorange()
+    if elapsed < min_time:
+        number = max(1, int(number * min_time / max(elapsed, 1e-9)))
+    per_call = np.array(timer.repeat(repeat=repeat, number=number)) / number * 1000
+    return {
+        "mediana_ms": round(float(np.median(per_call)), 4),
+        "min_ms": round(float(per_call.min()), 4),
+        "max_ms": round(float(per_call.max()), 4),
+        "chamadas_por_rodada": number,
+    }
+
+
+def measure_memory(func) -> dict:
+    """
+    Pico de memória alocada (KB) e memória retida por uma chamada, com
+    tracemalloc. Feito fora da medição de tempo: o rastreamento encarece cada
+    alocação.
+    """
+    started_tracing = not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        func()
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        if started_tracing:
+            tracemalloc.stop()
+    return {
+        "pico_alocacao_kb": round((peak - before) / 1024, 2),
+        "retida_kb": round((current - before) / 1024, 2),
+    }
+
+
+def run_benchmarks(
+    names: list = None,
+    repeat: int = 7,
+    min_time: float = 0.2,
+    baseline: dict = None,
+    tolerance: float = DEFAULT_TOLERANCE,
+    retries: int = DEFAULT_RETRIES,
+    memory: bool = False,
+) -> dict:
+    """
+    Executa os casos selecionados e retorna os resultados com o ambiente.
+
+    Com 'baseline', um caso acima da tolerância é medido novamente (até
+    'retries' vezes) e fica com o melhor resultado: uma regressão real persiste
+    entre medições, um pico de carga da máquina não.
+
+    Com 'memory', cada caso também registra o pico de alocação de uma chamada
+    extra (measure_memory) e o relatório inclui o RSS do processo.
+    """
+    results = {}
+    with contextlib.ExitStack() as stack:
+        cases = build_cases(stack)
+        for name in QUIET_LOGGERS:
+            logging.getLogger(name).setLevel(logging.WARNING)
+        for name in names or list(cases):
+            result = measure(cases[name], repeat=repeat, min_time=min_time)
+            base = (baseline or {}).get("casos", {}).get(name)
+            for _ in range(retries if base else 0):
+                if result["min_ms"] <= base["min_ms"] * (1 + tolerance):
+                    break
+                retry = measure(cases[name], repeat=repeat, min_time=min_time)
+                if retry["min_ms"] < result["min_ms"]:
+                    result = retry
+            if memory:
+                result.update(measure_memory(cases[name]))
+            results[name] = result
+            logger.info(
+                f"{name}: mediana={result['mediana_ms']:.3f}ms "
+                f"(min={result['min_ms']:.3f}ms)"
+                + (f" pico={result['pico_alocacao_kb']:.1f}KB" if memory else "")
+            )
+
+    report = {
+        "gerado_em": datetime.now(timezone.utc).isoformat(),
+        "ambiente": {
+            "python": platform.python_version(),
+            "plataforma": platform.platform(),
+            "processador": platform.processor() or platform.machine(),
+            "nucleos": os.cpu_count(),
+        },
+        "casos": results,
+    }
+    if memory:
+        report["memoria_processo"] = process_memory()
+    return report
+
+
+def compare_to_baseline(results: dict, baseline: dict, tolerance: float) -> list:
+    """
+    Compara o melhor tempo por chamada (min das rodadas) com a linha de base.
+    O mínimo é o estimador menos sensível a ruído do sistema (recomendação do
+    timeit); a mediana fica no relatório para leitura.
+
+    Returns:
+        list: Um item por caso presente em ambos, com a razão atual/base e se
+            excede a tolerância (regressão).
+    """
+    comparison = []
+    for name, current in results["casos"].items():
+        base = baseline["casos"].get(name)
+        if base is None:
+            continue
+        ratio = current["min_ms"] / base["min_ms"]
+        comparison.append(
+            {
+                "caso": name,
+                "base_ms": base["min_ms"],
+                "atual_ms": current["min_ms"],
+                "razao": round(ratio, 3),
+                "regressao": ratio > 1 + tolerance,
+            }
+        )
+    return comparison
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark dos caminhos quentes de inferência com gate de regressão."
+    )
+    parser.add_argument("--casos", nargs="+", default=None)
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--min-time", type=float, default=0.2)
+    parser.add_argument(
+        "--tolerancia",
+        type=float,
+        default=float(os.getenv("BENCHMARK_TOLERANCE", DEFAULT_TOLERANCE)),
+        help="Regressão máxima tolerada (0.5 = 50%%); env: BENCHMARK_TOLERANCE.",
+    )
+    parser.add_argument(
+        "--tentativas",
+        type=int,
+        default=DEFAULT_RETRIES,
+        help="Novas medições de um caso acima da tolerância antes de falhar.",
+    )
+    parser.add_argument(
+        "--memoria",
+        action="store_true",
+        help="Registra também o pico de alocação por caso (tracemalloc) e o RSS.",
+    )
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument(
+        "--atualizar-baseline",
+        action="store_true",
+        help="Grava os resultados como nova linha de base.",
+    )
+    parser.add_argument(
+        "--output",
+        type=Path,
+        default=get_project_root() / "reports" / "benchmark.json",
+    )
+    args = parser.parse_args()
+
+    baseline = None
+    if not args.atualizar_baseline and args.baseline.exists():
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    results = run_benchmarks(
+        args.casos,
+        repeat=args.repeat,
+        min_time=args.min_time,
+        baseline=baseline,
+        tolerance=args.tolerancia,
+        retries=args.tentativas,
+        memory=args.memoria,
+    )
+
+    if baseline is None:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+        logger.info(f"Linha de base salva em: {args.baseline}")
+        sys.exit(0)
+
+    comparison = compare_to_baseline(results, baseline, args.tolerancia)
+    results["comparacao"] = {"tolerancia": args.tolerancia, "casos": comparison}
+
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2, ensure_ascii=False)
+
+    regressions = [c for c in comparison if c["regressao"]]
+    for item in comparison:
+        status = "REGRESSÃO" if item["regressao"] else "ok"
+        logger.info(
+            f"[{status}] {item['caso']}: {item['base_ms']:.3f}ms -> "
+            f"{item['atual_ms']:.3f}ms (x{item['razao']:.2f})"
+        )
+    if regressions:
+        logger.error(
+            f"{len(regressions)} caso(s) acima da tolerância de {args.tolerancia:.0%}."
+        )
+        sys.exit(1)
+    logger.info(f"Sem regressões (tolerância {args.tolerancia:.0%}).")
@@ -0,0 +1,534 @@
+import argparse
+import bisect
+import json
+import math
+import threading
+import time
+import joblib
+import numpy as np
+import pandas as pd
+import sklearn
+from pathlib import Path
+
+from src.utils import setup_logger
+from src.feature_engineering import PedraMapper
+
+# Garante que o Scikit-Learn retorne Pandas DataFrames nas transformações
+sklearn.set_config(transform_output="pandas")
+logger = setup_logger("drift")
+
+REFERENCE_PROFILE_NAME = "reference_profile.json"
+
+# Features monitoradas (entradas da API)
+NUMERIC_FEATURES = [
+    "iaa",
+    "ieg",
+    "ips",
+    "ida",
+    "ipp",
+    "ipv",
+    "matem",
+    "portug",
+    "ingles",
+]
+CATEGORICAL_FEATURES = ["genero", "instituicao_de_ensino", "pedra_20", "pedra_21"]
+PEDRA_FEATURES = ["pedra_20", "pedra_21"]
+
+# Layout do log de drift (logs/drift_data.csv), sem cabeçalho.
+# O timestamp padrão do logging ('2024-01-31 10:00:00,123') ocupa duas colunas.
+# Novas colunas são sempre acrescentadas ao final, preservando a leitura de logs antigos.
+DRIFT_LOG_EXTRA_FIELDS = ["pedra_21"] + NUMERIC_FEATURES
+DRIFT_LOG_COLUMNS = [
+    "data",
+    "milissegundos",
+    "probabilidade",
+    "risco",
+    "genero",
+    "instituicao_de_ensino",
+    "pedra_20",
+] + DRIFT_LOG_EXTRA_FIELDS
+
+# Níveis canônicos de Pedra (mesma ordinalidade do PedraMapper)
+PEDRA_LEVELS = {0: "Sem Pedra", 1: "Quartzo", 2: "Ágata", 3: "Ametista", 4: "Topázio"}
+
+# Histogramas por quantis (decis) para features e faixas fixas para a probabilidade
+N_QUANTILE_BINS = 10
+PROBA_EDGES = np.linspace(0.0, 1.0, 21)
+MISSING_CATEGORY = "missing"
+OTHER_CATEGORY = "outros"
+
+# Limiares usuais de interpretação do PSI
+PSI_WARNING = 0.1
+PSI_DRIFT = 0.25
+
+
+def get_project_root() -> Path:
+    return Path(__file__).resolve().parent.parent
+
+
+def normalize_categories(X: pd.DataFrame) -> pd.DataFrame:
+    """
+    Padroniza as variáveis categóricas monitoradas como texto.
+
+    As colunas de Pedra são convertidas para o nível canônico (ex: 'agata' -> 'Ágata'),
+    reaproveitando o mapeamento ordinal do PedraMapper; nulos viram 'Sem Pedra'.
+    Nas demais, nulos viram 'missing' (mesma convenção do imputer do pipeline).
+    """
+    cols = [c for c in CATEGORICAL_FEATURES if c in X.columns]
+    result = X[cols].copy()
+
+    pedra_cols = [c for c in PEDRA_FEATURES if c in cols]
+    if pedra_cols:
+        levels = PedraMapper().transform(X[pedra_cols])
+        for col in pedra_cols:
+            result[col] = levels[col].map(PEDRA_LEVELS)
+
+    for col in cols:
+        if col not in pedra_cols:
+            result[col] = result[col].fillna(MISSING_CATEGORY).astype(str)
+
+    return result
+
+
+def histogram_counts(values: np.ndarray, edges) -> np.ndarray:
+    """
+    Conta valores nos bins definidos por 'edges', com os bins extremos abertos.
+
+    Valores abaixo do primeiro/acima do último limite caem no primeiro/último bin,
+    o que permite comparar dados novos fora da faixa vista no treino.
+    Valores nulos são ignorados.
+    """
+    edges = np.asarray(edges, dtype=float)
+    values = np.asarray(values, dtype=float)
+    values = values[~np.isnan(values)]
+    bins = np.searchsorted(edges[1:-1], values, side="right")
+    return np.bincount(bins, minlength=len(edges) - 1)
+
+
+def population_stability_index(expected, actual_counts, eps: float = 1e-4) -> float:
+    """
+    Calcula o PSI (Population Stability Index) entre a referência e os dados atuais.
+
+    Interpretação usual: < 0.1 estável | 0.1 a 0.25 atenção | > 0.25 drift relevante.
+
+    Args:
+        expected: Proporções de referência por bin/categoria.
+        actual_counts: Contagens observadas nos mesmos bins/categorias.
+        eps (float): Piso para evitar log(0) em bins vazios.
+
+    Returns:
+        float: PSI (NaN se não houver observações).
+    """
+    actual_counts = np.asarray(actual_counts, dtype=float)
+    total = actual_counts.sum()
+    if total == 0:
+        return float("nan")
+
+    expected = np.clip(np.asarray(expected, dtype=float), eps, None)
+    actual = np.clip(actual_counts / total, eps, None)
+    return float(np.sum((actual - expected) * np.log(actual / expected)))
+
+
+def ks_statistic(expected, actual_counts) -> float:
+    """
+    Estatística KS aproximada: maior distância entre as CDFs acumuladas nos bins.
+    """
+    actual_counts = np.asarray(actual_counts, dtype=float)
+    total = actual_counts.sum()
+    if total == 0:
+        return float("nan")
+    cdf_expected = np.cumsum(np.asarray(expected, dtype=float))
+    cdf_actual = np.cumsum(actual_counts / total)
+    return float(np.max(np.abs(cdf_expected - cdf_actual)))
+
+
+def compute_reference_profile(X: pd.DataFrame, proba: np.ndarray) -> dict:
+    """
+    Calcula as distribuições de referência do treino para detecção de drift.
+
+    Conteúdo (compacto, serializável em JSON):
+    - Numéricas: limites dos decis, proporção por bin, taxa de nulos e quantis-resumo.
+    - Categóricas: frequência relativa de cada categoria (Pedras em níveis canônicos).
+    - Probabilidade: histograma em faixas fixas de 0.05 e quantis-resumo.
+
+    Os quantis de todas as features numéricas são obtidos em uma única chamada
+    vetorizada sobre a matriz de treino.
+
+    Args:
+        X (pd.DataFrame): Features de treino (formato bruto, antes do pipeline).
+        proba (np.ndarray): Probabilidades de risco previstas para X.
+
+    Returns:
+        dict: Perfil de referência.
+    """
+    numeric_cols = [c for c in NUMERIC_FEATURES if c in X.columns]
+    values = X[numeric_cols].to_numpy(dtype=float)
+
+    levels = np.linspace(0.0, 1.0, N_QUANTILE_BINS + 1)
+    summary_levels = [0.05, 0.25, 0.5, 0.75, 0.95]
+    all_levels = np.concatenate([levels, summary_levels])
+    quantiles = np.nanquantile(values, all_levels, axis=0)
+    null_rates = np.isnan(values).mean(axis=0)
+
+    numericas = {}
+    for j, col in enumerate(numeric_cols):
+        edges = np.unique(quantiles[: len(levels), j])
+        if len(edges) < 2:
+            # Feature constante: um único bin em torno do valor observado
+            edges = np.array([edges[0] - 0.5, edges[0] + 0.5])
+        counts = histogram_counts(values[:, j], edges)
+        numericas[col] = {
+            "edges": np.round(edges, 6).tolist(),
+            "proporcoes": np.round(counts / max(counts.sum(), 1), 6).tolist(),
+            "taxa_nulos": round(float(null_rates[j]), 6),
+            "quantis": {
+                f"p{int(q * 100):02d}": round(float(v), 6)
+                for q, v in zip(summary_levels, quantiles[len(levels) :, j])
+            },
+        }
+
+    categoricas = {}
+    for col, series in normalize_categories(X).items():
+        freqs = series.value_counts(normalize=True)
+        categoricas[col] = {str(k): round(float(v), 6) for k, v in freqs.items()}
+
+    proba = np.asarray(proba, dtype=float)
+    proba_counts = histogram_counts(proba, PROBA_EDGES)
+    return {
+        "n_amostras": int(len(X)),
+        "numericas": numericas,
+        "categoricas": categoricas,
+        "probabilidade": {
+            "edges": np.round(PROBA_EDGES, 6).tolist(),
+            "proporcoes": np.round(proba_counts / max(len(proba), 1), 6).tolist(),
+            "quantis": {
+                f"p{int(q * 100):02d}": round(float(v), 6)
+                for q, v in zip(summary_levels, np.quantile(proba, summary_levels))
+            },
+        },
+    }
+
+
+def save_reference_profile(profile: dict, path: Path):
+    """Grava o perfil de referência em JSON ao lado do artefato do modelo."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(profile, f, ensure_ascii=False, indent=1)
+    logger.info(f"Perfil de referência salvo em: {path}")
+
+
+def load_reference_profile(path: Path) -> dict:
+    """
+    Carrega o perfil de referência salvo no treino.
+
+    Returns:
+        dict: Perfil de referência, ou None se o arquivo não existir.
+    """
+    path = Path(path)
+    if not path.exists():
+        logger.warning(f"Perfil de referência não encontrado em {path}.")
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def format_drift_record(record: dict, proba: float, risco: bool) -> str:
+    """Monta a linha do log de drift (após o timestamp) no layout DRIFT_LOG_COLUMNS."""
+    extra = ",".join(
+        "" if record.get(col) is None else str(record[col])
+        for col in DRIFT_LOG_EXTRA_FIELDS
+    )
+    return (
+        f"{proba:.4f},{risco},{record.get('genero')},"
+        f"{record.get('instituicao_de_ensino')},{record.get('pedra_20')},{extra}"
+    )
+
+
+def _round_or_none(value: float, digits: int = 4):
+    return None if value is None or math.isnan(value) else round(value, digits)
+
+
+def psi_status(psi: float) -> str:
+    """Classifica o PSI em 'estavel', 'atencao' ou 'drift' (ou 'sem_dados')."""
+    if psi is None or math.isnan(psi):
+        return "sem_dados"
+    if psi >= PSI_DRIFT:
+        return "drift"
+    if psi >= PSI_WARNING:
+        return "atencao"
+    return "estavel"
+
+
+def quantiles_from_histogram(counts, lo: float, hi: float, levels) -> list:
+    """
+    Estima quantis a partir de um histograma de largura fixa em [lo, hi],
+    com interpolação linear dentro do bin (esboço de quantis em memória constante).
+    """
+    counts = np.asarray(counts, dtype=float)
+    total = counts.sum()
+    if total == 0:
+        return [None] * len(levels)
+
+    width = (hi - lo) / len(counts)
+    cdf = np.cumsum(counts) / total
+    result = []
+    for q in levels:
+        idx = int(min(np.searchsorted(cdf, q), len(counts) - 1))
+        prev = cdf[idx - 1] if idx > 0 else 0.0
+        frac = (q - prev) / (cdf[idx] - prev) if cdf[idx] > prev else 0.0
+        result.append(round(float(lo + (idx + frac) * width), 4))
+    return result
+
+
+class StreamingDriftMonitor:
+    """
+    Agregados de drift em memória, atualizados a cada predição em O(1).
+
+    Estrutura:
+    - Janela deslizante dividida em buckets de tempo (anel circular): buckets
+      expirados são zerados no momento da escrita, sem varrer o histórico.
+    - Numéricas: contagens nos bins do perfil de referência (PSI/KS) e um histograma
+      fino de largura fixa sobre a faixa do treino (esboço de quantis).
+    - Categóricas: contadores por categoria do treino, com posição extra para
+      categorias novas ('outros').
+    - Probabilidade de risco: mesmas faixas fixas do perfil de referência.
+
+    Os scores (PSI/KS) são calculados sob demanda a partir das contagens,
+    sem reler arquivos de log nem dados de treino.
+    """
+
+    def __init__(
+        self,
+        profile: dict,
+        window_seconds: int = 3600,
+        bucket_seconds: int = 60,
+        fine_bins: int = 100,
+        clock=time.time,
+    ):
+        self.profile = profile
+        self.bucket_seconds = bucket_seconds
+        self.n_buckets = max(1, math.ceil(window_seconds / bucket_seconds))
+        self.fine_bins = fine_bins
+        self.clock = clock
+        self._lock = threading.Lock()
+
+        # Numéricas: limites internos dos bins de referência e faixa do treino
+        self.numeric_features = list(profile["numericas"])
+        ref_edges = [v["edges"] for v in profile["numericas"].values()]
+        self.n_ref_bins = [len(e) - 1 for e in ref_edges]
+        self._inner_edges = [list(e[1:-1]) for e in ref_edges]
+        self._lo = [float(e[0]) for e in ref_edges]
+        self._hi = [float(e[-1]) for e in ref_edges]
+        self._width = [
+            hi - lo if hi > lo else 1.0 for lo, hi in zip(self._lo, self._hi)
+        ]
+
+        # Categóricas: vocabulário do treino + posição 'outros'
+        self.categorical_features = list(profile["categoricas"])
+        self._vocab = {
+            col: {cat: i for i, cat in enumerate(freqs)}
+            for col, freqs in profile["categoricas"].items()
+        }
+        max_vocab = max([len(v) for v in self._vocab.values()], default=0) + 1
+        self._pedra_map = PedraMapper().pedra_map
+
+        self.proba_edges = list(profile["probabilidade"]["edges"])
+        self._proba_inner_edges = self.proba_edges[1:-1]
+
+        n_num, n_cat = len(self.numeric_features), len(self.categorical_features)
+        self._bucket_ids = np.full(self.n_buckets, -1, dtype=np.int64)
+        self._n = np.zeros(self.n_buckets, dtype=np.int64)
+        self._ref_counts = np.zeros(
+            (self.n_buckets, n_num, max(self.n_ref_bins, default=1)), dtype=np.int64
+        )
+        self._fine_counts = np.zeros((self.n_buckets, n_num, fine_bins), dtype=np.int64)
+        self._nulls = np.zeros((self.n_buckets, n_num), dtype=np.int64)
+        self._cat_counts = np.zeros((self.n_buckets, n_cat, max_vocab), dtype=np.int64)
+        self._proba_counts = np.zeros(
+            (self.n_buckets, len(self.proba_edges) - 1), dtype=np.int64
+        )
+        self._proba_fine = np.zeros((self.n_buckets, fine_bins), dtype=np.int64)
+
+    def _category_index(self, col: str, value) -> int:
+        if col in PEDRA_FEATURES:
+            level = self._pedra_map.get(str(value).lower(), 0)
+            value = PEDRA_LEVELS[level]
+        elif value is None or (isinstance(value, float) and math.isnan(value)):
+            value = MISSING_CATEGORY
+        vocab = self._vocab[col]
+        return vocab.get(str(value), len(vocab))
+
+    def update(self, record: dict, proba: float):
+        """
+        Registra uma predição (entradas brutas + probabilidade) no bucket corrente.
+
+        Custo constante: uma busca binária por feature nos poucos limites de
+        referência e incrementos escalares nos contadores do bucket.
+        """
+        numeric_bins, numeric_nulls = [], []
+        for j, col in enumerate(self.numeric_features):
+            value = record.get(col)
+            if value is None or math.isnan(value):
+                numeric_nulls.append(j)
+                continue
+            ref_bin = bisect.bisect_right(self._inner_edges[j], value)
+            fine = int((value - self._lo[j]) / self._width[j] * self.fine_bins)
+            numeric_bins.append((j, ref_bin, min(max(fine, 0), self.fine_bins - 1)))
+
+        cat_idx = [
+            self._category_index(col, record.get(col))
+            for col in self.categorical_features
+        ]
+        proba_bin = bisect.bisect_right(self._proba_inner_edges, proba)
+        proba_fine = min(max(int(proba * self.fine_bins), 0), self.fine_bins - 1)
+
+        epoch = int(self.clock() // self.bucket_seconds)
+        slot = epoch % self.n_buckets
+
+        with self._lock:
+            if self._bucket_ids[slot] != epoch:
+                self._reset_slot(slot, epoch)
+            self._n[slot] += 1
+            ref_counts, fine_counts = self._ref_counts[slot], self._fine_counts[slot]
+            for j, ref_bin, fine in numeric_bins:
+                ref_counts[j, ref_bin] += 1
+                fine_counts[j, fine] += 1
+            for j in numeric_nulls:
+                self._nulls[slot, j] += 1
+            for i, idx in enumerate(cat_idx):
+                self._cat_counts[slot, i, idx] += 1
+            self._proba_counts[slot, proba_bin] += 1
+            self._proba_fine[slot, proba_fine] += 1
+
+    def _reset_slot(self, slot: int, epoch: int):
+        self._bucket_ids[slot] = epoch
+        self._n[slot] = 0
+        self._ref_counts[slot] = 0
+        self._fine_counts[slot] = 0
+        self._nulls[slot] = 0
+        self._cat_counts[slot] = 0
+        self._proba_counts[slot] = 0
+        self._proba_fine[slot] = 0
+
+    def snapshot(self, window_seconds: int = None) -> dict:
+        """
+        Calcula PSI/KS, quantis e proporções contra a referência na janela pedida.
+
+        Args:
+            window_seconds (int): Tamanho da janela (limitado à janela configurada).
+
+        Returns:
+            dict: Scores de drift por feature e da probabilidade de risco.
+        """
+        n_window = self.n_buckets
+        if window_seconds is not None:
+            n_window = min(
+                self.n_buckets, max(1, math.ceil(window_seconds / self.bucket_seconds))
+            )
+        current = int(self.clock() // self.bucket_seconds)
+
+        with self._lock:
+            active = (self._bucket_ids > current - n_window) & (self._bucket_ids >= 0)
+            n = int(self._n[active].sum())
+            ref_counts = self._ref_counts[active].sum(axis=0)
+            fine_counts = self._fine_counts[active].sum(axis=0)
+            nulls = self._nulls[active].sum(axis=0)
+            cat_counts = self._cat_counts[active].sum(axis=0)
+            proba_counts = self._proba_counts[active].sum(axis=0)
+            proba_fine = self._proba_fine[active].sum(axis=0)
+
+        levels = [0.05, 0.5, 0.95]
+        numericas = {}
+        for j, col in enumerate(self.numeric_features):
+            ref = self.profile["numericas"][col]
+            counts = ref_counts[j, : self.n_ref_bins[j]]
+            psi = population_stability_index(ref["proporcoes"], counts)
+            p05, p50, p95 = quantiles_from_histogram(
+                fine_counts[j], self._lo[j], self._hi[j], levels
+            )
+            numericas[col] = {
+                "psi": _round_or_none(psi),
+                "ks": _round_or_none(ks_statistic(ref["proporcoes"], counts)),
+                "status": psi_status(psi),
+                "taxa_nulos": round(float(nulls[j]) / n, 4) if n else None,
+                "taxa_nulos_referencia": ref["taxa_nulos"],
+                "quantis": {"p05": p05, "p50": p50, "p95": p95},
+                "quantis_referencia": {
+                    k: ref["quantis"][k] for k in ("p05", "p50", "p95")
+                },
+            }
+
+        categoricas = {}
+        for i, col in enumerate(self.categorical_features):
+            freqs = self.profile["categoricas"][col]
+            counts = cat_counts[i, : len(freqs) + 1]
+            expected = list(freqs.values()) + [0.0]
+            psi = population_stability_index(expected, counts)
+            total = counts.sum()
+            labels = list(freqs) + [OTHER_CATEGORY]
+            categoricas[col] = {
+                "psi": _round_or_none(psi),
+                "status": psi_status(psi),
+                "proporcoes": {
+                    label: round(float(c) / total, 4) if total else None
+                    for label, c in zip(labels, counts)
+                },
+            }
+
+        ref_proba = self.profile["probabilidade"]
+        psi = population_stability_index(ref_proba["proporcoes"], proba_counts)
+        p05, p50, p95 = quantiles_from_histogram(proba_fine, 0.0, 1.0, levels)
+
+        return {
+            "janela_segundos": n_window * self.bucket_seconds,
+            "n_predicoes": n,
+            "numericas": numericas,
+            "categoricas": categoricas,
+            "probabilidade": {
+                "psi": _round_or_none(psi),
+                "ks": _round_or_none(
+                    ks_statistic(ref_proba["proporcoes"], proba_counts)
+                ),
+                "status": psi_status(psi),
+                "quantis": {"p05": p05, "p50": p50, "p95": p95},
+                "quantis_referencia": {
+                    k: ref_proba["quantis"][k] for k in ("p05", "p50", "p95")
+                },
+            },
+        }
+
+
+def build_reference_from_artifact():
+    """
+    Gera o perfil de referência para um artefato já treinado, sem retreinar.
+    Útil para modelos serializados antes da existência do perfil.
+    """
+    root = get_project_root()
+    model_dir = root / "app" / "model"
+
+    try:
+        X_train = pd.read_csv(root / "data" / "processed" / "X_train.csv")
+    except FileNotFoundError:
+        logger.error("Arquivos não encontrados. Execute 'src.preprocessing' primeiro.")
+        return
+
+    pipeline = joblib.load(model_dir / "pipeline.joblib")
+    proba = pipeline.predict_proba(X_train)[:, 1]
+    save_reference_profile(
+        compute_reference_profile(X_train, proba), model_dir / REFERENCE_PROFILE_NAME
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ferramentas de Data Drift.")
+    parser.add_argument(
+        "--build-reference",
+        action="store_true",
+        help="Gera o perfil de referência para o artefato atual (sem retreinar).",
+    )
+    args = parser.parse_args()
+
+    if args.build_reference:
+        build_reference_from_artifact()
+    else:
+        parser.print_help()
@@ -0,0 +1,353 @@
+import argparse
+import json
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from src.utils import log_segments_for_window, setup_logger
+from src.drift import (
+    DRIFT_LOG_COLUMNS,
+    NUMERIC_FEATURES,
+    OTHER_CATEGORY,
+    REFERENCE_PROFILE_NAME,
+    load_reference_profile,
+    normalize_categories,
+    population_stability_index,
+    psi_status,
+)
+from src.risk_bands import BAND_NAMES, DEFAULT_THRESHOLDS, assign_bands
+
+logger = setup_logger("drift_report")
+
+
+def get_project_root() -> Path:
+    return Path(__file__).resolve().parent.parent
+
+
+def period_codes(dates: pd.Series, freq: str) -> np.ndarray:
+    """
+    Converte datas em códigos inteiros de período (dias ou semanas desde 1970-01-01).
+    Semanas começam na segunda-feira. Datas inválidas recebem -1.
+    """
+    days = dates.to_numpy(dtype="datetime64[D]").astype(np.int64)
+    invalid = dates.isna().to_numpy()
+    if freq == "W":
+        # 1970-01-01 foi uma quinta-feira: +3 alinha o início da semana à segunda
+        days = (days + 3) // 7
+    return np.where(invalid, -1, days)
+
+
+def period_label(code: int, freq: str) -> str:
+    """Converte o código de período de volta para a data inicial (ISO)."""
+    days = code * 7 - 3 if freq == "W" else code
+    return str(np.datetime64(int(days), "D"))
+
+
+def _grouped_bincount(groups: np.ndarray, bins: np.ndarray, n_groups: int, n_bins: int):
+    """Histograma 2D (período x bin) em uma única chamada vetorizada."""
+    flat = np.bincount(groups * n_bins + bins, minlength=n_groups * n_bins)
+    return flat.reshape(n_groups, n_bins)
+
+
+class DriftAccumulator:
+    """
+    Acumula histogramas por período em memória proporcional ao número de períodos,
+    independente do tamanho do log.
+    """
+
+    def __init__(self, profile: dict, thresholds: dict = None):
+        self.profile = profile
+        self.thresholds = thresholds or DEFAULT_THRESHOLDS
+        self.numeric = {
+            col: np.asarray(ref["edges"], dtype=float)
+            for col, ref in profile["numericas"].items()
+        }
+        self.categorical = {
+            col: list(freqs) for col, freqs in profile["categoricas"].items()
+        }
+        self.proba_edges = np.asarray(profile["probabilidade"]["edges"], dtype=float)
+        self.periods = {}
+
+    def _period_state(self, code: int) -> dict:
+        if code not in self.periods:
+            self.periods[code] = {
+                "n": 0,
+                "numericas": {
+                    col: np.zeros(len(edges) - 1, dtype=np.int64)
+                    for col, edges in self.numeric.items()
+                },
+                "categoricas": {
+                    col: np.zeros(len(vocab) + 1, dtype=np.int64)
+                    for col, vocab in self.categorical.items()
+                },
+                "probabilidade": np.zeros(len(self.proba_edges) - 1, dtype=np.int64),
+                "faixas": np.zeros(len(BAND_NAMES), dtype=np.int64),
+            }
+        return self.periods[code]
+
+    def update(self, chunk: pd.DataFrame, freq: str):
+        """Atualiza os histogramas com um bloco do log."""
+        dates = pd.to_datetime(
+            chunk["data"], format="%Y-%m-%d %H:%M:%S", errors="coerce"
+        )
+        codes = period_codes(dates, freq)
+        valid = codes >= 0
+        chunk, codes = chunk[valid], codes[valid]
+        if chunk.empty:
+            return
+
+        uniq, groups = np.unique(codes, return_inverse=True)
+        states = [self._period_state(int(code)) for code in uniq]
+        counts = np.bincount(groups, minlength=len(uniq))
+
+        def add(key, col, matrix):
+            for state, row in zip(states, matrix):
+                target = state[key] if col is None else state[key][col]
+                target += row
+
+        for state, n in zip(states, counts):
+            state["n"] += int(n)
+
+        for col, edges in self.numeric.items():
+            if col not in chunk.columns:
+                continue
+            values = chunk[col].to_numpy(dtype=float)
+            present = ~np.isnan(values)
+            bins = np.searchsorted(edges[1:-1], values[present], side="right")
+            add(
+                "numericas",
+                col,
+                _grouped_bincount(groups[present], bins, len(uniq), len(edges) - 1),
+            )
+
+        for col, vocab in self.categorical.items():
+            if col not in chunk.columns:
+                continue
+            # Normaliza apenas os valores distintos do bloco (poucos) e propaga pelos códigos.
+            # O código -1 (nulo) indexa o último elemento, reservado ao valor nulo.
+            codes, uniques = pd.factorize(chunk[col])
+            distinct = pd.DataFrame({col: list(uniques) + [None]})
+            lookup = pd.Categorical(
+                normalize_categories(distinct)[col], categories=vocab
+            ).codes
+            lookup = np.where(lookup < 0, len(vocab), lookup)
+            add(
+                "categoricas",
+                col,
+                _grouped_bincount(groups, lookup[codes], len(uniq), len(vocab) + 1),
+            )
+
+        proba = chunk["probabilidade"].to_numpy(dtype=float)
+        present = ~np.isnan(proba)
+        n_proba_bins = len(self.proba_edges) - 1
+        bins = np.searchsorted(self.proba_edges[1:-1], proba[present], side="right")
+        add(
+            "probabilidade",
+            None,
+            _grouped_bincount(groups[present], bins, len(uniq), n_proba_bins),
+        )
+        bands = assign_bands(proba[present], self.thresholds)
+        add(
+            "faixas",
+            None,
+            _grouped_bincount(groups[present], bands, len(uniq), len(BAND_NAMES)),
+        )
+
+    def reference_band_shares(self) -> np.ndarray:
+        """Proporção de alunos por faixa de risco no treino (via histograma de referência)."""
+        left_edges = self.proba_edges[:-1]
+        bands = assign_bands(left_edges, self.thresholds)
+        props = np.asarray(self.profile["probabilidade"]["proporcoes"], dtype=float)
+        return np.bincount(bands, weights=props, minlength=len(BAND_NAMES))
+
+    def report(self, freq: str) -> dict:
+        """Consolida PSI por feature e deslocamento das faixas de risco por período."""
+        ref_bands = self.reference_band_shares()
+        periods = []
+        for code in sorted(self.periods):
+            state = self.periods[code]
+            features = {}
+            for col, counts in state["numericas"].items():
+                psi = population_stability_index(
+                    self.profile["numericas"][col]["proporcoes"], counts
+                )
+                features[col] = psi
+            for col, counts in state["categoricas"].items():
+                expected = list(self.profile["categoricas"][col].values()) + [0.0]
+                features[col] = population_stability_index(expected, counts)
+
+            proba_psi = population_stability_index(
+                self.profile["probabilidade"]["proporcoes"], state["probabilidade"]
+            )
+            band_total = max(state["faixas"].sum(), 1)
+            band_shares = state["faixas"] / band_total
+
+            periods.append(
+                {
+                    "periodo": period_label(code, freq),
+                    "n_predicoes": state["n"],
+                    "psi": {
+                        col: (None if np.isnan(v) else round(float(v), 4))
+                        for col, v in features.items()
+                    },
+                    "status": {col: psi_status(v) for col, v in features.items()},
+                    "psi_probabilidade": (
+                        None if np.isnan(proba_psi) else round(float(proba_psi), 4)
+                    ),
+                    "faixas_risco": {
+                        name: {
+                            "proporcao": round(float(share), 4),
+                            "referencia": round(float(ref), 4),
+                            "variacao": round(float(share - ref), 4),
+                        }
+                        for name, share, ref in zip(BAND_NAMES, band_shares, ref_bands)
+                    },
+                    "categorias_novas": {
+                        col: int(counts[-1])
+                        for col, counts in state["categoricas"].items()
+                        if counts[-1] > 0
+                    },
+                }
+            )
+
+        return {
+            "frequencia": freq,
+            "limiares": self.thresholds,
+            "categoria_nova": OTHER_CATEGORY,
+            "periodos": periods,
+        }
+
+
+def iter_drift_log(paths, chunksize: int = 500_000):
+    """
+    Lê o(s) arquivo(s) de log de drift em blocos, no layout DRIFT_LOG_COLUMNS.
+    Linhas antigas (com menos colunas) são completadas com nulos.
+
+    Colunas numéricas são lidas diretamente como float pelo parser C e as
+    categóricas como 'category', evitando conversões linha a linha.
+    """
+    dtypes = {col: "category" for col in DRIFT_LOG_COLUMNS}
+    dtypes.update({col: float for col in ["probabilidade"] + NUMERIC_FEATURES})
+    dtypes.update({"data": str, "milissegundos": str})
+
+    for path in paths:
+        yield from pd.read_csv(
+            path,
+            header=None,
+            names=DRIFT_LOG_COLUMNS,
+            dtype=dtypes,
+            chunksize=chunksize,
+            on_bad_lines="skip",
+            encoding="utf-8",
+        )
+
+
+def generate_drift_report(
+    log_paths: list,
+    profile: dict,
+    freq: str = "D",
+    chunksize: int = 500_000,
+    thresholds: dict = None,
+    start: str = None,
+    end: str = None,
+) -> dict:
+    """
+    Gera o relatório de drift offline a partir do log de inferência.
+
+    O log é processado em blocos e cada bloco é histogramado de forma vetorizada
+    contra o perfil de referência do treino, mantendo memória constante em
+    relação ao tamanho do log.
+
+    Args:
+        log_paths (list): Arquivos de log de drift a processar (em ordem).
+        profile (dict): Perfil de referência do treino.
+        freq (str): 'D' (diário) ou 'W' (semanal).
+        chunksize (int): Linhas por bloco de leitura.
+        thresholds (dict): Limiares das faixas de risco (padrão: 0.75/0.80/0.85).
+        start (str): Descarta linhas anteriores a esta data ('YYYY-MM-DD[ HH:MM:SS]').
+        end (str): Descarta linhas posteriores a esta data (inclusivo).
+
+    Returns:
+        dict: Relatório com PSI por feature e faixas de risco por período.
+    """
+    accumulator = DriftAccumulator(profile, thresholds)
+    started = time.perf_counter()
+    n_rows = 0
+
+    # Datas sem horário cobrem o dia inteiro no fim da janela
+    end = end + " 23:59:59" if end is not None and len(end) == 10 else end
+
+    for chunk in iter_drift_log(log_paths, chunksize=chunksize):
+        # Comparação lexicográfica: o timestamp do log é 'YYYY-MM-DD HH:MM:SS'
+        if start is not None:
+            chunk = chunk[chunk["data"] >= start]
+        if end is not None:
+            chunk = chunk[chunk["data"] <= end]
+        accumulator.update(chunk, freq)
+        n_rows += len(chunk)
+
+    report = accumulator.report(freq)
+    report["linhas_processadas"] = n_rows
+    report["tempo_processamento_s"] = round(time.perf_counter() - started, 3)
+    logger.info(
+        f"Relatório de drift: {n_rows} linhas, {len(report['periodos'])} períodos "
+        f"em {report['tempo_processamento_s']}s."
+    )
+    return report
+
+
+if __name__ == "__main__":
+    root = get_project_root()
+    parser = argparse.ArgumentParser(description="Relatório offline de Data Drift.")
+    parser.add_argument(
+        "--log",
+        type=Path,
+        nargs="+",
+        default=None,
+        help="Arquivos de log explícitos (padrão: segmentos de logs/drift_data.csv).",
+    )
+    parser.add_argument("--inicio", default=None, help="Data inicial (YYYY-MM-DD).")
+    parser.add_argument("--fim", default=None, help="Data final (YYYY-MM-DD).")
+    parser.add_argument(
+        "--reference",
+        type=Path,
+        default=root / "app" / "model" / REFERENCE_PROFILE_NAME,
+    )
+    parser.add_argument("--freq", choices=["D", "W"], default="D")
+    parser.add_argument("--chunksize", type=int, default=500_000)
+    parser.add_argument(
+        "--output", type=Path, default=root / "reports" / "drift_report.json"
+    )
+    args = parser.parse_args()
+
+    # Sem arquivos explícitos, o índice de segmentos restringe a leitura à janela
+    log_paths = args.log or log_segments_for_window(
+        root / "logs" / "drift_data.csv", start=args.inicio, end=args.fim
+    )
+
+    profile = load_reference_profile(args.reference)
+    if profile is None:
+        logger.error("Perfil de referência ausente. Execute o treinamento primeiro.")
+    else:
+        report = generate_drift_report(
+            log_paths,
+            profile,
+            freq=args.freq,
+            chunksize=args.chunksize,
+            start=args.inicio,
+            end=args.fim,
+        )
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+        for period in report["periodos"]:
+            drifted = [c for c, s in period["status"].items() if s == "drift"]
+            logger.info(
+                f"{period['periodo']}: n={period['n_predicoes']} | "
+                f"PSI prob.={period['psi_probabilidade']} | "
+                f"features em drift: {drifted or 'nenhuma'}"
+            )
+        logger.info(f"Relatório salvo em: {args.output}")
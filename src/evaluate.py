@@ -1,19 +1,40 @@
+import argparse
+import time
 import joblib
+import numpy as np
 import pandas as pd
 import sklearn
 from pathlib import Path
-from sklearn.metrics import classification_report, confusion_matrix, accuracy_score
+from joblib import Parallel, delayed
+from sklearn.metrics import classification_report
 
+from src.risk_bands import (
+    BAND_NAMES,
+    DEFAULT_THRESHOLDS,
+    THRESHOLDS_NAME,
+    assign_bands,
+    load_thresholds,
+)
 from src.utils import setup_logger
 
 # Import necessário para o joblib reconhecer as classes customizadas ao carregar o pipeline
-from src.feature_engineering import PedraMapper, BinaryCleaner  # noqa: F401
+from src.feature_engineering import (  # noqa: F401
+    PedraMapper,
+    BinaryCleaner,
+    IncrementalPreprocessor,
+)
 
 # Garante output pandas
 sklearn.set_config(transform_output="pandas")
 
 logger = setup_logger("evaluate")
 
+TARGET_NAMES = ["Sem Risco (0)", "Risco (1)"]
+# Bins do histograma de probabilidades de risco (decis)
+PROBA_BINS = np.linspace(0.0, 1.0, 11)
+# Células conjuntas (tn/fp/fn/tp x faixa de risco) usadas no bootstrap
+N_CELLS = 4 * len(BAND_NAMES)
+
 
 def get_project_root() -> Path:
     """
@@ -25,15 +46,287 @@ def get_project_root() -> Path:
     return Path(__file__).resolve().parent.parent
 
 
-def evaluate_model():
+class StreamingMetrics:
+    """
+    Acumuladores incrementais das métricas de avaliação (classe binária).
+
+    Mantém apenas a matriz de confusão 2x2 e o histograma das probabilidades,
+    de modo que a memória independe do tamanho do conjunto avaliado.
+    """
+
+    def __init__(
+        self,
+        bins: np.ndarray = PROBA_BINS,
+        keep_cells: bool = False,
+        thresholds: dict = None,
+    ):
+        self.bins = bins
+        # Ordem de confusion_matrix().ravel(): tn, fp, fn, tp
+        self.counts = np.zeros(4, dtype=np.int64)
+        self.proba_hist = np.zeros(len(bins) - 1, dtype=np.int64)
+        # Opcional (bootstrap): 1 byte por linha com a célula conjunta da matriz e faixa
+        self.keep_cells = keep_cells
+        # Limiares das faixas gravadas nas células (os mesmos servidos pela API)
+        self.thresholds = thresholds or dict(DEFAULT_THRESHOLDS)
+        # Limiar de decisão das predições acumuladas (None = argmax)
+        self.decision_threshold = None
+        self._cells = []
+
+    def update(self, y_true, y_pred, proba=None):
+        """Incorpora um bloco de rótulos, predições e (opcional) probabilidades."""
+        y_true = np.asarray(y_true, dtype=int)
+        y_pred = np.asarray(y_pred, dtype=int)
+        confusion = y_true * 2 + y_pred
+        self.counts += np.bincount(confusion, minlength=4)
+        if proba is not None:
+            self.proba_hist += np.histogram(np.clip(proba, 0, 1), bins=self.bins)[0]
+        if self.keep_cells:
+            bands = assign_bands(proba, self.thresholds) if proba is not None else 0
+            self._cells.append((confusion * len(BAND_NAMES) + bands).astype(np.int8))
+
+    def cells(self) -> np.ndarray:
+        """Célula conjunta de cada linha: (tn/fp/fn/tp) * n_faixas + faixa."""
+        return np.concatenate(self._cells) if self._cells else np.empty(0, np.int8)
+
+    @property
+    def n(self) -> int:
+        return int(self.counts.sum())
+
+    def confusion_matrix(self) -> np.ndarray:
+        return self.counts.reshape(2, 2)
+
+    def accuracy(self) -> float:
+        tn, fp, fn, tp = self.counts
+        return (tn + tp) / self.n if self.n else 0.0
+
+    def recall(self) -> float:
+        tn, fp, fn, tp = self.counts
+        return tp / (tp + fn) if tp + fn else 0.0
+
+    def precision(self) -> float:
+        tn, fp, fn, tp = self.counts
+        return tp / (tp + fp) if tp + fp else 0.0
+
+    def classification_report(
+        self, target_names: list = TARGET_NAMES, digits: int = 2
+    ) -> str:
+        """
+        Mesmo texto do sklearn.metrics.classification_report sobre os arrays completos.
+
+        As métricas vêm do próprio sklearn, com as 4 células da matriz de confusão
+        como pesos (sample_weight); apenas a formatação é refeita para manter o
+        suporte como inteiro.
+        """
+        metrics = classification_report(
+            [0, 0, 1, 1],
+            [0, 1, 0, 1],
+            sample_weight=self.counts,
+            target_names=target_names,
+            zero_division=0,
+            output_dict=True,
+        )
+        headers = ["precision", "recall", "f1-score", "support"]
+        width = max(
+            max(len(name) for name in target_names), len("weighted avg"), digits
+        )
+        row_fmt = "{:>{width}s} " + " {:>9.{digits}f}" * 3 + " {:>9}\n"
+
+        report = ("{:>{width}s} " + " {:>9}" * 4).format("", *headers, width=width)
+        report += "\n\n"
+        for name in target_names:
+            row = metrics[name]
+            report += row_fmt.format(
+                name,
+                row["precision"],
+                row["recall"],
+                row["f1-score"],
+                int(round(row["support"])),
+                width=width,
+                digits=digits,
+            )
+        report += "\n"
+        report += (
+            "{:>{width}s} " + " {:>9.{digits}}" * 2 + " {:>9.{digits}f}" + " {:>9}\n"
+        ).format(
+            "accuracy", "", "", metrics["accuracy"], self.n, width=width, digits=digits
+        )
+        for average in ["macro avg", "weighted avg"]:
+            row = metrics[average]
+            report += row_fmt.format(
+                average,
+                row["precision"],
+                row["recall"],
+                row["f1-score"],
+                self.n,
+                width=width,
+                digits=digits,
+            )
+        return report
+
+
+def _bootstrap_batch(cells: np.ndarray, size: int, seed) -> np.ndarray:
+    """
+    Contagens por célula de 'size' reamostragens (matriz de índices size x n).
+    Uma única bincount sobre as células deslocadas por reamostragem.
+    """
+    rng = np.random.default_rng(seed)
+    n = len(cells)
+    idx = rng.integers(0, n, size=(size, n))
+    offsets = (np.arange(size) * N_CELLS)[:, None]
+    flat = (cells[idx] + offsets).ravel()
+    return np.bincount(flat, minlength=size * N_CELLS).reshape(size, N_CELLS)
+
+
+def bootstrap_metrics(
+    cells: np.ndarray,
+    n_resamples: int = 10_000,
+    seed: int = 42,
+    n_jobs: int = -1,
+    batch_size: int = 500,
+    confidence: float = 0.95,
+    decision_threshold: float = None,
+) -> dict:
+    """
+    Intervalos de confiança por bootstrap (percentil) das métricas de avaliação.
+
+    As reamostragens são divididas em lotes de tamanho fixo, cada um com sua
+    semente derivada (SeedSequence.spawn) e distribuídos entre os núcleos via
+    joblib: o resultado depende apenas de 'seed', não de 'n_jobs'.
+
+    Args:
+        cells (np.ndarray): Células conjuntas por linha (StreamingMetrics.cells()),
+            com as faixas atribuídas pelos limiares do StreamingMetrics.
+        n_resamples (int): Número de reamostragens.
+        seed (int): Semente para reprodutibilidade.
+        n_jobs (int): Processos paralelos (-1 = todos os núcleos).
+        batch_size (int): Reamostragens por lote.
+        confidence (float): Nível de confiança do intervalo.
+        decision_threshold (float): Limiar de decisão com que as células foram
+            acumuladas (StreamingMetrics.decision_threshold), registrado no
+            resultado; None = argmax.
+
+    Returns:
+        dict: Estimativa pontual e intervalo de recall, precisão, acurácia e das
+            contagens por faixa de risco, além do tempo de execução.
+    """
+    started = time.perf_counter()
+    sizes = [batch_size] * (n_resamples // batch_size)
+    if n_resamples % batch_size:
+        sizes.append(n_resamples % batch_size)
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+
+    batches = Parallel(n_jobs=n_jobs)(
+        delayed(_bootstrap_batch)(cells, size, child)
+        for size, child in zip(sizes, seeds)
+    )
+    counts = np.vstack(batches)
+    elapsed = time.perf_counter() - started
+
+    def summarize(samples: np.ndarray, observed: float) -> dict:
+        lo, hi = np.nanpercentile(
+            samples, [100 * (1 - confidence) / 2, 100 * (1 + confidence) / 2]
+        )
+        return {
+            "estimativa": round(float(observed), 4),
+            "ic_inferior": round(float(lo), 4),
+            "ic_superior": round(float(hi), 4),
+        }
+
+    def metrics_from(table: np.ndarray) -> dict:
+        # Colunas: tn, fp, fn, tp (somando as faixas) e faixas (somando a matriz)
+        confusion = table.reshape(-1, 4, len(BAND_NAMES)).sum(axis=2).astype(float)
+        bands = table.reshape(-1, 4, len(BAND_NAMES)).sum(axis=1)
+        tn, fp, fn, tp = confusion.T
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return {
+                "recall_risco": tp / (tp + fn),
+                "precisao_risco": tp / (tp + fp),
+                "acuracia": (tn + tp) / confusion.sum(axis=1),
+                **{f"alunos_{name}": bands[:, i] for i, name in enumerate(BAND_NAMES)},
+            }
+
+    observed = metrics_from(np.bincount(cells, minlength=N_CELLS)[None, :])
+    sampled = metrics_from(counts)
+    return {
+        "reamostragens": n_resamples,
+        "semente": seed,
+        "confianca": confidence,
+        "limiar_decisao": decision_threshold,
+        "n_alunos": int(len(cells)),
+        "tempo_segundos": round(elapsed, 3),
+        "metricas": {
+            name: summarize(sampled[name], observed[name][0]) for name in sampled
+        },
+    }
+
+
+def iter_test_chunks(data_dir: Path, chunksize: int = None):
+    """
+    Lê X_test/y_test em blocos alinhados (chunksize=None carrega tudo de uma vez).
+    """
+    if chunksize is None:
+        yield pd.read_csv(data_dir / "X_test.csv"), pd.read_csv(data_dir / "y_test.csv")
+        return
+    yield from zip(
+        pd.read_csv(data_dir / "X_test.csv", chunksize=chunksize),
+        pd.read_csv(data_dir / "y_test.csv", chunksize=chunksize),
+    )
+
+
+def accumulate_metrics(
+    pipeline,
+    chunks,
+    keep_cells: bool = False,
+    thresholds: dict = None,
+    decision_threshold: float = None,
+) -> StreamingMetrics:
+    """
+    Pontua os blocos (X, y) e atualiza os acumuladores.
+    A classe prevista é proba >= decision_threshold (limiar calibrado, a mesma
+    decisão da API) ou, sem limiar, o argmax de predict_proba (a do predict);
+    as faixas de risco seguem 'thresholds' (padrão: DEFAULT_THRESHOLDS).
+    """
+    metrics = StreamingMetrics(keep_cells=keep_cells, thresholds=thresholds)
+    metrics.decision_threshold = decision_threshold
+    for X_chunk, y_chunk in chunks:
+        y_true = y_chunk.to_numpy().ravel()
+        if hasattr(pipeline, "predict_proba"):
+            proba = np.asarray(pipeline.predict_proba(X_chunk))
+            if decision_threshold is not None:
+                y_pred = (proba[:, 1] >= decision_threshold).astype(int)
+            else:
+                y_pred = np.asarray(pipeline.classes_)[proba.argmax(axis=1)]
+            metrics.update(y_true, y_pred, proba[:, 1])
+        else:
+            metrics.update(y_true, pipeline.predict(X_chunk))
+    return metrics
+
+
+def evaluate_model(
+    chunksize: int = None,
+    bootstrap: int = 0,
+    seed: int = 42,
+    n_jobs: int = -1,
+    thresholds_path: Path = None,
+):
     """
     Executa a avaliação do modelo treinado utilizando o conjunto de teste.
 
     Fluxo:
     1. Carrega o pipeline serializado (.joblib).
-    2. Carrega os dados de teste processados (X_test, y_test).
-    3. Gera predições e calcula métricas.
-    4. Exibe relatório de classificação e matriz de confusão.
+    2. Lê os dados de teste processados (X_test, y_test), inteiros ou em blocos.
+    3. Gera predições e acumula as métricas incrementalmente.
+    4. Exibe relatório de classificação, matriz de confusão e a distribuição
+       das probabilidades de risco.
+
+    Com chunksize, a memória independe do tamanho do conjunto de teste
+    (ex: exportações históricas completas). Com bootstrap > 0, reporta também
+    intervalos de confiança (95%) de recall, precisão, acurácia e contagens por
+    faixa de risco, a partir de 1 byte retido por aluno. As faixas usam os
+    limiares calibrados de 'thresholds_path' (padrão: app/model/thresholds.json,
+    o mesmo arquivo servido pela API), ou os padrões se ele não existir; o
+    limiar de decisão calibrado ('decisao'), quando presente, define a classe
+    prevista como na API.
 
     Métrica de Negócio (KPI):
     O foco da avaliação é o RECALL da classe positiva (1 - Risco).
@@ -44,6 +337,7 @@ def evaluate_model():
     root = get_project_root()
     data_dir = root / "data" / "processed"
     model_path = root / "app" / "model" / "pipeline.joblib"
+    thresholds_path = thresholds_path or root / "app" / "model" / THRESHOLDS_NAME
 
     if not model_path.exists():
         logger.error("Modelo não encontrado. Execute o treinamento primeiro.")
@@ -54,72 +348,139 @@ def evaluate_model():
     try:
         # Carrega o pipeline treinado
         pipeline = joblib.load(model_path)
-
-        # Carrega os dados de teste processados (CSV)
-        # Usamos read_csv direto para evitar re-processamento desnecessário
-        X_test = pd.read_csv(data_dir / "X_test.csv")
-        y_test_df = pd.read_csv(data_dir / "y_test.csv")
-        y_test = y_test_df.values.ravel()
-
-        logger.info(f"Dados de teste carregados: {X_test.shape}")
-
     except Exception as e:
         logger.error(f"Erro ao carregar recursos: {e}")
         return
 
+    try:
+        thresholds, decision_threshold = load_thresholds(thresholds_path)
+    except (ValueError, KeyError) as e:
+        logger.error(f"Limiares calibrados inválidos, usando os padrões: {e}")
+        thresholds, decision_threshold = dict(DEFAULT_THRESHOLDS), None
+
+    # Usamos read_csv direto (CSV processado) para evitar re-processamento desnecessário
     logger.info("Realizando predições...")
     try:
-        y_pred = pipeline.predict(X_test)
+        metrics = accumulate_metrics(
+            pipeline,
+            iter_test_chunks(data_dir, chunksize),
+            keep_cells=bootstrap > 0,
+            thresholds=thresholds,
+            decision_threshold=decision_threshold,
+        )
+    except FileNotFoundError as e:
+        logger.error(f"Erro ao carregar recursos: {e}")
+        return
     except Exception as e:
         logger.critical(f"Erro ao realizar predição: {e}")
         return
 
+    logger.info(f"Dados de teste avaliados: {metrics.n} linhas")
+
     # Relatórios
     logger.info("Gerando métricas...")
 
     # Acurácia Geral
-    acc = accuracy_score(y_test, y_pred)
-    logger.info(f"Acurácia Global: {acc:.2%}")
+    logger.info(f"Acurácia Global: {metrics.accuracy():.2%}")
 
     # Relatório Detalhado
-    report = classification_report(
-        y_test, y_pred, target_names=["Sem Risco (0)", "Risco (1)"], zero_division=0
-    )
-
-    # Matriz de Confusão
-    cm = confusion_matrix(y_test, y_pred)
+    report = metrics.classification_report()
 
     print("\n" + "=" * 60)
     print("RELATÓRIO DE AVALIAÇÃO DO MODELO (BASELINE)")
     print("=" * 60)
+    if decision_threshold is not None:
+        print(f"Limiar de decisão: {decision_threshold:.4f} (calibrado, o da API)")
+    else:
+        print("Limiar de decisão: argmax de predict_proba (sem limiar calibrado)")
     print(report)
     print("-" * 30)
 
-    try:
-        tn, fp, fn, tp = cm.ravel()
-        print("MATRIZ DE CONFUSÃO:")
-        print(f"Verdadeiros Negativos (Sem Risco e previu Sem Risco): {tn}")
-        print(f"Falsos Positivos      (Sem Risco mas previu Risco):   {fp}")
-        print(
-            f"Falsos Negativos      (Risco mas previu Sem Risco):   {fn}  <-- PONTO CRÍTICO"
-        )
-        print(f"Verdadeiros Positivos (Risco e previu Risco):         {tp}")
-        print("-" * 30)
+    # Matriz de confusão acumulada (sempre 2x2)
+    tn, fp, fn, tp = metrics.counts
+    print("MATRIZ DE CONFUSÃO:")
+    print(f"Verdadeiros Negativos (Sem Risco e previu Sem Risco): {tn}")
+    print(f"Falsos Positivos      (Sem Risco mas previu Risco):   {fp}")
+    print(
+        f"Falsos Negativos      (Risco mas previu Sem Risco):   {fn}  <-- PONTO CRÍTICO"
+    )
+    print(f"Verdadeiros Positivos (Risco e previu Risco):         {tp}")
+    print("-" * 30)
 
-        denominator = fn + tp
-        if denominator > 0:
-            recall_risco = tp / denominator
-            print(f"METRICA DE NEGÓCIO (RECALL - CLASSE DE RISCO): {recall_risco:.2%}")
-            print("Interpretação: De todos os alunos que realmente têm risco,")
-            print(f"o modelo conseguiu identificar {recall_risco:.2%} deles.")
-        else:
-            logger.warning("Não há exemplos positivos no conjunto de teste.")
+    denominator = fn + tp
+    if denominator > 0:
+        recall_risco = metrics.recall()
+        print(f"METRICA DE NEGÓCIO (RECALL - CLASSE DE RISCO): {recall_risco:.2%}")
+        print("Interpretação: De todos os alunos que realmente têm risco,")
+        print(f"o modelo conseguiu identificar {recall_risco:.2%} deles.")
+    else:
+        logger.warning("Não há exemplos positivos no conjunto de teste.")
+
+    if metrics.proba_hist.sum() > 0:
+        print("-" * 30)
+        print("DISTRIBUIÇÃO DAS PROBABILIDADES DE RISCO:")
+        for lo, hi, count in zip(
+            metrics.bins[:-1], metrics.bins[1:], metrics.proba_hist
+        ):
+            print(f"[{lo:.1f}, {hi:.1f}): {count:>8}  ({count / metrics.n:.1%})")
 
-    except ValueError:
-        logger.warning(f"Matriz de confusão com formato inesperado: {cm.shape}")
+    if bootstrap > 0:
+        ci = bootstrap_metrics(
+            metrics.cells(),
+            n_resamples=bootstrap,
+            seed=seed,
+            n_jobs=n_jobs,
+            decision_threshold=metrics.decision_threshold,
+        )
+        logger.info(
+            f"Bootstrap: {bootstrap} reamostragens em {ci['tempo_segundos']:.2f}s "
+            f"(n_jobs={n_jobs}, semente={seed})"
+        )
+        print("-" * 30)
+        print(f"INTERVALOS DE CONFIANÇA (BOOTSTRAP {ci['confianca']:.0%}):")
+        print(
+            "Limiares das faixas: "
+            + ", ".join(f"{name}={value:.2f}" for name, value in thresholds.items())
+        )
+        for name, values in ci["metricas"].items():
+            print(
+                f"{name:<22} {values['estimativa']:>9.4g}  "
+                f"[{values['ic_inferior']:.4g}, {values['ic_superior']:.4g}]"
+            )
 
     print("=" * 60 + "\n")
+    return metrics
 
 
 if __name__ == "__main__":
-    evaluate_model()
+    parser = argparse.ArgumentParser(
+        description="Avaliação do modelo no conjunto de teste."
+    )
+    parser.add_argument(
+        "--chunksize",
+        type=int,
+        default=None,
+        help="Avalia em blocos de N linhas (memória constante para bases grandes).",
+    )
+    parser.add_argument(
+        "--bootstrap",
+        type=int,
+        default=0,
+        help="Número de reamostragens para intervalos de confiança (0 desativa).",
+    )
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--n-jobs", type=int, default=-1)
+    parser.add_argument(
+        "--thresholds",
+        type=Path,
+        default=None,
+        help="Limiares das faixas (padrão: app/model/thresholds.json, o da API).",
+    )
+    args = parser.parse_args()
+    evaluate_model(
+        chunksize=args.chunksize,
+        bootstrap=args.bootstrap,
+        seed=args.seed,
+        n_jobs=args.n_jobs,
+        thresholds_path=args.thresholds,
+    )
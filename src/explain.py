@@ -0,0 +1,100 @@
+import numpy as np
+import pandas as pd
+from sklearn.pipeline import Pipeline
+
+from src.utils import setup_logger
+
+logger = setup_logger("explain")
+
+
+def feature_origins(pipeline: Pipeline) -> list:
+    """
+    Mapeia cada feature transformada para a coluna original que a gerou.
+
+    Usa as colunas de entrada de cada transformer do ColumnTransformer: a saída
+    é atribuída à coluna de mesmo nome ou, no caso do OneHotEncoder
+    ('instituicao_de_ensino_Escola Pública'), à coluna com o maior prefixo 'coluna_'.
+
+    Args:
+        pipeline (Pipeline): Pipeline treinado (create_pipeline).
+
+    Returns:
+        list: Nome da coluna original de cada feature de saída do pré-processamento.
+    """
+    preprocessor = pipeline.named_steps["preprocessor"]
+    origins = []
+    for name, transformer, cols in preprocessor.transformers_:
+        if transformer == "drop" or len(cols) == 0:
+            continue
+        if transformer == "passthrough":
+            origins.extend(cols)
+            continue
+
+        by_length = sorted(cols, key=len, reverse=True)
+        for output in transformer.get_feature_names_out(cols):
+            if output in cols:
+                origins.append(output)
+            else:
+                origins.append(next(c for c in by_length if output.startswith(f"{c}_")))
+    return origins
+
+
+class LinearExplainer:
+    """
+    Explicação por feature para o pipeline com classificador linear (LogisticRegression).
+
+    A contribuição de cada feature para o log-odds do risco é
+    coef * x_transformado. Para as colunas padronizadas (indicadores, notas,
+    Pedras e binárias) isso equivale ao efeito em relação ao aluno médio do
+    treino; as colunas one-hot não são centradas, então a contribuição da
+    categoria é o seu coeficiente (em relação a zero, não à média das
+    categorias), e a parte comum a todos os alunos fica no intercepto.
+    Colunas one-hot são somadas de volta à coluna original por uma matriz de
+    agregação, de modo que probabilidade e contribuições saem da MESMA passada
+    vetorizada sobre o lote.
+    """
+
+    def __init__(self, pipeline: Pipeline, preprocessor=None):
+        classifier = pipeline[-1]
+        coef = getattr(classifier, "coef_", None)
+        if coef is None or coef.shape[0] != 1:
+            raise ValueError("Explicação disponível apenas para classificador linear.")
+
+        # Pré-processamento substituível por um equivalente (ex: FeatureCache)
+        self.preprocessor = preprocessor if preprocessor is not None else pipeline[:-1]
+        self.coef = coef[0].astype(float)
+        self.intercept = float(classifier.intercept_[0])
+
+        origins = feature_origins(pipeline)
+        self.features = list(dict.fromkeys(origins))
+        # Matriz (features transformadas x colunas originais) de 0/1
+        index = {name: i for i, name in enumerate(self.features)}
+        self.aggregation = np.zeros((len(origins), len(self.features)))
+        self.aggregation[np.arange(len(origins)), [index[o] for o in origins]] = 1.0
+        # Pesos já agregados: contribuições = X_t @ (diag(coef) @ A)
+        self.weights = self.coef[:, None] * self.aggregation
+
+    def explain(self, X: pd.DataFrame, top_k: int = 5):
+        """
+        Calcula a probabilidade de risco e as principais contribuições por aluno.
+
+        Args:
+            X (pd.DataFrame): Dados brutos (mesmo formato do /predict).
+            top_k (int): Número de features retornadas por aluno (maior |contribuição|).
+
+        Returns:
+            tuple: (probabilidades (n,), índices das features (n, k),
+                contribuições (n, k)), com índices referentes a self.features.
+        """
+        Xt = np.asarray(self.preprocessor.transform(X), dtype=float)
+        contributions = Xt @ self.weights
+        logit = contributions.sum(axis=1) + self.intercept
+        proba = 1.0 / (1.0 + np.exp(-logit))
+
+        top_k = min(top_k, len(self.features))
+        magnitude = np.abs(contributions)
+        # argpartition (O(n)) + ordenação apenas dos k selecionados
+        top = np.argpartition(-magnitude, top_k - 1, axis=1)[:, :top_k]
+        order = np.argsort(-np.take_along_axis(magnitude, top, axis=1), axis=1)
+        top = np.take_along_axis(top, order, axis=1)
+        return proba, top, np.take_along_axis(contributions, top, axis=1)
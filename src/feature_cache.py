@@ -0,0 +1,159 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+from sklearn.pipeline import Pipeline
+
+from src.memory import shared_mapping_sizeof
+from src.utils import setup_logger
+
+logger = setup_logger("feature_cache")
+
+
+class _GroupCache:
+    """LRU de um grupo de colunas: valores brutos do grupo -> bloco transformado."""
+
+    def __init__(self, name: str, columns: list, transformer, max_entries: int):
+        self.name = name
+        self.columns = list(columns)
+        self.transformer = transformer
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def keys(self, X: pd.DataFrame) -> list:
+        """Chave por linha: tupla dos valores brutos do grupo (nulos -> None)."""
+        frame = X.reindex(columns=self.columns)
+        values = frame.to_numpy(dtype=object)
+        values[pd.isna(frame).to_numpy()] = None
+        return list(map(tuple, values))
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "colunas": self.columns,
+            "entradas": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / total, 4) if total else None,
+        }
+
+
+class FeatureCache:
+    """
+    Cache do vetor de features transformado, por grupo de colunas.
+
+    O ColumnTransformer do pipeline já separa as entradas em blocos independentes
+    (numéricas, categóricas one-hot, Pedras/binárias). Cada bloco depende apenas
+    das colunas brutas do seu grupo, então é memorizado com chave nesses valores:
+    um aluno reavaliado com um único indicador alterado recalcula só o bloco
+    numérico e reaproveita os demais.
+
+    - Cada grupo tem um LRU limitado a 'max_entries' entradas.
+    - Faltas (misses) de um lote são deduplicadas e transformadas em uma única
+      chamada (PedraMapper/BinaryCleaner + transformer do grupo).
+    - O resultado é idêntico a pipeline[:-1].transform(X).
+
+    Args:
+        pipeline (Pipeline): Pipeline treinado (create_pipeline).
+        max_entries (int): Máximo de entradas por grupo de colunas.
+    """
+
+    def __init__(self, pipeline: Pipeline, max_entries: int = 10_000):
+        preprocessor = pipeline.named_steps["preprocessor"]
+        position = list(pipeline.named_steps).index("preprocessor")
+        # Transformers linha a linha anteriores ao ColumnTransformer (sem estado)
+        self.pre_steps = [step for _, step in pipeline.steps[:position]]
+        self.full_transform = pipeline[: position + 1]
+        self.feature_names = list(preprocessor.get_feature_names_out())
+        self.max_entries = max_entries
+        self.groups = [
+            _GroupCache(name, cols, transformer, max_entries)
+            for name, transformer, cols in preprocessor.transformers_
+            if transformer != "drop" and len(cols) > 0
+        ]
+        self._lock = threading.Lock()
+
+    def transform(self, X: pd.DataFrame) -> pd.DataFrame:
+        """
+        Transforma o lote montando o vetor final a partir dos blocos em cache.
+
+        Args:
+            X (pd.DataFrame): Dados brutos (mesmo formato do /predict).
+
+        Returns:
+            pd.DataFrame: Features transformadas (mesmas colunas do pipeline).
+        """
+        if X.empty:
+            return self.full_transform.transform(X)
+        blocks = [self._transform_group(group, X) for group in self.groups]
+        return pd.DataFrame(
+            np.hstack(blocks), columns=self.feature_names, index=X.index
+        )
+
+    def _transform_group(self, group: _GroupCache, X: pd.DataFrame) -> np.ndarray:
+        keys = group.keys(X)
+        rows = [None] * len(keys)
+        missing = {}
+        with self._lock:
+            for i, key in enumerate(keys):
+                cached = group.entries.get(key)
+                if cached is None:
+                    missing.setdefault(key, []).append(i)
+                else:
+                    group.entries.move_to_end(key)
+                    rows[i] = cached
+            group.hits += len(keys) - sum(len(idx) for idx in missing.values())
+            group.misses += sum(len(idx) for idx in missing.values())
+
+        if missing:
+            # Uma linha por chave distinta faltante
+            first_rows = [idx[0] for idx in missing.values()]
+            raw = X.iloc[first_rows].reindex(columns=group.columns)
+            for step in self.pre_steps:
+                raw = step.transform(raw)
+            computed = np.asarray(group.transformer.transform(raw), dtype=float)
+            with self._lock:
+                for (key, idx), vector in zip(missing.items(), computed):
+                    for i in idx:
+                        rows[i] = vector
+                    group.entries[key] = vector
+                    group.entries.move_to_end(key)
+                while len(group.entries) > self.max_entries:
+                    group.entries.popitem(last=False)
+                    group.evictions += 1
+
+        return np.vstack(rows)
+
+    def stats(self) -> dict:
+        """Taxa de acerto, entradas e evictions por grupo de colunas."""
+        with self._lock:
+            groups = {group.name: group.stats() for group in self.groups}
+        hits = sum(g["hits"] for g in groups.values())
+        total = hits + sum(g["misses"] for g in groups.values())
+        return {
+            "max_entradas_por_grupo": self.max_entries,
+            "hit_rate": round(hits / total, 4) if total else None,
+            "grupos": groups,
+        }
+
+    def memory_bytes(self) -> int:
+        """Memória ocupada pelas chaves e blocos em cache (bytes, sem o pipeline)."""
+        return sum(
+            shared_mapping_sizeof(group.entries, self._lock) for group in self.groups
+        )
+
+    def reset_stats(self):
+        """Zera os contadores mantendo as entradas (ex: após o aquecimento)."""
+        with self._lock:
+            for group in self.groups:
+                group.hits = group.misses = group.evictions = 0
+
+    def clear(self):
+        with self._lock:
+            for group in self.groups:
+                group.entries.clear()
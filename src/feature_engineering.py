@@ -1,3 +1,4 @@
+import numpy as np
 import pandas as pd
 from sklearn.base import BaseEstimator, TransformerMixin
 from src.utils import setup_logger
@@ -106,3 +107,114 @@ class BinaryCleaner(BaseEstimator, TransformerMixin):
 
     def get_feature_names_out(self, input_features=None):
         return input_features
+
+
+class IncrementalPreprocessor(BaseEstimator, TransformerMixin):
+    """
+    Pré-processador com estatísticas atualizáveis por lote (partial_fit).
+
+    Motivação:
+    O ColumnTransformer padrão (SimpleImputer + StandardScaler + OneHotEncoder) precisa
+    ser reajustado do zero a cada retreino. Este transformer mantém estatísticas
+    correntes, permitindo incorporar novos ciclos de avaliação apenas com o lote novo.
+
+    Estratégia:
+    - Numéricas: média e variância correntes (algoritmo de Chan/Welford), usadas tanto
+      na imputação quanto na padronização. A mediana exata não é atualizável sem reter
+      os dados, por isso a imputação usa a média corrente.
+    - Categóricas: vocabulário crescente com número fixo de posições por coluna
+      (max_categories), mantendo constante a dimensão da saída para o classificador.
+      Categorias além da capacidade são ignoradas (vetor zerado), como no
+      OneHotEncoder(handle_unknown='ignore').
+    """
+
+    def __init__(self, numeric_cols=None, categorical_cols=None, max_categories=16):
+        self.numeric_cols = numeric_cols
+        self.categorical_cols = categorical_cols
+        self.max_categories = max_categories
+
+    def _reset(self):
+        n = len(self.numeric_cols or [])
+        self.n_seen_ = np.zeros(n)
+        self.mean_ = np.zeros(n)
+        self.m2_ = np.zeros(n)
+        self.categories_ = {col: [] for col in self.categorical_cols or []}
+
+    def fit(self, X, y=None):
+        self._reset()
+        return self.partial_fit(X, y)
+
+    def partial_fit(self, X, y=None):
+        """
+        Atualiza as estatísticas correntes com um novo lote de dados.
+        """
+        if not hasattr(self, "mean_"):
+            self._reset()
+
+        if self.numeric_cols:
+            values = X[self.numeric_cols].to_numpy(dtype=float)
+            batch_n = np.sum(~np.isnan(values), axis=0)
+            has_data = batch_n > 0
+
+            batch_mean = np.zeros_like(self.mean_)
+            batch_m2 = np.zeros_like(self.m2_)
+            batch_mean[has_data] = np.nanmean(values[:, has_data], axis=0)
+            batch_m2[has_data] = np.nansum(
+                (values[:, has_data] - batch_mean[has_data]) ** 2, axis=0
+            )
+
+            # Combinação paralela de momentos (Chan et al.)
+            total_n = self.n_seen_ + batch_n
+            delta = batch_mean - self.mean_
+            safe_n = np.where(total_n > 0, total_n, 1)
+            self.mean_ = self.mean_ + delta * batch_n / safe_n
+            self.m2_ = self.m2_ + batch_m2 + delta**2 * self.n_seen_ * batch_n / safe_n
+            self.n_seen_ = total_n
+
+        for col in self.categorical_cols or []:
+            known = self.categories_[col]
+            for value in X[col].fillna("missing").astype(str).unique():
+                if value not in known and len(known) < self.max_categories:
+                    known.append(value)
+
+        return self
+
+    @property
+    def scale_(self):
+        var = np.divide(
+            self.m2_, self.n_seen_, out=np.zeros_like(self.m2_), where=self.n_seen_ > 0
+        )
+        scale = np.sqrt(var)
+        # Mesma convenção do StandardScaler para colunas de variância zero
+        return np.where(scale > 0, scale, 1.0)
+
+    def transform(self, X):
+        """
+        Imputa, padroniza e codifica em one-hot de largura fixa.
+        """
+        blocks = []
+
+        if self.numeric_cols:
+            values = X[self.numeric_cols].to_numpy(dtype=float)
+            values = np.where(np.isnan(values), self.mean_, values)
+            blocks.append((values - self.mean_) / self.scale_)
+
+        for col in self.categorical_cols or []:
+            lookup = {value: i for i, value in enumerate(self.categories_[col])}
+            positions = (
+                X[col].fillna("missing").astype(str).map(lookup).fillna(-1).to_numpy()
+            )
+            onehot = np.zeros((len(X), self.max_categories))
+            rows = np.flatnonzero(positions >= 0)
+            onehot[rows, positions[rows].astype(int)] = 1.0
+            blocks.append(onehot)
+
+        matrix = np.hstack(blocks) if blocks else np.empty((len(X), 0))
+        return pd.DataFrame(matrix, columns=self.get_feature_names_out(), index=X.index)
+
+    def get_feature_names_out(self, input_features=None):
+        # Nomes estáveis por posição: o vocabulário cresce sem alterar o esquema
+        names = list(self.numeric_cols or [])
+        for col in self.categorical_cols or []:
+            names += [f"{col}_{i}" for i in range(self.max_categories)]
+        return np.array(names, dtype=object)
@@ -0,0 +1,211 @@
+import argparse
+import joblib
+import numpy as np
+import pandas as pd
+import sklearn
+from pathlib import Path
+from sklearn.pipeline import Pipeline
+from sklearn.linear_model import SGDClassifier
+from sklearn.metrics import accuracy_score, recall_score
+from sklearn.utils.class_weight import compute_sample_weight
+
+from src.utils import setup_logger
+from src.feature_engineering import PedraMapper, BinaryCleaner, IncrementalPreprocessor
+from src.preprocessing import load_dataset, create_target
+from src.train import create_pipeline, select_feature_columns
+
+# Garante que o Scikit-Learn retorne Pandas DataFrames nas transformações
+sklearn.set_config(transform_output="pandas")
+logger = setup_logger("incremental")
+
+INCREMENTAL_MODEL_NAME = "pipeline_incremental.joblib"
+# Lotes já incorporados ao modelo incremental (base do refit de paridade)
+SEEN_BATCHES_NAME = "incremental_batches.csv"
+
+
+def get_project_root() -> Path:
+    return Path(__file__).resolve().parent.parent
+
+
+def create_incremental_pipeline(X: pd.DataFrame) -> Pipeline:
+    """
+    Constrói o pipeline de treino incremental.
+
+    Mantém as mesmas etapas customizadas e a mesma seleção de features do pipeline
+    baseline, trocando o ColumnTransformer pelo IncrementalPreprocessor e a
+    LogisticRegression por um SGDClassifier com perda logística (suporta partial_fit).
+
+    Args:
+        X (pd.DataFrame): DataFrame de referência para seleção das colunas.
+
+    Returns:
+        Pipeline: Pipeline compatível com a API (predict/predict_proba).
+    """
+    columns = select_feature_columns(X)
+
+    preprocessor = IncrementalPreprocessor(
+        numeric_cols=columns["numerical"] + columns["pedra"] + columns["binary"],
+        categorical_cols=columns["categorical"],
+    )
+
+    return Pipeline(
+        steps=[
+            ("pedra_mapper", PedraMapper()),
+            ("binary_cleaner", BinaryCleaner()),
+            ("preprocessor", preprocessor),
+            (
+                "classifier",
+                SGDClassifier(loss="log_loss", alpha=1e-3, random_state=42),
+            ),
+        ]
+    )
+
+
+def partial_fit_pipeline(
+    pipeline: Pipeline, X: pd.DataFrame, y: np.ndarray, n_epochs: int = 1
+) -> Pipeline:
+    """
+    Atualiza o pipeline incremental apenas com o lote recebido.
+
+    O sklearn.Pipeline não expõe partial_fit, então as etapas são aplicadas
+    manualmente: transformers sem estado (Pedra/Binário), atualização das
+    estatísticas do pré-processador e, por fim, partial_fit do classificador.
+
+    O balanceamento de classes é feito por pesos amostrais calculados no lote,
+    já que class_weight='balanced' não é suportado em partial_fit.
+
+    Args:
+        pipeline (Pipeline): Pipeline criado por create_incremental_pipeline.
+        X (pd.DataFrame): Features do novo lote.
+        y (np.ndarray): Alvo do novo lote.
+        n_epochs (int): Número de passadas sobre o lote.
+
+    Returns:
+        Pipeline: O próprio pipeline, atualizado.
+    """
+    X_clean = pipeline.named_steps["pedra_mapper"].transform(X)
+    X_clean = pipeline.named_steps["binary_cleaner"].transform(X_clean)
+
+    preprocessor = pipeline.named_steps["preprocessor"]
+    preprocessor.partial_fit(X_clean)
+    X_processed = preprocessor.transform(X_clean)
+
+    classifier = pipeline.named_steps["classifier"]
+    sample_weight = compute_sample_weight("balanced", y)
+    rng = np.random.default_rng(42)
+
+    for _ in range(n_epochs):
+        order = rng.permutation(len(y))
+        classifier.partial_fit(
+            X_processed.iloc[order],
+            y[order],
+            classes=np.array([0, 1]),
+            sample_weight=sample_weight[order],
+        )
+
+    return pipeline
+
+
+def _score(pipeline: Pipeline, X: pd.DataFrame, y: np.ndarray) -> dict:
+    y_pred = pipeline.predict(X)
+    return {
+        "recall": recall_score(y, y_pred, zero_division=0),
+        "acuracia": accuracy_score(y, y_pred),
+    }
+
+
+def run_incremental_training(batch_path: Path = None, n_epochs: int = 10) -> dict:
+    """
+    Orquestra o retreino incremental.
+
+    Fluxo:
+    1. Sem artefato incremental: inicializa o modelo a partir de X_train/y_train.
+    2. Com artefato e lote novo (CSV bruto no formato PEDE): atualiza o modelo
+       usando somente o lote e o acumula em data/processed/incremental_batches.csv
+       (reiniciado junto com o modelo).
+    3. Compara a qualidade no conjunto de teste contra um refit completo do
+       pipeline baseline sobre todos os dados vistos pelo modelo incremental
+       (X_train + todos os lotes acumulados), e não apenas o lote atual.
+
+    Args:
+        batch_path (Path): CSV bruto do novo ciclo de avaliação (opcional).
+        n_epochs (int): Passadas sobre os dados na inicialização do modelo.
+
+    Returns:
+        dict: Métricas do modelo incremental e do refit completo.
+    """
+    root = get_project_root()
+    data_dir = root / "data" / "processed"
+    model_path = root / "app" / "model" / INCREMENTAL_MODEL_NAME
+    seen_path = data_dir / SEEN_BATCHES_NAME
+
+    try:
+        X_train = pd.read_csv(data_dir / "X_train.csv")
+        y_train = pd.read_csv(data_dir / "y_train.csv").values.ravel()
+        X_test = pd.read_csv(data_dir / "X_test.csv")
+        y_test = pd.read_csv(data_dir / "y_test.csv").values.ravel()
+    except FileNotFoundError:
+        logger.error("Arquivos não encontrados. Execute 'src.preprocessing' primeiro.")
+        return {}
+
+    if model_path.exists() and batch_path is not None:
+        pipeline = joblib.load(model_path)
+        logger.info(f"Modelo incremental carregado de: {model_path}")
+    else:
+        logger.info("Inicializando modelo incremental a partir de X_train...")
+        pipeline = create_incremental_pipeline(X_train)
+        partial_fit_pipeline(pipeline, X_train, y_train, n_epochs=n_epochs)
+        # Modelo novo: nenhum lote incorporado ainda
+        seen_path.unlink(missing_ok=True)
+
+    if batch_path is not None:
+        df_batch = create_target(load_dataset(Path(batch_path)))
+        X_batch = df_batch.drop(columns=["ALVO"])
+        y_batch = df_batch["ALVO"].to_numpy()
+        logger.info(f"Atualizando modelo com lote de {len(X_batch)} alunos...")
+        partial_fit_pipeline(pipeline, X_batch, y_batch)
+
+        if seen_path.exists():
+            df_batch = pd.concat([pd.read_csv(seen_path), df_batch], ignore_index=True)
+        df_batch.to_csv(seen_path, index=False)
+
+    X_full, y_full = X_train, y_train
+    if seen_path.exists():
+        df_seen = pd.read_csv(seen_path)
+        logger.info(
+            f"Refit de paridade com {len(df_seen)} alunos dos lotes incorporados"
+        )
+        X_full = pd.concat([X_train, df_seen.drop(columns=["ALVO"])], ignore_index=True)
+        y_full = np.concatenate([y_train, df_seen["ALVO"].to_numpy()])
+
+    model_path.parent.mkdir(parents=True, exist_ok=True)
+    joblib.dump(pipeline, model_path)
+    logger.info(f"Modelo incremental salvo em: {model_path}")
+
+    # Paridade: refit completo do baseline com os mesmos dados vistos pelo incremental
+    full_refit = create_pipeline(X_full)
+    full_refit.fit(X_full, y_full)
+
+    results = {
+        "incremental": _score(pipeline, X_test, y_test),
+        "refit_completo": _score(full_refit, X_test, y_test),
+    }
+    for name, metrics in results.items():
+        logger.info(
+            f"[{name}] Recall (Risco): {metrics['recall']:.2%} | "
+            f"Acurácia: {metrics['acuracia']:.2%}"
+        )
+
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Retreino incremental do modelo.")
+    parser.add_argument(
+        "--batch",
+        type=Path,
+        default=None,
+        help="CSV bruto (formato PEDE) com o novo lote de alunos.",
+    )
+    args = parser.parse_args()
+    run_incremental_training(batch_path=args.batch)
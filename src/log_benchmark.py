@@ -0,0 +1,159 @@
+import argparse
+import contextlib
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from src.drift import format_drift_record
+from src.utils import (
+    configure_logging,
+    request_id_var,
+    setup_csv_logger,
+    setup_logger,
+)
+
+logger = setup_logger("log_benchmark")
+
+# Modos comparados: o primeiro ('sync_text') é o comportamento original da API
+BENCHMARK_MODES = {
+    "sync_text": {"async_mode": False, "json_format": False},
+    "sync_json": {"async_mode": False, "json_format": True},
+    "async_text": {"async_mode": True, "json_format": False},
+    "async_json": {"async_mode": True, "json_format": True},
+    "async_json_amostragem": {
+        "async_mode": True,
+        "json_format": True,
+        "sample_burst": 100,
+        "sample_every": 100,
+    },
+}
+
+# Registro típico de uma chamada ao /predict
+SAMPLE_RECORD = {
+    "genero": "Menina",
+    "instituicao_de_ensino": "Escola Pública",
+    "pedra_20": "Ametista",
+    "pedra_21": "Ametista",
+    "iaa": 8.5,
+    "ieg": 7.2,
+    "ips": 6.9,
+    "ida": 6.1,
+    "ipv": 7.4,
+    "matem": 6.0,
+    "portug": 7.5,
+    "ingles": 5.8,
+}
+
+
+def get_project_root() -> Path:
+    return Path(__file__).resolve().parent.parent
+
+
+def benchmark_logging_mode(name: str, options: dict, n_requests: int) -> dict:
+    """
+    Mede o custo de logging por requisição na thread chamadora.
+
+    Cada "requisição" emite o mesmo que o /predict: uma linha de acesso no logger
+    da API (com request_id e latencia_ms) e uma linha no log CSV de drift.
+    O tempo total inclui o esvaziamento da fila (escrita efetiva em disco).
+
+    Args:
+        name (str): Nome do modo (chave de BENCHMARK_MODES).
+        options (dict): Parâmetros de configure_logging.
+        n_requests (int): Número de requisições simuladas.
+
+    Returns:
+        dict: Custo por requisição (média, p50, p99) e tempo total.
+    """
+    configure_logging(**options)
+    timings = np.empty(n_requests)
+
+    # Console redirecionado: mede o custo de formatação/escrita sem poluir o terminal
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        app_log = setup_logger(f"bench_{name}", f"bench_{name}.log")
+        drift_log = setup_csv_logger(
+            f"bench_{name}_drift", Path("logs") / f"bench_{name}_drift.csv"
+        )
+
+        start = time.perf_counter()
+        for i in range(n_requests):
+            token = request_id_var.set(f"req-{i}")
+            t0 = time.perf_counter()
+            app_log.info(
+                "POST /predict 200 em 3.2ms",
+                extra={"latencia_ms": 3.2, "status_code": 200},
+            )
+            drift_log.info(format_drift_record(SAMPLE_RECORD, 0.8123, True))
+            timings[i] = time.perf_counter() - t0
+            request_id_var.reset(token)
+
+        # Volta ao modo síncrono: esvazia a fila antes de medir o tempo total
+        configure_logging()
+        total = time.perf_counter() - start
+
+    with open(Path("logs") / f"bench_{name}.log", encoding="utf-8") as f:
+        written = sum(1 for _ in f)
+
+    timings_us = timings * 1e6
+    return {
+        "modo": name,
+        "custo_medio_us": round(float(timings_us.mean()), 2),
+        "custo_p50_us": round(float(np.percentile(timings_us, 50)), 2),
+        "custo_p99_us": round(float(np.percentile(timings_us, 99)), 2),
+        "tempo_total_s": round(total, 3),
+        "linhas_log_api": written,
+    }
+
+
+def run_log_benchmark(n_requests: int = 20_000, modes: list = None) -> dict:
+    """
+    Compara o custo de logging por requisição entre os modos de BENCHMARK_MODES
+    e grava o resultado em reports/log_benchmark.json.
+    """
+    modes = modes or list(BENCHMARK_MODES)
+    cwd = Path.cwd()
+    results = []
+
+    # Os logs do benchmark são gravados em um diretório temporário
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        os.chdir(tmp_dir)
+        try:
+            for name in modes:
+                results.append(
+                    benchmark_logging_mode(name, BENCHMARK_MODES[name], n_requests)
+                )
+        finally:
+            configure_logging()
+            os.chdir(cwd)
+
+    for result in results:
+        logger.info(
+            f"[{result['modo']}] média={result['custo_medio_us']:.1f}us | "
+            f"p99={result['custo_p99_us']:.1f}us | "
+            f"total={result['tempo_total_s']:.2f}s | "
+            f"linhas={result['linhas_log_api']}"
+        )
+
+    report = {"n_requisicoes": n_requests, "modos": results}
+    reports_dir = get_project_root() / "reports"
+    reports_dir.mkdir(parents=True, exist_ok=True)
+    with open(reports_dir / "log_benchmark.json", "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    logger.info(f"Relatório salvo em: {reports_dir / 'log_benchmark.json'}")
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark do custo de logging por requisição."
+    )
+    parser.add_argument("--n-requests", type=int, default=20_000)
+    parser.add_argument(
+        "--modes", nargs="+", choices=list(BENCHMARK_MODES), default=None
+    )
+    args = parser.parse_args()
+    run_log_benchmark(n_requests=args.n_requests, modes=args.modes)
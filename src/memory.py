@@ -0,0 +1,147 @@
+import os
+import sys
+import tracemalloc
+import types
+
+import numpy as np
+import pandas as pd
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Quadros do próprio tracemalloc/importlib fora do ranking de alocações
+_IGNORED_TRACES = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+]
+
+
+def deep_sizeof(obj, _seen: set = None) -> int:
+    """
+    Tamanho aproximado em memória de um objeto e de tudo o que ele referencia
+    (bytes). Arrays NumPy contam pelo buffer (nbytes) e objetos pandas pelo
+    memory_usage(deep=True); objetos compartilhados são contados uma única vez.
+    """
+    seen = set() if _seen is None else _seen
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+
+    if isinstance(obj, np.ndarray):
+        # getsizeof já inclui o buffer quando o array é dono dos dados (views: só o cabeçalho)
+        size = sys.getsizeof(obj)
+        if obj.dtype == object:
+            size += sum(deep_sizeof(item, seen) for item in obj.ravel())
+        return size
+    if isinstance(obj, pd.DataFrame):
+        return int(obj.memory_usage(index=True, deep=True).sum())
+    if isinstance(obj, (pd.Series, pd.Index)):
+        return int(obj.memory_usage(deep=True))
+
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_sizeof(k, seen) + deep_sizeof(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(deep_sizeof(item, seen) for item in obj)
+    elif isinstance(obj, (str, bytes, int, float, bool, type(None))):
+        return size
+    elif isinstance(obj, (type, types.ModuleType, types.FunctionType)):
+        # Classes, módulos e funções são compartilhados, não pertencem ao objeto
+        return size
+    else:
+        if hasattr(obj, "__dict__"):
+            size += deep_sizeof(vars(obj), seen)
+        for slot in getattr(type(obj), "__slots__", ()):
+            if isinstance(slot, str) and hasattr(obj, slot):
+                size += deep_sizeof(getattr(obj, slot), seen)
+    return size
+
+
+def shared_mapping_sizeof(mapping: dict, lock) -> int:
+    """
+    deep_sizeof de um dicionário compartilhado entre threads sem segurar a
+    trava durante a medição: sob a trava copia apenas as referências dos itens
+    (O(n) barato) e o percurso profundo é feito fora dela, sem bloquear quem
+    escreve no dicionário.
+    """
+    with lock:
+        size = sys.getsizeof(mapping)
+        items = list(mapping.items())
+    seen = {id(mapping)}
+    return size + sum(deep_sizeof(k, seen) + deep_sizeof(v, seen) for k, v in items)
+
+
+def object_size_report(obj) -> dict:
+    """
+    Tamanho em memória (MB) de um objeto e, para pipelines sklearn, de cada etapa.
+    """
+    report = {"total_mb": round(deep_sizeof(obj) / 2**20, 4)}
+    steps = getattr(obj, "steps", None)
+    if steps:
+        report["etapas_mb"] = {
+            name: round(deep_sizeof(step) / 2**20, 4) for name, step in steps
+        }
+    return report
+
+
+def process_memory() -> dict:
+    """
+    RSS atual e pico de RSS do processo (MB). O RSS atual vem de
+    /proc/self/statm (Linux); em outros sistemas fica None.
+    """
+    rss = None
+    try:
+        with open("/proc/self/statm") as f:
+            rss = int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+
+    peak = None
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss: KB no Linux, bytes no macOS
+        peak = peak if sys.platform == "darwin" else peak * 1024
+
+    return {
+        "rss_mb": round(rss / 2**20, 2) if rss is not None else None,
+        "rss_pico_mb": round(peak / 2**20, 2) if peak is not None else None,
+    }
+
+
+def top_allocations(
+    snapshot: tracemalloc.Snapshot, limit: int = 10, baseline=None
+) -> list:
+    """
+    Maiores pontos de alocação (arquivo:linha) ainda vivos no snapshot.
+
+    Args:
+        snapshot (tracemalloc.Snapshot): Snapshot atual.
+        limit (int): Quantidade de linhas retornadas.
+        baseline (tracemalloc.Snapshot): Se informado, ordena pelo crescimento
+            desde a linha de base (detecção de vazamentos em workers longos).
+
+    Returns:
+        list: Local, tamanho (KB), blocos e crescimento (KB, com linha de base).
+    """
+    snapshot = snapshot.filter_traces(_IGNORED_TRACES)
+    if baseline is not None:
+        stats = snapshot.compare_to(baseline.filter_traces(_IGNORED_TRACES), "lineno")
+    else:
+        stats = snapshot.statistics("lineno")
+
+    top = []
+    for stat in stats[:limit]:
+        frame = stat.traceback[0]
+        item = {
+            "local": f"{frame.filename}:{frame.lineno}",
+            "tamanho_kb": round(stat.size / 1024, 2),
+            "blocos": stat.count,
+        }
+        if baseline is not None:
+            item["crescimento_kb"] = round(stat.size_diff / 1024, 2)
+        top.append(item)
+    return top
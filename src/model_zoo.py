@@ -0,0 +1,215 @@
+import argparse
+import json
+import platform
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+import sklearn
+from sklearn.calibration import CalibratedClassifierCV
+from sklearn.ensemble import HistGradientBoostingClassifier, RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import recall_score
+from sklearn.svm import LinearSVC
+
+from src.utils import setup_logger
+from src.train import create_pipeline
+
+# Garante que o Scikit-Learn retorne Pandas DataFrames nas transformações
+sklearn.set_config(transform_output="pandas")
+logger = setup_logger("model_zoo")
+
+# Candidatos avaliados com o MESMO pré-processamento de create_pipeline
+MODEL_ZOO = {
+    "logistic_regression": lambda: LogisticRegression(
+        random_state=42, class_weight="balanced", max_iter=1000
+    ),
+    "hist_gradient_boosting": lambda: HistGradientBoostingClassifier(
+        class_weight="balanced", random_state=42
+    ),
+    "random_forest": lambda: RandomForestClassifier(
+        n_estimators=200, class_weight="balanced", random_state=42, n_jobs=1
+    ),
+    "linear_svm_calibrated": lambda: CalibratedClassifierCV(
+        LinearSVC(class_weight="balanced", random_state=42), cv=5
+    ),
+}
+
+
+def get_project_root() -> Path:
+    return Path(__file__).resolve().parent.parent
+
+
+def get_git_commit(root: Path) -> str:
+    """Retorna o hash curto do commit atual (ou 'desconhecido' fora de um repositório git)."""
+    try:
+        result = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=root,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        return result.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "desconhecido"
+
+
+def benchmark_model(
+    name: str,
+    X_train: pd.DataFrame,
+    y_train: np.ndarray,
+    X_test: pd.DataFrame,
+    y_test: np.ndarray,
+    n_single: int = 200,
+    min_batch_seconds: float = 0.5,
+) -> dict:
+    """
+    Mede o custo de treino e de serviço de um candidato do MODEL_ZOO.
+
+    Métricas:
+    - Tempo de treino (fit do pipeline completo).
+    - Latência de uma linha (p50/p99), que reflete o caminho do endpoint /predict.
+    - Throughput em lote (linhas por segundo de predict_proba).
+    - Tamanho do artefato serializado e tempo de carga (joblib).
+    - Recall da classe de risco no conjunto de teste.
+
+    Args:
+        name (str): Chave do candidato em MODEL_ZOO.
+        X_train, y_train: Dados de treino.
+        X_test, y_test: Dados de teste.
+        n_single (int): Número de predições unitárias amostradas.
+        min_batch_seconds (float): Tempo mínimo de medição do throughput em lote.
+
+    Returns:
+        dict: Resultado do benchmark do candidato.
+    """
+    pipeline = create_pipeline(X_train, classifier=MODEL_ZOO[name]())
+
+    start = time.perf_counter()
+    pipeline.fit(X_train, y_train)
+    fit_time = time.perf_counter() - start
+
+    recall = recall_score(y_test, pipeline.predict(X_test), zero_division=0)
+
+    # Latência unitária: uma linha por chamada, como na API
+    single_times = []
+    for i in range(n_single):
+        row = X_test.iloc[[i % len(X_test)]]
+        start = time.perf_counter()
+        pipeline.predict_proba(row)
+        single_times.append(time.perf_counter() - start)
+    single_ms = np.array(single_times) * 1000
+
+    # Throughput em lote: repete o conjunto de teste até atingir o tempo mínimo
+    rows, elapsed = 0, 0.0
+    while elapsed < min_batch_seconds:
+        start = time.perf_counter()
+        pipeline.predict_proba(X_test)
+        elapsed += time.perf_counter() - start
+        rows += len(X_test)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        artifact = Path(tmp_dir) / f"{name}.joblib"
+        joblib.dump(pipeline, artifact)
+        artifact_bytes = artifact.stat().st_size
+
+        start = time.perf_counter()
+        joblib.load(artifact)
+        load_time = time.perf_counter() - start
+
+    result = {
+        "modelo": name,
+        "recall_risco": round(float(recall), 4),
+        "tempo_treino_s": round(fit_time, 4),
+        "latencia_unitaria_p50_ms": round(float(np.percentile(single_ms, 50)), 3),
+        "latencia_unitaria_p99_ms": round(float(np.percentile(single_ms, 99)), 3),
+        "throughput_lote_linhas_s": round(rows / elapsed, 1),
+        "tamanho_artefato_kb": round(artifact_bytes / 1024, 1),
+        "tempo_carga_ms": round(load_time * 1000, 3),
+    }
+    logger.info(
+        f"[{name}] recall={result['recall_risco']:.2%} | "
+        f"fit={result['tempo_treino_s']:.2f}s | "
+        f"p50={result['latencia_unitaria_p50_ms']:.2f}ms | "
+        f"p99={result['latencia_unitaria_p99_ms']:.2f}ms | "
+        f"lote={result['throughput_lote_linhas_s']:.0f} linhas/s | "
+        f"artefato={result['tamanho_artefato_kb']:.0f}KB"
+    )
+    return result
+
+
+def run_benchmark(models: list = None, n_single: int = 200) -> dict:
+    """
+    Executa o benchmark de todos os candidatos e grava um relatório JSON.
+
+    Saídas (em reports/):
+    - model_zoo.json: Relatório da execução atual.
+    - model_zoo_history.jsonl: Histórico acumulado (uma linha por execução),
+      identificado pelo commit, para acompanhar a evolução entre versões.
+
+    Args:
+        models (list): Subconjunto de chaves do MODEL_ZOO (padrão: todos).
+        n_single (int): Número de predições unitárias amostradas por modelo.
+
+    Returns:
+        dict: Relatório completo.
+    """
+    root = get_project_root()
+    data_dir = root / "data" / "processed"
+    reports_dir = root / "reports"
+
+    try:
+        X_train = pd.read_csv(data_dir / "X_train.csv")
+        y_train = pd.read_csv(data_dir / "y_train.csv").values.ravel()
+        X_test = pd.read_csv(data_dir / "X_test.csv")
+        y_test = pd.read_csv(data_dir / "y_test.csv").values.ravel()
+    except FileNotFoundError:
+        logger.error("Arquivos não encontrados. Execute 'src.preprocessing' primeiro.")
+        return {}
+
+    models = models or list(MODEL_ZOO)
+    logger.info(f"Benchmark de {len(models)} modelos: {models}")
+
+    report = {
+        "gerado_em": datetime.now(timezone.utc).isoformat(),
+        "commit": get_git_commit(root),
+        "python": platform.python_version(),
+        "scikit_learn": sklearn.__version__,
+        "n_treino": len(X_train),
+        "n_teste": len(X_test),
+        "modelos": [
+            benchmark_model(name, X_train, y_train, X_test, y_test, n_single=n_single)
+            for name in models
+        ],
+    }
+
+    reports_dir.mkdir(parents=True, exist_ok=True)
+    with open(reports_dir / "model_zoo.json", "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    with open(reports_dir / "model_zoo_history.jsonl", "a", encoding="utf-8") as f:
+        f.write(json.dumps(report, ensure_ascii=False) + "\n")
+
+    logger.info(f"Relatório salvo em: {reports_dir / 'model_zoo.json'}")
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark de modelos: recall x latência x custo de treino."
+    )
+    parser.add_argument(
+        "--models",
+        nargs="+",
+        choices=list(MODEL_ZOO),
+        default=None,
+        help="Subconjunto de modelos a avaliar (padrão: todos).",
+    )
+    parser.add_argument("--n-single", type=int, default=200)
+    args = parser.parse_args()
+    run_benchmark(models=args.models, n_single=args.n_single)
@@ -3,6 +3,7 @@ import numpy as np
 from pathlib import Path
 from sklearn.model_selection import train_test_split
 from src.utils import setup_logger
+from src.validation import error_counts, validate_frame
 
 logger = setup_logger("preprocessing")
 
@@ -66,11 +67,17 @@ def convert_brazilian_numbers(df: pd.DataFrame) -> pd.DataFrame:
 
         if df[col].dtype == "object":
             try:
-                series_str = df[col].astype(str)
+                # Converte apenas os valores distintos (poucos no PEDE) e propaga
+                # pelos códigos: mesmo resultado, sem percorrer todas as células em Python
+                codes, uniques = pd.factorize(df[col])
+                series_str = pd.Series(uniques, dtype=object).astype(str)
                 clean_series = series_str.str.replace(".", "", regex=False).str.replace(
                     ",", ".", regex=False
                 )
-                df[col] = pd.to_numeric(clean_series, errors="coerce")
+                converted = pd.to_numeric(clean_series, errors="coerce").to_numpy()
+                if (codes < 0).any():
+                    converted = np.append(converted.astype(float), np.nan)
+                df[col] = converted[codes]
                 logger.debug(f"Coluna processada para numérico: {col}")
             except Exception as e:
                 logger.warning(f"Erro ao processar coluna {col}: {e}")
@@ -89,21 +96,73 @@ def load_dataset(file_path: Path) -> pd.DataFrame:
     try:
         df = pd.read_csv(file_path, dtype=str)
         logger.info(f"Dataset carregado: {df.shape[0]} linhas.")
-
-        df = normalize_columns(df)
-        df = convert_brazilian_numbers(df)
-
-        int_cols = ["fase", "ano_nasc", "idade_22", "ano_ingresso"]
-        for col in int_cols:
-            if col in df.columns:
-                df[col] = pd.to_numeric(df[col], errors="coerce").fillna(0).astype(int)
-
-        return df
+        return clean_dataset(df)
     except Exception as e:
         logger.critical(f"Erro ao carregar dataset: {e}")
         raise
 
 
+def clean_dataset(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Normaliza colunas e corrige tipos numéricos de um DataFrame lido como texto.
+    """
+    df = normalize_columns(df)
+    df = convert_brazilian_numbers(df)
+
+    int_cols = ["fase", "ano_nasc", "idade_22", "ano_ingresso"]
+    for col in int_cols:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors="coerce").fillna(0).astype(int)
+
+    return df
+
+
+def iter_dataset_chunks(file_path, chunksize: int = 50_000):
+    """
+    Lê um CSV no formato bruto do PEDE em blocos, aplicando a mesma limpeza de
+    load_dataset a cada bloco. Mantém a memória limitada para arquivos grandes.
+
+    Args:
+        file_path: Caminho (ou buffer) do CSV.
+        chunksize (int): Linhas por bloco.
+
+    Yields:
+        pd.DataFrame: Bloco limpo.
+    """
+    if isinstance(file_path, Path) and not file_path.exists():
+        logger.error(f"Arquivo não encontrado: {file_path}")
+        raise FileNotFoundError(f"Arquivo não encontrado: {file_path}")
+
+    for chunk in pd.read_csv(file_path, dtype=str, chunksize=chunksize):
+        yield clean_dataset(chunk)
+
+
+def drop_invalid_rows(df: pd.DataFrame, rules: list, required: bool = False) -> tuple:
+    """
+    Remove as linhas que violam o contrato de entrada (ex: nota fora de 0-10,
+    Pedra ou Sim/Não com grafia desconhecida) em uma passada vetorizada.
+
+    Args:
+        df (pd.DataFrame): Bloco limpo (clean_dataset).
+        rules (list): Regras de src.validation.derive_rules (ex: ALUNO_RULES).
+        required (bool): Também exige os campos obrigatórios; por padrão
+            colunas ausentes e nulos seguem para a imputação do pipeline.
+
+    Returns:
+        tuple: (linhas válidas, linhas com erro por campo).
+    """
+    mask = validate_frame(df, rules, required=required)
+    invalid = mask != 0
+    if not invalid.any():
+        return df, {}
+
+    counts = error_counts(mask, rules)
+    logger.warning(
+        f"Removidas {int(invalid.sum())} linhas fora do contrato de entrada: {counts}"
+    )
+    return df[~invalid], counts
+
+
 def create_target(df: pd.DataFrame) -> pd.DataFrame:
     """
     Cria a variável alvo 'ALVO' baseada na coluna 'defas' (Defasagem).
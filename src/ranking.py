@@ -0,0 +1,235 @@
+import argparse
+import json
+import time
+from collections import Counter
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+import sklearn
+
+from src.preprocessing import drop_invalid_rows, iter_dataset_chunks
+from src.risk_bands import BAND_NAMES, assign_bands
+from src.utils import setup_logger
+
+# Garante que o Scikit-Learn retorne Pandas DataFrames nas transformações
+sklearn.set_config(transform_output="pandas")
+logger = setup_logger("ranking")
+
+# Colunas de identificação mantidas para os alunos selecionados
+ID_COLUMNS = ["ra", "nome", "turma", "fase"]
+GROUP_COLUMNS = ["turma", "fase"]
+
+
+def get_project_root() -> Path:
+    return Path(__file__).resolve().parent.parent
+
+
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """Índices dos k maiores scores por seleção parcial (argpartition, O(n)), sem ordenar."""
+    if len(scores) <= k:
+        return np.arange(len(scores))
+    return np.argpartition(-scores, k - 1)[:k]
+
+
+class RunningTopK:
+    """
+    Top-k incremental por grupo.
+
+    Cada bloco é reduzido aos seus k melhores candidatos por grupo e combinado
+    com o top-k acumulado; assim a memória depende de k x número de grupos,
+    e não do tamanho da lista de alunos.
+    """
+
+    def __init__(self, k: int):
+        self.k = k
+        self.n_seen = 0
+        self._groups = {}
+
+    def update(self, scores: np.ndarray, records: pd.DataFrame, groups=None):
+        """
+        Incorpora um bloco pontuado.
+
+        Args:
+            scores (np.ndarray): Probabilidade de risco de cada linha.
+            records (pd.DataFrame): Colunas de identificação (mesma ordem de scores).
+            groups: Valores de agrupamento por linha (ex: turma) ou None.
+        """
+        self.n_seen += len(scores)
+        records = records.reset_index(drop=True)
+
+        if groups is None:
+            partitions = {None: np.arange(len(scores))}
+        else:
+            codes, uniques = pd.factorize(pd.Series(groups), use_na_sentinel=False)
+            indices = pd.Series(np.arange(len(codes))).groupby(codes).indices
+            partitions = {_to_key(uniques[c]): idx for c, idx in indices.items()}
+
+        for key, idx in partitions.items():
+            selected = idx[top_k_indices(scores[idx], self.k)]
+            candidates = records.iloc[selected].assign(
+                probabilidade_risco=scores[selected]
+            )
+            if key in self._groups:
+                candidates = pd.concat(
+                    [self._groups[key], candidates], ignore_index=True
+                )
+                keep = top_k_indices(
+                    candidates["probabilidade_risco"].to_numpy(), self.k
+                )
+                candidates = candidates.iloc[keep]
+            self._groups[key] = candidates.reset_index(drop=True)
+
+    def result(self) -> dict:
+        """Top-k final de cada grupo, ordenado (apenas k elementos por grupo)."""
+        return {
+            key: frame.sort_values(
+                "probabilidade_risco", ascending=False, kind="stable"
+            ).reset_index(drop=True)
+            for key, frame in self._groups.items()
+        }
+
+
+def _to_key(value):
+    """Chave de grupo serializável (numpy -> Python, NaN -> None)."""
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return None
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def rank_roster(
+    model,
+    chunks,
+    k: int = 20,
+    group_by: str = None,
+    thresholds: dict = None,
+    rules: list = None,
+) -> dict:
+    """
+    Pontua uma lista de alunos em blocos e retorna os k de maior risco.
+
+    Cada bloco é pontuado em uma única chamada predict_proba e reduzido ao
+    top-k corrente (seleção parcial via argpartition), sem ordenar a lista inteira.
+    Com 'rules', linhas fora do contrato de entrada são descartadas antes do
+    modelo (validação vetorizada por bloco) e contadas por campo.
+
+    Args:
+        model: Pipeline treinado.
+        chunks: Iterável de DataFrames (formato de entrada do modelo).
+        k (int): Número de alunos por grupo.
+        group_by (str): 'turma', 'fase' ou None (ranking geral).
+        thresholds (dict): Limiares das faixas de risco (padrão: 0.75/0.80/0.85).
+        rules (list): Regras de validação (ex: app.schemas.ALUNO_RULES).
+
+    Returns:
+        dict: Total de alunos avaliados, descartados por campo e o ranking por grupo.
+    """
+    running = RunningTopK(k)
+    invalid = Counter()
+    n_invalid = 0
+    for chunk in chunks:
+        if rules is not None and not chunk.empty:
+            valid, counts = drop_invalid_rows(chunk, rules)
+            n_invalid += len(chunk) - len(valid)
+            invalid.update(counts)
+            chunk = valid
+        if chunk.empty:
+            continue
+        scores = np.asarray(model.predict_proba(chunk))[:, 1]
+        records = chunk.reindex(columns=ID_COLUMNS)
+        groups = chunk[group_by].to_numpy() if group_by else None
+        running.update(scores, records, groups)
+
+    grupos = []
+    for key, frame in running.result().items():
+        bands = assign_bands(frame["probabilidade_risco"].to_numpy(), thresholds)
+        alunos = []
+        for position, (row, band) in enumerate(
+            zip(frame.to_dict(orient="records"), bands), start=1
+        ):
+            aluno = {col: _to_key(row[col]) for col in ID_COLUMNS}
+            aluno["posicao"] = position
+            aluno["probabilidade_risco"] = round(float(row["probabilidade_risco"]), 4)
+            aluno["faixa"] = BAND_NAMES[band]
+            alunos.append(aluno)
+        grupos.append({"grupo": key, "alunos": alunos})
+
+    # Grupos com os alunos de maior risco primeiro
+    grupos.sort(key=lambda g: -g["alunos"][0]["probabilidade_risco"])
+    return {
+        "k": k,
+        "agrupado_por": group_by,
+        "total_alunos": running.n_seen,
+        "alunos_invalidos": n_invalid,
+        "erros_por_campo": dict(invalid),
+        "grupos": grupos,
+    }
+
+
+def iter_roster(path: Path, chunksize: int = 50_000):
+    """
+    Lê a lista de alunos em blocos.
+    - .csv: formato bruto do PEDE (mesma limpeza do treinamento).
+    - .jsonl: um aluno por linha no formato da API (AlunoInput).
+    - .json: lista de alunos no formato da API (carregada de uma vez).
+    """
+    if path.suffix == ".jsonl":
+        yield from pd.read_json(path, lines=True, chunksize=chunksize)
+    elif path.suffix == ".json":
+        with open(path, encoding="utf-8") as f:
+            yield pd.DataFrame(json.load(f))
+    else:
+        yield from iter_dataset_chunks(path, chunksize=chunksize)
+
+
+if __name__ == "__main__":
+    root = get_project_root()
+    parser = argparse.ArgumentParser(
+        description="Ranking dos alunos de maior risco (top-k) de uma turma/coorte."
+    )
+    parser.add_argument(
+        "--roster", type=Path, default=root / "data" / "raw" / "dataset_pede_passos.csv"
+    )
+    parser.add_argument("--k", type=int, default=20)
+    parser.add_argument("--agrupar-por", choices=GROUP_COLUMNS, default=None)
+    parser.add_argument("--chunksize", type=int, default=50_000)
+    parser.add_argument(
+        "--model", type=Path, default=root / "app" / "model" / "pipeline.joblib"
+    )
+    parser.add_argument(
+        "--output", type=Path, default=root / "reports" / "ranking.json"
+    )
+    args = parser.parse_args()
+
+    from app.schemas import ALUNO_RULES
+
+    model = joblib.load(args.model)
+    start = time.perf_counter()
+    ranking = rank_roster(
+        model,
+        iter_roster(args.roster, chunksize=args.chunksize),
+        k=args.k,
+        group_by=args.agrupar_por,
+        rules=ALUNO_RULES,
+    )
+    elapsed = time.perf_counter() - start
+
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(ranking, f, indent=2, ensure_ascii=False)
+
+    logger.info(
+        f"{ranking['total_alunos']} alunos avaliados em {elapsed:.2f}s "
+        f"({len(ranking['grupos'])} grupos, "
+        f"{ranking['alunos_invalidos']} descartados na validação)."
+    )
+    for grupo in ranking["grupos"][:5]:
+        top = grupo["alunos"][0]
+        logger.info(
+            f"Grupo {grupo['grupo']}: maior risco {top['ra']} "
+            f"({top['probabilidade_risco']:.2%}, {top['faixa']})"
+        )
+    logger.info(f"Ranking salvo em: {args.output}")
@@ -0,0 +1,73 @@
+import json
+from pathlib import Path
+
+import numpy as np
+
+# Limiares pedagógicos aplicados sobre a probabilidade de risco (ver /predict)
+DEFAULT_THRESHOLDS = {"atencao": 0.75, "alerta": 0.80, "critico": 0.85}
+# Arquivo de limiares calibrados (gerado por src.threshold_sweep, em app/model/)
+THRESHOLDS_NAME = "thresholds.json"
+
+# Faixas em ordem crescente de risco
+BAND_NAMES = ["estavel", "atencao", "alerta", "critico"]
+BAND_LABELS = {
+    "estavel": "ESTÁVEL",
+    "atencao": "ATENÇÃO",
+    "alerta": "ALERTA",
+    "critico": "CRÍTICO",
+}
+# Mensagem pedagógica de cada faixa (resposta do /predict)
+BAND_MESSAGES = {
+    "estavel": "ESTÁVEL: Aluno com bom prognóstico. Manter acompanhamento padrão.",
+    "atencao": "ATENÇÃO: Risco moderado. Monitorar indicadores de engajamento.",
+    "alerta": "ALERTA: Alto risco de defasagem. Acompanhamento próximo sugerido.",
+    "critico": "CRÍTICO: Risco muito alto de defasagem. Intervenção pedagógica imediata recomendada.",
+}
+
+
+def band_cut_points(thresholds: dict = None) -> np.ndarray:
+    """Retorna os limiares (atenção, alerta, crítico) em ordem crescente."""
+    thresholds = thresholds or DEFAULT_THRESHOLDS
+    return np.array([thresholds[name] for name in BAND_NAMES[1:]], dtype=float)
+
+
+def assign_bands(proba, thresholds: dict = None) -> np.ndarray:
+    """
+    Atribui a faixa de risco de cada probabilidade de forma vetorizada.
+
+    Args:
+        proba: Probabilidades de risco (escalar ou array).
+        thresholds (dict): Limiares por faixa (padrão: DEFAULT_THRESHOLDS).
+
+    Returns:
+        np.ndarray: Índice da faixa em BAND_NAMES (0 = estável ... 3 = crítico).
+    """
+    return np.searchsorted(band_cut_points(thresholds), proba, side="right")
+
+
+def load_thresholds(path: Path):
+    """
+    Carrega os limiares calibrados (gerados por src.threshold_sweep).
+
+    O arquivo traz os limiares das faixas ('atencao', 'alerta', 'critico') e,
+    opcionalmente, o limiar de decisão do risco ('decisao').
+
+    Returns:
+        tuple: (limiares das faixas, limiar de decisão ou None), ou
+            (DEFAULT_THRESHOLDS, None) se o arquivo não existir.
+
+    Raises:
+        ValueError: Se os limiares não forem crescentes dentro de [0, 1].
+    """
+    path = Path(path)
+    if not path.exists():
+        return dict(DEFAULT_THRESHOLDS), None
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+
+    thresholds = {name: float(data[name]) for name in BAND_NAMES[1:]}
+    cuts = band_cut_points(thresholds)
+    if np.any(np.diff(cuts) < 0) or cuts[0] < 0 or cuts[-1] > 1:
+        raise ValueError(f"Limiares de faixa inválidos em {path}: {thresholds}")
+    decision = data.get("decisao")
+    return thresholds, None if decision is None else float(decision)
@@ -0,0 +1,388 @@
+import argparse
+import hashlib
+import sqlite3
+import time
+from contextlib import closing
+from datetime import datetime, timezone
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+import sklearn
+
+from src.preprocessing import drop_invalid_rows
+from src.risk_bands import BAND_NAMES, assign_bands, band_cut_points
+from src.utils import setup_logger
+
+# Garante que o Scikit-Learn retorne Pandas DataFrames nas transformações
+sklearn.set_config(transform_output="pandas")
+logger = setup_logger("score_store")
+
+# Limite de parâmetros por consulta 'IN (...)' (SQLite aceita ao menos 999)
+SQL_BATCH = 500
+# Valor ausente nas colunas não numéricas do fingerprint
+NULL_MARKER = "\x00nulo"
+
+
+def get_project_root() -> Path:
+    return Path(__file__).resolve().parent.parent
+
+
+def model_version(model_path: Path) -> str:
+    """Versão do modelo: hash (SHA-256, 12 caracteres) do artefato serializado."""
+    digest = hashlib.sha256()
+    with open(model_path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()[:12]
+
+
+def model_input_columns(model) -> list:
+    """Colunas brutas efetivamente usadas pelo pré-processamento do pipeline."""
+    preprocessor = model.named_steps["preprocessor"]
+    columns = []
+    for _, transformer, cols in preprocessor.transformers_:
+        if transformer != "drop":
+            columns.extend(cols)
+    return columns
+
+
+def model_numeric_columns(model) -> list:
+    """Colunas declaradas como numéricas no pré-processamento (transformer 'num')."""
+    preprocessor = model.named_steps["preprocessor"]
+    return [
+        col
+        for name, transformer, cols in preprocessor.transformers_
+        if name == "num" and transformer != "drop"
+        for col in cols
+    ]
+
+
+def input_fingerprints(
+    df: pd.DataFrame, columns: list, numeric: list = ()
+) -> np.ndarray:
+    """
+    Impressão digital vetorizada das entradas de cada aluno (hash de 64 bits em hex).
+
+    Apenas as colunas usadas pelo modelo entram no hash. As colunas 'numeric'
+    são sempre convertidas para float64 (mesmo quando o bloco só tem nulos) e
+    as demais para string, com nulos (None do JSON, NaN do CSV) e colunas
+    ausentes normalizados para um único marcador. Assim o mesmo aluno gera o
+    mesmo fingerprint independentemente da origem e do restante do bloco.
+    """
+    numeric = set(numeric)
+    normalized = pd.DataFrame(index=range(len(df)))
+    for col in columns:
+        if col not in df.columns:
+            normalized[col] = np.nan if col in numeric else NULL_MARKER
+            continue
+        values = df[col].reset_index(drop=True)
+        if col in numeric:
+            normalized[col] = pd.to_numeric(values, errors="coerce").astype(float)
+            normalized[col] = normalized[col].round(6)
+        else:
+            text = values.astype(object).astype(str)
+            normalized[col] = text.where(values.notna(), NULL_MARKER)
+    hashes = pd.util.hash_pandas_object(normalized, index=False).to_numpy()
+    return np.char.mod("%016x", hashes)
+
+
+def band_range(faixa: str, thresholds: dict = None) -> tuple:
+    """
+    Intervalo [inferior, superior) de probabilidade de uma faixa de risco
+    (None = sem limite), equivalente a assign_bands com os mesmos limiares.
+    """
+    cuts = [None, *band_cut_points(thresholds).tolist(), None]
+    band = BAND_NAMES.index(faixa)
+    return cuts[band], cuts[band + 1]
+
+
+class ScoreStore:
+    """
+    Armazenamento local (SQLite) dos scores por RA.
+
+    Cada linha guarda o fingerprint da entrada, a versão do modelo e a
+    probabilidade, com índices por turma e probabilidade. A faixa de risco não
+    é gravada: é derivada na leitura com os limiares informados (o filtro por
+    faixa vira um intervalo de probabilidade, ver band_range), e não fica
+    desatualizada quando THRESHOLDS_PATH muda. Conexões são abertas por
+    operação (seguro entre threads do servidor).
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with closing(self._connect()) as conn, conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS scores (
+                    ra TEXT PRIMARY KEY,
+                    turma TEXT,
+                    fase INTEGER,
+                    fingerprint TEXT NOT NULL,
+                    versao_modelo TEXT NOT NULL,
+                    probabilidade REAL NOT NULL,
+                    atualizado_em TEXT NOT NULL
+                )
+                """
+            )
+            # Bases antigas gravavam a faixa (desatualizada ao trocar os limiares)
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(scores)")}
+            if "faixa" in columns:
+                conn.execute("DROP INDEX IF EXISTS idx_faixa")
+                conn.execute("ALTER TABLE scores DROP COLUMN faixa")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_turma ON scores (turma)")
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_probabilidade ON scores (probabilidade)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def get_state(self, ras: list) -> dict:
+        """Retorna ra -> (fingerprint, versao_modelo) dos RAs já armazenados."""
+        state = {}
+        with closing(self._connect()) as conn:
+            for start in range(0, len(ras), SQL_BATCH):
+                batch = ras[start : start + SQL_BATCH]
+                placeholders = ",".join("?" * len(batch))
+                rows = conn.execute(
+                    "SELECT ra, fingerprint, versao_modelo FROM scores "
+                    f"WHERE ra IN ({placeholders})",
+                    batch,
+                )
+                state.update(
+                    {r["ra"]: (r["fingerprint"], r["versao_modelo"]) for r in rows}
+                )
+        return state
+
+    def upsert(self, rows: list):
+        """Insere ou atualiza scores (lista de dicts com as colunas da tabela)."""
+        with closing(self._connect()) as conn, conn:
+            conn.executemany(
+                """
+                INSERT INTO scores (ra, turma, fase, fingerprint, versao_modelo,
+                                    probabilidade, atualizado_em)
+                VALUES (:ra, :turma, :fase, :fingerprint, :versao_modelo,
+                        :probabilidade, :atualizado_em)
+                ON CONFLICT(ra) DO UPDATE SET
+                    turma = excluded.turma,
+                    fase = excluded.fase,
+                    fingerprint = excluded.fingerprint,
+                    versao_modelo = excluded.versao_modelo,
+                    probabilidade = excluded.probabilidade,
+                    atualizado_em = excluded.atualizado_em
+                """,
+                rows,
+            )
+
+    def update_metadata(self, rows: list):
+        """Atualiza turma e fase de RAs cujo score foi reaproveitado."""
+        with closing(self._connect()) as conn, conn:
+            conn.executemany(
+                "UPDATE scores SET turma = :turma, fase = :fase WHERE ra = :ra",
+                rows,
+            )
+
+    @staticmethod
+    def _with_band(rows: list, thresholds: dict = None) -> list:
+        """Linhas como dicts, com a faixa derivada da probabilidade."""
+        records = [dict(row) for row in rows]
+        bands = assign_bands([r["probabilidade"] for r in records], thresholds)
+        for record, band in zip(records, bands):
+            record["faixa"] = BAND_NAMES[band]
+        return records
+
+    def get(self, ra: str, thresholds: dict = None):
+        """Score armazenado de um RA (ou None), com a faixa dos limiares vigentes."""
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT * FROM scores WHERE ra = ?", (ra,)).fetchone()
+        return self._with_band([row], thresholds)[0] if row else None
+
+    def query(
+        self,
+        turma: str = None,
+        faixa: str = None,
+        limit: int = 100,
+        thresholds: dict = None,
+    ) -> list:
+        """Scores filtrados por turma e/ou faixa, do maior para o menor risco."""
+        clauses, params = [], []
+        if turma is not None:
+            clauses.append("turma = ?")
+            params.append(turma)
+        if faixa is not None:
+            # Faixa como intervalo de probabilidade (usa idx_probabilidade)
+            lower, upper = band_range(faixa, thresholds)
+            if lower is not None:
+                clauses.append("probabilidade >= ?")
+                params.append(lower)
+            if upper is not None:
+                clauses.append("probabilidade < ?")
+                params.append(upper)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                f"SELECT * FROM scores {where} ORDER BY probabilidade DESC LIMIT ?",
+                [*params, limit],
+            ).fetchall()
+        return self._with_band(rows, thresholds)
+
+
+def _metadata(df: pd.DataFrame, column: str, cast) -> np.ndarray:
+    """Coluna de metadados (turma/fase) convertida, com None para ausentes."""
+    if column not in df.columns:
+        return np.full(len(df), None, dtype=object)
+    return np.array([None if pd.isna(v) else cast(v) for v in df[column]], dtype=object)
+
+
+def score_incremental(
+    model,
+    chunks,
+    store: ScoreStore,
+    version: str,
+    force: bool = False,
+    rules: list = None,
+) -> dict:
+    """
+    Pontua uma lista de alunos reavaliando apenas o que mudou.
+
+    Para cada bloco: calcula o fingerprint das entradas, compara com o
+    armazenado e chama o modelo SOMENTE para RAs novos, com entrada alterada ou
+    pontuados por outra versão do modelo. Turma e fase dos reaproveitados são
+    sempre atualizadas (não entram no fingerprint).
+
+    Args:
+        model: Pipeline treinado.
+        chunks: Iterável de DataFrames com a coluna 'ra'.
+        store (ScoreStore): Armazenamento de scores.
+        version (str): Versão do modelo (ver model_version).
+        force (bool): Reavalia todos os alunos.
+        rules (list): Regras de validação (ex: app.schemas.ALUNO_RULES); linhas
+            fora do contrato de entrada são ignoradas.
+
+    Returns:
+        dict: Contagens de alunos avaliados, reaproveitados e ignorados (sem RA
+            ou inválidos).
+    """
+    columns = model_input_columns(model)
+    numeric = model_numeric_columns(model)
+    stats = {
+        "total": 0,
+        "reavaliados": 0,
+        "reaproveitados": 0,
+        "sem_ra": 0,
+        "invalidos": 0,
+    }
+
+    for chunk in chunks:
+        stats["total"] += len(chunk)
+        if rules is not None and not chunk.empty:
+            valid, _ = drop_invalid_rows(chunk, rules)
+            stats["invalidos"] += len(chunk) - len(valid)
+            chunk = valid
+        if "ra" not in chunk.columns:
+            stats["sem_ra"] += len(chunk)
+            continue
+        valid = chunk["ra"].notna().to_numpy()
+        stats["sem_ra"] += int((~valid).sum())
+        # RA duplicado no bloco: prevalece a última ocorrência
+        chunk = chunk[valid].drop_duplicates("ra", keep="last").reset_index(drop=True)
+        if chunk.empty:
+            continue
+
+        ras = chunk["ra"].astype(str).tolist()
+        fingerprints = input_fingerprints(chunk, columns, numeric)
+        stored = {} if force else store.get_state(ras)
+        changed = np.array(
+            [stored.get(ra) != (fp, version) for ra, fp in zip(ras, fingerprints)]
+        )
+        stats["reaproveitados"] += int((~changed).sum())
+        turmas = _metadata(chunk, "turma", str)
+        fases = _metadata(chunk, "fase", int)
+        if not changed.all():
+            store.update_metadata(
+                [
+                    {"ra": ra, "turma": t, "fase": f}
+                    for ra, t, f in zip(
+                        np.asarray(ras)[~changed],
+                        turmas[~changed],
+                        fases[~changed],
+                    )
+                ]
+            )
+        if not changed.any():
+            continue
+
+        subset = chunk[changed]
+        proba = np.asarray(model.predict_proba(subset))[:, 1]
+        now = datetime.now(timezone.utc).isoformat()
+
+        store.upsert(
+            [
+                {
+                    "ra": ra,
+                    "turma": t,
+                    "fase": f,
+                    "fingerprint": fp,
+                    "versao_modelo": version,
+                    "probabilidade": float(p),
+                    "atualizado_em": now,
+                }
+                for ra, t, f, fp, p in zip(
+                    np.asarray(ras)[changed],
+                    turmas[changed],
+                    fases[changed],
+                    fingerprints[changed],
+                    proba,
+                )
+            ]
+        )
+        stats["reavaliados"] += len(subset)
+
+    return stats
+
+
+if __name__ == "__main__":
+    from app.schemas import ALUNO_RULES
+    from src.ranking import iter_roster
+
+    root = get_project_root()
+    parser = argparse.ArgumentParser(
+        description="Pontuação incremental de uma lista de alunos (score store local)."
+    )
+    parser.add_argument(
+        "--roster", type=Path, default=root / "data" / "raw" / "dataset_pede_passos.csv"
+    )
+    parser.add_argument("--db", type=Path, default=root / "data" / "scores.db")
+    parser.add_argument(
+        "--model", type=Path, default=root / "app" / "model" / "pipeline.joblib"
+    )
+    parser.add_argument("--chunksize", type=int, default=50_000)
+    parser.add_argument(
+        "--force", action="store_true", help="Reavalia todos os alunos."
+    )
+    args = parser.parse_args()
+
+    model = joblib.load(args.model)
+    version = model_version(args.model)
+    start = time.perf_counter()
+    stats = score_incremental(
+        model,
+        iter_roster(args.roster, chunksize=args.chunksize),
+        ScoreStore(args.db),
+        version,
+        force=args.force,
+        rules=ALUNO_RULES,
+    )
+    logger.info(
+        f"Modelo {version}: {stats['total']} alunos | "
+        f"reavaliados={stats['reavaliados']} | "
+        f"reaproveitados={stats['reaproveitados']} | "
+        f"sem RA={stats['sem_ra']} | inválidos={stats['invalidos']} | "
+        f"{time.perf_counter() - start:.2f}s"
+    )
@@ -0,0 +1,369 @@
+import argparse
+import re
+import time
+from pathlib import Path
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+
+from src.utils import setup_logger
+
+logger = setup_logger("synthetic_data")
+
+# Colunas numéricas com mais valores distintos que isto são interpoladas entre
+# os quantis observados; as demais (Fase, IAN, Defas...) repetem os valores reais.
+MAX_DISCRETE_LEVELS = 20
+
+# Ordem das categorias ordinais no copula (demais categorias: por frequência)
+ORDINAL_LEVELS = [
+    ["Quartzo", "Ágata", "Ametista", "Topázio"],
+    ["Não", "Sim"],
+]
+
+# Grafias alternativas aceitas por PedraMapper/BinaryCleaner, injetadas com
+# 'variant_rate' para exercitar a limpeza como nos dados digitados à mão.
+SPELLING_VARIANTS = {
+    "Sim": ["S", "s", "sim", "SIM"],
+    "Não": ["N", "n", "não", "nao", "NÃO"],
+    "Quartzo": ["quartzo", "QUARTZO"],
+    "Ágata": ["Agata", "ágata", "AGATA"],
+    "Ametista": ["ametista", "AMETISTA"],
+    "Topázio": ["Topazio", "topázio", "TOPAZIO"],
+}
+
+# Sufixo da dimensão nulo/presente das colunas com valores ausentes no copula
+NULL_SUFFIX = "__nulo"
+
+_NORMAL = NormalDist()
+_ID_PATTERN = re.compile(r"^(.*?)(\d+)$")
+
+
+def get_project_root() -> Path:
+    return Path(__file__).resolve().parent.parent
+
+
+def _parse_br_number(values: pd.Series) -> pd.Series:
+    """Converte texto no formato PT-BR ('7,278') para float (NaN se inválido)."""
+    text = values.str.replace(".", "", regex=False).str.replace(",", ".", regex=False)
+    return pd.to_numeric(text, errors="coerce")
+
+
+def _decimals(values: pd.Series) -> int:
+    """Casas decimais usadas na coluna bruta ('5,000' -> 3, '7' -> 0)."""
+    parts = values.str.split(",", n=1).str[1]
+    return int(parts.str.len().max()) if parts.notna().any() else 0
+
+
+def _precision(levels: np.ndarray, decimals: int) -> int:
+    """Menor número de casas que representa todos os valores ('753,000' -> 0)."""
+    for places in range(decimals + 1):
+        scaled = levels * 10**places
+        if np.allclose(scaled, np.round(scaled)):
+            return places
+    return decimals
+
+
+def _z_cuts(probs) -> list:
+    """Limites em escala normal dos intervalos acumulados de cada nível."""
+    cum = np.clip(np.cumsum(probs)[:-1], 1e-12, 1 - 1e-12)
+    return [_NORMAL.inv_cdf(float(c)) for c in cum]
+
+
+def _z_mids(probs) -> np.ndarray:
+    """Escore normal do ponto médio do intervalo acumulado de cada nível."""
+    cum = np.cumsum(probs)
+    mids = np.clip(cum - np.asarray(probs) / 2, 1e-12, 1 - 1e-12)
+    return np.array([_NORMAL.inv_cdf(float(m)) for m in mids])
+
+
+def _column_profile(name: str, values: pd.Series) -> dict:
+    """Marginal de uma coluna bruta: tipo, fração de nulos e distribuição."""
+    present = values.dropna()
+    profile = {"coluna": name, "nulos": round(float(values.isna().mean()), 6)}
+
+    numbers = _parse_br_number(present)
+    if len(present) and numbers.notna().all():
+        counts = numbers.value_counts().sort_index()
+        decimals = _decimals(present)
+        profile.update(
+            {
+                "tipo": "numero",
+                "decimais": decimals,
+                "precisao": _precision(counts.index.to_numpy(), decimals),
+                "continuo": len(counts) > MAX_DISCRETE_LEVELS,
+                "niveis": counts.index.tolist(),
+                "probs": (counts / counts.sum()).tolist(),
+            }
+        )
+        return profile
+
+    ids = present.str.extract(_ID_PATTERN)
+    if present.is_unique and len(present) == len(values) and ids[0].nunique() == 1:
+        profile.update({"tipo": "id", "prefixo": ids[0].iloc[0]})
+        return profile
+
+    counts = present.value_counts()
+    levels = counts.index.tolist()
+    for ordinal in ORDINAL_LEVELS:
+        if set(levels) <= set(ordinal):
+            levels = [level for level in ordinal if level in counts.index]
+            break
+    profile.update(
+        {
+            "tipo": "categoria",
+            "niveis": levels,
+            "probs": (counts[levels] / counts.sum()).tolist(),
+        }
+    )
+    return profile
+
+
+def fit_synthetic_profile(df: pd.DataFrame) -> dict:
+    """
+    Aprende o perfil de geração a partir do CSV bruto do PEDE (lido como texto).
+
+    - Marginais por coluna: distribuição empírica dos valores (numéricos no
+      formato PT-BR ou categorias), fração de nulos e casas decimais.
+    - Correlações: copula gaussiana. Cada valor é levado à escala normal pelo
+      ponto médio do intervalo acumulado do seu nível (categorias ordinais como
+      Pedra e Sim/Não na ordem natural). Colunas com nulos ganham uma dimensão
+      extra (nulo/presente), e a correlação dos valores usa apenas as linhas
+      preenchidas: o Inglês, ausente em 2/3 dos alunos, mantém a correlação com
+      as demais notas. A matriz é estimada par a par e projetada para ser
+      positiva definida.
+    - Colunas identificadoras (RA, Nome) viram sequências com o mesmo prefixo.
+
+    Args:
+        df (pd.DataFrame): Dataset bruto com os cabeçalhos originais (dtype=str).
+
+    Returns:
+        dict: Perfil serializável em JSON, entrada de generate_chunk.
+    """
+    columns = [_column_profile(name, df[name]) for name in df.columns]
+
+    scores = {}
+    for column in columns:
+        if column["tipo"] == "id":
+            continue
+        name, raw = column["coluna"], df[column["coluna"]]
+        column["cortes_z"] = _z_cuts(column["probs"])
+        column["medios_z"] = _z_mids(column["probs"]).tolist()
+        if len(column["probs"]) > 1:
+            if column["tipo"] == "numero":
+                codes = np.searchsorted(column["niveis"], _parse_br_number(raw))
+            else:
+                codes = pd.Categorical(raw, column["niveis"]).codes
+            mids = np.append(column["medios_z"], np.nan)
+            scores[name] = mids[np.where(raw.isna(), -1, codes)]
+        if 0 < column["nulos"] < 1:
+            column["corte_nulo_z"] = _NORMAL.inv_cdf(column["nulos"])
+            null_mids = _z_mids([column["nulos"], 1 - column["nulos"]])
+            scores[name + NULL_SUFFIX] = np.where(raw.isna(), *null_mids)
+
+    corr = pd.DataFrame(scores).corr().fillna(0).to_numpy()
+    np.fill_diagonal(corr, 1.0)
+    eigenvalues, eigenvectors = np.linalg.eigh(corr)
+    # Colunas colineares (Idade 22 = 2022 - Ano nasc) deixam autovalores ~0
+    corr = eigenvectors @ np.diag(np.clip(eigenvalues, 1e-4, None)) @ eigenvectors.T
+    scale = np.sqrt(np.diag(corr))
+    corr = corr / np.outer(scale, scale)
+
+    return {
+        "n_origem": int(len(df)),
+        "colunas": columns,
+        "copula": {"dimensoes": list(scores), "correlacao": corr.tolist()},
+    }
+
+
+def _format_br(values: np.ndarray, decimals: int) -> np.ndarray:
+    """Tabela de textos PT-BR (vírgula decimal) dos valores, com "" (nulo) ao final."""
+    text = [f"{v:.{decimals}f}".replace(".", ",") for v in values]
+    return np.array(text + [""], dtype=object)
+
+
+def generate_chunk(
+    profile: dict,
+    start: int,
+    size: int,
+    seed,
+    variant_rate: float = 0.0,
+) -> pd.DataFrame:
+    """
+    Gera um bloco de alunos sintéticos no formato bruto do PEDE.
+
+    Amostra normais correlacionadas (Cholesky da correlação do copula) e
+    converte cada coluna pelo seu marginal direto na escala normal (os cortes
+    de nível já estão em escala z, sem avaliar a CDF normal por linha).
+    Colunas numéricas contínuas são interpoladas entre os quantis observados e
+    arredondadas à precisão da coluna.
+
+    Args:
+        profile (dict): Saída de fit_synthetic_profile.
+        start (int): Índice global da primeira linha (numeração dos IDs).
+        size (int): Linhas no bloco.
+        seed: Semente (int ou SeedSequence) do bloco.
+        variant_rate (float): Fração de valores Sim/Não e Pedra reescritos com
+            grafias alternativas (ex: 'S', 'nao', 'Agata').
+
+    Returns:
+        pd.DataFrame: Bloco com os cabeçalhos originais e valores em texto.
+    """
+    rng = np.random.default_rng(seed)
+    copula = profile["copula"]
+    chol = np.linalg.cholesky(np.asarray(copula["correlacao"]))
+    z = rng.standard_normal((size, len(copula["dimensoes"]))) @ chol.T
+    position = {name: j for j, name in enumerate(copula["dimensoes"])}
+
+    data = {}
+    for column in profile["colunas"]:
+        name = column["coluna"]
+        if column["tipo"] == "id":
+            data[name] = [
+                f"{column['prefixo']}{i}" for i in range(start + 1, start + size + 1)
+            ]
+            continue
+
+        zj = z[:, position[name]] if name in position else np.zeros(size)
+        codes = np.searchsorted(column["cortes_z"], zj, side="right")
+        if name + NULL_SUFFIX in position:
+            is_null = z[:, position[name + NULL_SUFFIX]] < column["corte_nulo_z"]
+        else:
+            is_null = np.full(size, column["nulos"] >= 1)
+
+        if column["tipo"] == "numero":
+            # Valores quantizados na precisão da coluna: cada valor possível é
+            # formatado uma única vez e as linhas apenas indexam a tabela.
+            levels = np.asarray(column["niveis"], dtype=float)
+            if column["continuo"]:
+                step = 10.0 ** -column["precisao"]
+                values = np.interp(zj, column["medios_z"], levels)
+                idx = np.rint((values - levels[0]) / step).astype(np.int64)
+                grid = levels[0] + np.arange(int(idx.max()) + 1) * step
+                table = _format_br(grid, column["decimais"])
+            else:
+                idx, table = codes, _format_br(levels, column["decimais"])
+            data[name] = table[np.where(is_null, len(table) - 1, idx)]
+        else:
+            values = np.asarray(column["niveis"], dtype=object)[codes]
+            values[is_null] = None
+            if variant_rate > 0:
+                values = _apply_variants(values, rng, variant_rate)
+            data[name] = values
+
+    return pd.DataFrame(data)
+
+
+def _apply_variants(values: np.ndarray, rng, rate: float) -> np.ndarray:
+    """Troca uma fração dos valores por grafias alternativas equivalentes."""
+    values = values.copy()
+    chosen = rng.random(len(values)) < rate
+    for canonical, variants in SPELLING_VARIANTS.items():
+        idx = np.flatnonzero(chosen & (values == canonical))
+        if len(idx):
+            values[idx] = np.asarray(variants, dtype=object)[
+                rng.integers(0, len(variants), len(idx))
+            ]
+    return values
+
+
+def _chunk_csv(profile, start, size, seed, variant_rate, header) -> str:
+    chunk = generate_chunk(profile, start, size, seed, variant_rate)
+    return chunk.to_csv(index=False, header=header)
+
+
+def write_synthetic_csv(
+    profile: dict,
+    output: Path,
+    n_rows: int,
+    chunksize: int = 100_000,
+    seed: int = 42,
+    n_jobs: int = -1,
+    variant_rate: float = 0.0,
+) -> dict:
+    """
+    Grava 'n_rows' alunos sintéticos em CSV, bloco a bloco.
+
+    Cada bloco tem sua semente derivada (SeedSequence.spawn) e é gerado e
+    serializado em paralelo (joblib); os blocos são gravados em ordem assim
+    que ficam prontos, com no máximo ~2 blocos por processo em memória. O
+    arquivo depende apenas de 'seed' e 'chunksize', não de 'n_jobs'.
+
+    Returns:
+        dict: Linhas, blocos, tempo e vazão da geração.
+    """
+    started = time.perf_counter()
+    sizes = [chunksize] * (n_rows // chunksize)
+    if n_rows % chunksize:
+        sizes.append(n_rows % chunksize)
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    starts = np.cumsum([0] + sizes[:-1])
+
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, "w", encoding="utf-8", newline="") as f:
+        blocks = Parallel(n_jobs=n_jobs, return_as="generator")(
+            delayed(_chunk_csv)(profile, int(s), size, child, variant_rate, i == 0)
+            for i, (s, size, child) in enumerate(zip(starts, sizes, seeds))
+        )
+        for text in blocks:
+            f.write(text)
+
+    elapsed = time.perf_counter() - started
+    return {
+        "linhas": n_rows,
+        "blocos": len(sizes),
+        "tempo_segundos": round(elapsed, 3),
+        "linhas_por_segundo": round(n_rows / elapsed, 1) if elapsed else None,
+    }
+
+
+if __name__ == "__main__":
+    root = get_project_root()
+    parser = argparse.ArgumentParser(
+        description="Gera alunos sintéticos no formato bruto do PEDE."
+    )
+    parser.add_argument(
+        "--fonte",
+        type=Path,
+        default=root / "data" / "raw" / "dataset_pede_passos.csv",
+        help="CSV bruto real usado para aprender marginais e correlações.",
+    )
+    parser.add_argument("--linhas", type=int, default=100_000)
+    parser.add_argument("--chunksize", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--n-jobs", type=int, default=-1)
+    parser.add_argument(
+        "--taxa-variantes",
+        type=float,
+        default=0.02,
+        help="Fração de valores Sim/Não e Pedra com grafia alternativa.",
+    )
+    parser.add_argument(
+        "--output",
+        type=Path,
+        default=root / "data" / "synthetic" / "dataset_pede_sintetico.csv",
+    )
+    args = parser.parse_args()
+
+    source = pd.read_csv(args.fonte, dtype=str)
+    profile = fit_synthetic_profile(source)
+    logger.info(
+        f"Perfil aprendido de {profile['n_origem']} alunos "
+        f"({len(profile['copula']['dimensoes'])} dimensões no copula)."
+    )
+
+    stats = write_synthetic_csv(
+        profile,
+        args.output,
+        args.linhas,
+        chunksize=args.chunksize,
+        seed=args.seed,
+        n_jobs=args.n_jobs,
+        variant_rate=args.taxa_variantes,
+    )
+    logger.info(
+        f"{stats['linhas']} alunos em {stats['blocos']} blocos gerados em "
+        f"{stats['tempo_segundos']:.1f}s ({stats['linhas_por_segundo']:.0f} linhas/s) "
+        f"-> {args.output}"
+    )
@@ -0,0 +1,231 @@
+import argparse
+import json
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import joblib
+import numpy as np
+import sklearn
+
+from src.evaluate import iter_test_chunks
+from src.risk_bands import BAND_NAMES, DEFAULT_THRESHOLDS, THRESHOLDS_NAME
+from src.utils import setup_logger
+
+# Import necessário para o joblib reconhecer as classes customizadas ao carregar o pipeline
+from src.feature_engineering import (  # noqa: F401
+    PedraMapper,
+    BinaryCleaner,
+    IncrementalPreprocessor,
+)
+
+sklearn.set_config(transform_output="pandas")
+logger = setup_logger("threshold_sweep")
+
+# Critérios padrão: recall mínimo da decisão e precisão mínima de cada faixa
+DEFAULT_RECALL_TARGET = 0.80
+DEFAULT_PRECISION_TARGETS = {"atencao": 0.80, "alerta": 0.85, "critico": 0.90}
+
+
+def get_project_root() -> Path:
+    return Path(__file__).resolve().parent.parent
+
+
+def sweep_thresholds(y_true: np.ndarray, proba: np.ndarray) -> dict:
+    """
+    Varre todos os limiares candidatos em uma única passada ordenada (O(n log n)).
+
+    Os alunos são ordenados pela probabilidade (decrescente) e as somas
+    acumuladas de positivos/negativos dão, para cada valor distinto de
+    probabilidade usado como limiar (risco se proba >= limiar), os verdadeiros
+    e falsos positivos de uma só vez.
+
+    Returns:
+        dict: Arrays alinhados (limiares decrescentes) com limiar, tp, fp,
+            recall, precisão, alunos sinalizados e carga (fração sinalizada).
+    """
+    y_true = np.asarray(y_true, dtype=int)
+    proba = np.asarray(proba, dtype=float)
+    order = np.argsort(-proba, kind="stable")
+    sorted_proba, sorted_y = proba[order], y_true[order]
+
+    tp = np.cumsum(sorted_y)
+    fp = np.cumsum(1 - sorted_y)
+    # Empates: o limiar inclui todos os alunos com a mesma probabilidade
+    last = np.r_[np.flatnonzero(np.diff(sorted_proba)), len(sorted_proba) - 1]
+    tp, fp = tp[last], fp[last]
+    flagged = tp + fp
+    positives = max(int(y_true.sum()), 1)
+
+    return {
+        "limiar": sorted_proba[last],
+        "tp": tp,
+        "fp": fp,
+        "recall": tp / positives,
+        "precisao": tp / flagged,
+        "sinalizados": flagged,
+        "carga": flagged / len(proba),
+    }
+
+
+def recommend_thresholds(
+    sweep: dict,
+    recall_target: float = DEFAULT_RECALL_TARGET,
+    precision_targets: dict = None,
+) -> dict:
+    """
+    Recomenda o limiar de decisão e os pontos de corte das faixas de risco.
+
+    - decisao: MAIOR limiar com recall >= recall_target (KPI do projeto: não
+      deixar de identificar alunos em risco com a menor carga possível).
+    - faixas: MENOR limiar cuja precisão atinge a meta da faixa; os cortes são
+      forçados a ser crescentes (atenção <= alerta <= crítico). Metas
+      inalcançáveis mantêm o limiar padrão.
+    """
+    precision_targets = precision_targets or DEFAULT_PRECISION_TARGETS
+    thresholds = sweep["limiar"]
+
+    reached = np.flatnonzero(sweep["recall"] >= recall_target)
+    decision = float(thresholds[reached[0]]) if len(reached) else float(thresholds[-1])
+
+    cuts = []
+    for name in BAND_NAMES[1:]:
+        ok = np.flatnonzero(sweep["precisao"] >= precision_targets[name])
+        if len(ok):
+            cuts.append(float(thresholds[ok[-1]]))
+        else:
+            logger.warning(
+                f"Precisão {precision_targets[name]:.0%} inalcançável para '{name}'; "
+                f"mantido o limiar padrão {DEFAULT_THRESHOLDS[name]}."
+            )
+            cuts.append(DEFAULT_THRESHOLDS[name])
+    cuts = np.maximum.accumulate(cuts)
+
+    recommended = {"decisao": round(decision, 4)}
+    recommended.update(
+        {name: round(float(c), 4) for name, c in zip(BAND_NAMES[1:], cuts)}
+    )
+    return recommended
+
+
+def operating_point(sweep: dict, threshold: float) -> dict:
+    """Recall, precisão e carga de intervenção ao sinalizar proba >= threshold."""
+    # Limiares em ordem decrescente: último índice ainda >= threshold
+    i = np.searchsorted(-sweep["limiar"], -threshold, side="right") - 1
+    if i < 0:
+        return {"recall": 0.0, "precisao": None, "sinalizados": 0, "carga": 0.0}
+    return {
+        "recall": round(float(sweep["recall"][i]), 4),
+        "precisao": round(float(sweep["precisao"][i]), 4),
+        "sinalizados": int(sweep["sinalizados"][i]),
+        "carga": round(float(sweep["carga"][i]), 4),
+    }
+
+
+def run_threshold_sweep(
+    pipeline,
+    chunks,
+    recall_target: float = DEFAULT_RECALL_TARGET,
+    precision_targets: dict = None,
+) -> tuple:
+    """
+    Pontua o conjunto de teste uma única vez e calibra os limiares.
+
+    Returns:
+        tuple: (limiares recomendados com critérios e desempenho, curva completa).
+    """
+    started = time.perf_counter()
+    y_parts, proba_parts = [], []
+    for X_chunk, y_chunk in chunks:
+        y_parts.append(y_chunk.to_numpy().ravel())
+        proba_parts.append(np.asarray(pipeline.predict_proba(X_chunk))[:, 1])
+    y_true, proba = np.concatenate(y_parts), np.concatenate(proba_parts)
+
+    sweep = sweep_thresholds(y_true, proba)
+    recommended = recommend_thresholds(sweep, recall_target, precision_targets)
+
+    thresholds = {
+        **recommended,
+        "gerado_em": datetime.now(timezone.utc).isoformat(),
+        "n_alunos": int(len(y_true)),
+        "criterios": {
+            "recall_minimo_decisao": recall_target,
+            "precisao_minima_faixas": precision_targets or DEFAULT_PRECISION_TARGETS,
+        },
+        "desempenho": {
+            name: operating_point(sweep, value) for name, value in recommended.items()
+        },
+    }
+    curve = {
+        "n_alunos": int(len(y_true)),
+        "positivos": int(y_true.sum()),
+        "tempo_segundos": round(time.perf_counter() - started, 3),
+        "curva": [
+            {
+                "limiar": round(float(t), 6),
+                "recall": round(float(r), 4),
+                "precisao": round(float(p), 4),
+                "sinalizados": int(f),
+                "carga": round(float(c), 4),
+            }
+            for t, r, p, f, c in zip(
+                sweep["limiar"],
+                sweep["recall"],
+                sweep["precisao"],
+                sweep["sinalizados"],
+                sweep["carga"],
+            )
+        ],
+    }
+    return thresholds, curve
+
+
+if __name__ == "__main__":
+    root = get_project_root()
+    parser = argparse.ArgumentParser(
+        description="Varredura de limiares e calibração das faixas de risco."
+    )
+    parser.add_argument(
+        "--model", type=Path, default=root / "app" / "model" / "pipeline.joblib"
+    )
+    parser.add_argument("--chunksize", type=int, default=None)
+    parser.add_argument("--recall-alvo", type=float, default=DEFAULT_RECALL_TARGET)
+    for name, target in DEFAULT_PRECISION_TARGETS.items():
+        parser.add_argument(f"--precisao-{name}", type=float, default=target)
+    parser.add_argument(
+        "--output",
+        type=Path,
+        default=root / "app" / "model" / THRESHOLDS_NAME,
+        help="Limiares recomendados (lidos pela API via THRESHOLDS_PATH).",
+    )
+    parser.add_argument(
+        "--curva", type=Path, default=root / "reports" / "threshold_sweep.json"
+    )
+    args = parser.parse_args()
+
+    pipeline = joblib.load(args.model)
+    thresholds, curve = run_threshold_sweep(
+        pipeline,
+        iter_test_chunks(root / "data" / "processed", args.chunksize),
+        recall_target=args.recall_alvo,
+        precision_targets={
+            name: getattr(args, f"precisao_{name}")
+            for name in DEFAULT_PRECISION_TARGETS
+        },
+    )
+
+    for path, payload in [(args.output, thresholds), (args.curva, curve)]:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(payload, f, indent=2, ensure_ascii=False)
+
+    logger.info(
+        f"{curve['n_alunos']} alunos | {len(curve['curva'])} limiares avaliados "
+        f"em {curve['tempo_segundos']:.3f}s"
+    )
+    for name, point in thresholds["desempenho"].items():
+        logger.info(
+            f"{name}: limiar={thresholds[name]} | recall={point['recall']} | "
+            f"precisão={point['precisao']} | carga={point['carga']:.1%}"
+        )
+    logger.info(f"Limiares salvos em: {args.output} | curva: {args.curva}")
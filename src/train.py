@@ -1,47 +1,74 @@
+import argparse
+import tempfile
+import time
 import pandas as pd
 import joblib
 import sklearn
 from pathlib import Path
+from sklearn.base import clone
 from sklearn.pipeline import Pipeline
 from sklearn.compose import ColumnTransformer
 from sklearn.preprocessing import OneHotEncoder, StandardScaler
 from sklearn.impute import SimpleImputer
 from sklearn.linear_model import LogisticRegression
+from sklearn.ensemble import HistGradientBoostingClassifier, RandomForestClassifier
+from sklearn.model_selection import GridSearchCV, StratifiedKFold
 
 from src.utils import setup_logger
 from src.feature_engineering import PedraMapper, BinaryCleaner
+from src.drift import (
+    REFERENCE_PROFILE_NAME,
+    compute_reference_profile,
+    save_reference_profile,
+)
 
 # Garante que o Scikit-Learn retorne Pandas DataFrames nas transformações
 sklearn.set_config(transform_output="pandas")
 logger = setup_logger("train")
 
+# Artefato da melhor configuração não linear da busca (avaliável em modo sombra)
+TUNED_CHALLENGER_NAME = "challenger_tuned.joblib"
+
+# Grade de busca da Regressão Logística.
+# A partir do scikit-learn 1.8 a penalidade é expressa via 'l1_ratio'
+# (0 = L2, 1 = L1, intermediário = ElasticNet), respeitando o suporte de cada solver.
+C_GRID = [0.01, 0.1, 1.0, 10.0]
+LOGISTIC_PARAM_GRID = [
+    {
+        "classifier__solver": ["lbfgs"],
+        "classifier__l1_ratio": [0.0],
+        "classifier__C": C_GRID,
+    },
+    {
+        "classifier__solver": ["liblinear"],
+        "classifier__l1_ratio": [0.0, 1.0],
+        "classifier__C": C_GRID,
+    },
+    {
+        "classifier__solver": ["saga"],
+        "classifier__l1_ratio": [0.0, 0.5, 1.0],
+        "classifier__C": C_GRID,
+    },
+]
+
 
 def get_project_root() -> Path:
     return Path(__file__).resolve().parent.parent
 
 
-def create_pipeline(X_train: pd.DataFrame) -> Pipeline:
+def select_feature_columns(X: pd.DataFrame) -> dict:
     """
-    Constrói o pipeline completo de processamento e modelagem.
-
-    Estratégia de Pré-processamento:
-    1. Numéricas: Imputação pela mediana (robusto a outliers) + Padronização (StandardScaler).
-    2. Categóricas: Imputação de valor constante + OneHotEncoding.
-    3. Customizados:
-       - PedraMapper: Mapeamento ordinal das pedras (Quartzo < Ágata < Ametista < Topázio).
-       - BinaryCleaner: Padronização de booleanos textuais (Sim/Não).
+    Seleciona dinamicamente os grupos de colunas utilizados pelo modelo.
 
-    Modelo:
-    - LogisticRegression com class_weight='balanced' para lidar com o desbalanceamento
-      natural das classes de risco.
+    Centraliza a regra de prevenção de Data Leakage para que todos os pipelines
+    (baseline, incremental, benchmarks) usem exatamente as mesmas features.
 
     Args:
-        X_train (pd.DataFrame): DataFrame de treino para inferência de tipos de colunas.
+        X (pd.DataFrame): DataFrame de referência para inferência de tipos de colunas.
 
     Returns:
-        Pipeline: Pipeline scikit-learn configurado e pronto para treino.
+        dict: Listas de colunas por grupo ('numerical', 'categorical', 'pedra', 'binary').
     """
-    # 1. Definição de Grupos de Colunas
     ideal_categorical = ["genero", "instituicao_de_ensino"]
     ideal_pedra = ["pedra_20", "pedra_21"]
     ideal_binary = ["indicado", "atingiu_pv", "indicado_bolsa", "ponto_virada"]
@@ -70,22 +97,60 @@ def create_pipeline(X_train: pd.DataFrame) -> Pipeline:
     ]
 
     # Seleção dinâmica de colunas presentes no DataFrame
-    cols_categorical = [c for c in ideal_categorical if c in X_train.columns]
-    cols_pedra = [c for c in ideal_pedra if c in X_train.columns]
-    cols_binary = [c for c in ideal_binary if c in X_train.columns]
+    cols_categorical = [c for c in ideal_categorical if c in X.columns]
+    cols_pedra = [c for c in ideal_pedra if c in X.columns]
+    cols_binary = [c for c in ideal_binary if c in X.columns]
 
     # Numéricas: Tudo que sobra, exceto as proibidas e as já selecionadas
     exclude_cols = cols_categorical + cols_pedra + cols_binary + forbidden_cols
 
     cols_numerical = [
-        c
-        for c in X_train.select_dtypes(include=["number"]).columns
-        if c not in exclude_cols
+        c for c in X.select_dtypes(include=["number"]).columns if c not in exclude_cols
     ]
 
+    logger.debug(f"Colunas excluídas: {exclude_cols}")
+
+    return {
+        "numerical": cols_numerical,
+        "categorical": cols_categorical,
+        "pedra": cols_pedra,
+        "binary": cols_binary,
+    }
+
+
+def create_pipeline(X_train: pd.DataFrame, classifier=None, memory=None) -> Pipeline:
+    """
+    Constrói o pipeline completo de processamento e modelagem.
+
+    Estratégia de Pré-processamento:
+    1. Numéricas: Imputação pela mediana (robusto a outliers) + Padronização (StandardScaler).
+    2. Categóricas: Imputação de valor constante + OneHotEncoding.
+    3. Customizados:
+       - PedraMapper: Mapeamento ordinal das pedras (Quartzo < Ágata < Ametista < Topázio).
+       - BinaryCleaner: Padronização de booleanos textuais (Sim/Não).
+
+    Modelo:
+    - LogisticRegression com class_weight='balanced' para lidar com o desbalanceamento
+      natural das classes de risco.
+
+    Args:
+        X_train (pd.DataFrame): DataFrame de treino para inferência de tipos de colunas.
+        classifier: Estimador final alternativo. Se None, usa a LogisticRegression padrão.
+        memory: Cache (joblib.Memory ou caminho) dos transformers já ajustados.
+            Evita recomputar o pré-processamento a cada candidato na busca de hiperparâmetros.
+
+    Returns:
+        Pipeline: Pipeline scikit-learn configurado e pronto para treino.
+    """
+    # 1. Definição de Grupos de Colunas
+    columns = select_feature_columns(X_train)
+    cols_numerical = columns["numerical"]
+    cols_categorical = columns["categorical"]
+    cols_pedra = columns["pedra"]
+    cols_binary = columns["binary"]
+
     logger.info(f"Features Numéricas selecionadas: {len(cols_numerical)}")
     logger.info(f"Features Categóricas selecionadas: {len(cols_categorical)}")
-    logger.debug(f"Colunas excluídas: {exclude_cols}")
 
     # 2. Pipelines de Transformação
     numeric_transformer = Pipeline(
@@ -121,18 +186,19 @@ def create_pipeline(X_train: pd.DataFrame) -> Pipeline:
     )
 
     # 4. Pipeline Final
+    if classifier is None:
+        classifier = LogisticRegression(
+            random_state=42, class_weight="balanced", max_iter=1000
+        )
+
     model_pipeline = Pipeline(
         steps=[
             ("pedra_mapper", PedraMapper()),
             ("binary_cleaner", BinaryCleaner()),
             ("preprocessor", preprocessor),
-            (
-                "classifier",
-                LogisticRegression(
-                    random_state=42, class_weight="balanced", max_iter=1000
-                ),
-            ),
-        ]
+            ("classifier", classifier),
+        ],
+        memory=memory,
     )
 
     return model_pipeline
@@ -147,6 +213,7 @@ def run_training():
     2. Instancia o pipeline via create_pipeline().
     3. Realiza o fit do modelo.
     4. Serializa o artefato final em app/model/pipeline.joblib.
+    5. Salva as distribuições de referência do treino (monitoramento de drift).
     """
     root = get_project_root()
     data_dir = root / "data" / "processed"
@@ -170,12 +237,218 @@ def run_training():
     logger.info("Treinando modelo...")
     pipeline.fit(X_train, y_train)
 
+    model_path = save_serving_artifact(pipeline, X_train, model_dir)
+    logger.info(f"Modelo salvo com sucesso em: {model_path}")
+
+
+def save_serving_artifact(pipeline: Pipeline, X_train: pd.DataFrame, model_dir: Path):
+    """
+    Salva o pipeline servido pela API junto com o perfil de referência do treino,
+    para que o monitoramento de drift compare o tráfego com o modelo em produção.
+
+    A API assume um classificador linear (LinearExplainer, /model/info); outros
+    estimadores devem ser avaliados como challengers (CHALLENGER_MODEL_PATHS).
+
+    Returns:
+        Path: Caminho do artefato salvo.
+    """
+    classifier = pipeline.named_steps["classifier"]
+    if not isinstance(classifier, LogisticRegression):
+        raise ValueError(
+            f"Artefato de produção exige Regressão Logística, recebido "
+            f"{type(classifier).__name__}."
+        )
+
     model_dir.mkdir(parents=True, exist_ok=True)
     model_path = model_dir / "pipeline.joblib"
     joblib.dump(pipeline, model_path)
 
-    logger.info(f"Modelo salvo com sucesso em: {model_path}")
+    proba_train = pipeline.predict_proba(X_train)[:, 1]
+    save_reference_profile(
+        compute_reference_profile(X_train, proba_train),
+        model_dir / REFERENCE_PROFILE_NAME,
+    )
+    return model_path
+
+
+def get_param_grid(include_alternatives: bool = False) -> list:
+    """
+    Monta o espaço de busca de hiperparâmetros.
+
+    Args:
+        include_alternatives (bool): Inclui estimadores baseados em árvores
+            (HistGradientBoosting e RandomForest) além da Regressão Logística.
+
+    Returns:
+        list: Lista de grades no formato aceito pelo GridSearchCV.
+    """
+    param_grid = list(LOGISTIC_PARAM_GRID)
+
+    if include_alternatives:
+        param_grid += [
+            {
+                "classifier": [
+                    HistGradientBoostingClassifier(
+                        class_weight="balanced", random_state=42
+                    )
+                ],
+                "classifier__learning_rate": [0.05, 0.1],
+                "classifier__max_depth": [3, None],
+            },
+            {
+                "classifier": [
+                    RandomForestClassifier(
+                        n_estimators=200, class_weight="balanced", random_state=42
+                    )
+                ],
+                "classifier__max_depth": [4, 8, None],
+            },
+        ]
+
+    return param_grid
+
+
+def run_tuning(
+    n_jobs: int = -1, cv_folds: int = 5, include_alternatives: bool = False
+) -> pd.DataFrame:
+    """
+    Executa a busca de hiperparâmetros com validação cruzada estratificada.
+
+    Estratégia:
+    - GridSearchCV paralelizado entre os núcleos disponíveis (n_jobs).
+    - Otimização do RECALL da classe de risco (métrica de negócio do projeto);
+      a precisão é reportada junto para evidenciar candidatos degenerados.
+    - Os transformers ajustados são cacheados via Pipeline(memory=...), de modo que
+      o pré-processamento de cada fold é calculado uma única vez e reaproveitado
+      por todos os candidatos.
+
+    O melhor pipeline (refit no treino completo) é salvo em app/model/pipeline.joblib,
+    com o perfil de referência de drift. A API exige um classificador linear: se
+    a melhor configuração for outro estimador, ela é salva como challenger
+    (challenger_tuned.joblib, para o modo sombra) e o artefato de produção
+    recebe a melhor configuração de Regressão Logística.
+
+    Args:
+        n_jobs (int): Número de processos paralelos (-1 = todos os núcleos).
+        cv_folds (int): Número de folds da validação cruzada.
+        include_alternatives (bool): Inclui estimadores alternativos na busca.
+
+    Returns:
+        pd.DataFrame: Resultados por configuração, ordenados pelo recall médio,
+        incluindo o tempo de parede gasto em cada uma.
+    """
+    root = get_project_root()
+    data_dir = root / "data" / "processed"
+    model_dir = root / "app" / "model"
+
+    logger.info("Iniciando busca de hiperparâmetros...")
+
+    try:
+        X_train = pd.read_csv(data_dir / "X_train.csv")
+        y_train = pd.read_csv(data_dir / "y_train.csv").values.ravel()
+    except FileNotFoundError:
+        logger.error("Arquivos não encontrados. Execute 'src.preprocessing' primeiro.")
+        return pd.DataFrame()
+
+    cv = StratifiedKFold(n_splits=cv_folds, shuffle=True, random_state=42)
+
+    with tempfile.TemporaryDirectory(prefix="pipeline_cache_") as cache_dir:
+        memory = joblib.Memory(location=cache_dir, verbose=0)
+        pipeline = create_pipeline(X_train, memory=memory)
+
+        search = GridSearchCV(
+            pipeline,
+            param_grid=get_param_grid(include_alternatives),
+            scoring={"recall": "recall", "precision": "precision"},
+            refit="recall",
+            cv=cv,
+            n_jobs=n_jobs,
+        )
+
+        start = time.perf_counter()
+        search.fit(X_train, y_train)
+        elapsed = time.perf_counter() - start
+
+        # O cache é temporário: o artefato final não pode referenciá-lo
+        best_pipeline = search.best_estimator_
+        best_pipeline.set_params(memory=None)
+
+    cv_results = pd.DataFrame(search.cv_results_)
+    results = pd.DataFrame(
+        {
+            "params": cv_results["params"].astype(str),
+            "recall_medio": cv_results["mean_test_recall"],
+            "recall_desvio": cv_results["std_test_recall"],
+            "precisao_media": cv_results["mean_test_precision"],
+            # Tempo de parede por configuração: (fit + score) em todos os folds
+            "tempo_total_s": (
+                cv_results["mean_fit_time"] + cv_results["mean_score_time"]
+            )
+            * cv_folds,
+        }
+    ).sort_values("recall_medio", ascending=False, ignore_index=True)
+
+    logger.info(
+        f"Busca concluída: {len(results)} configurações x {cv_folds} folds "
+        f"em {elapsed:.2f}s (n_jobs={n_jobs})."
+    )
+    for row in results.itertuples():
+        logger.info(
+            f"recall={row.recall_medio:.3f} (+/-{row.recall_desvio:.3f}) | "
+            f"precisão={row.precisao_media:.3f} | "
+            f"tempo={row.tempo_total_s:.2f}s | {row.params}"
+        )
+    logger.info(f"Melhor configuração: {search.best_params_}")
+
+    if not isinstance(best_pipeline.named_steps["classifier"], LogisticRegression):
+        model_dir.mkdir(parents=True, exist_ok=True)
+        challenger_path = model_dir / TUNED_CHALLENGER_NAME
+        joblib.dump(best_pipeline, challenger_path)
+        logger.warning(
+            "Melhor configuração não é linear e não pode ser servida pela API "
+            f"(LinearExplainer, /model/info): salva como challenger em "
+            f"{challenger_path} (use em CHALLENGER_MODEL_PATHS)."
+        )
+
+        # Melhor candidato linear (grades sem o parâmetro 'classifier')
+        linear = [
+            i
+            for i, params in enumerate(cv_results["params"])
+            if "classifier" not in params
+        ]
+        best_linear = min(linear, key=lambda i: cv_results["rank_test_recall"][i])
+        linear_params = cv_results["params"][best_linear]
+        logger.info(f"Artefato de produção: melhor Regressão Logística {linear_params}")
+        best_pipeline = clone(pipeline).set_params(memory=None, **linear_params)
+        best_pipeline.fit(X_train, y_train)
+
+    model_path = save_serving_artifact(best_pipeline, X_train, model_dir)
+    logger.info(f"Modelo otimizado salvo em: {model_path}")
+
+    return results
 
 
 if __name__ == "__main__":
-    run_training()
+    parser = argparse.ArgumentParser(description="Treinamento do modelo de risco.")
+    parser.add_argument(
+        "--tune",
+        action="store_true",
+        help="Executa busca de hiperparâmetros com validação cruzada.",
+    )
+    parser.add_argument("--n-jobs", type=int, default=-1)
+    parser.add_argument("--cv", type=int, default=5)
+    parser.add_argument(
+        "--include-alternatives",
+        action="store_true",
+        help="Inclui HistGradientBoosting e RandomForest na busca.",
+    )
+    args = parser.parse_args()
+
+    if args.tune:
+        run_tuning(
+            n_jobs=args.n_jobs,
+            cv_folds=args.cv,
+            include_alternatives=args.include_alternatives,
+        )
+    else:
+        run_training()
@@ -1,46 +1,571 @@
+import atexit
+import contextvars
+import gzip
+import json
 import logging
+import logging.handlers
+import os
+import queue
+import shutil
 import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 from pathlib import Path
 
+# Política padrão de rotação dos arquivos em 'logs/' (sobrescrita pela API via Settings)
+LOG_MAX_BYTES = 50 * 1024 * 1024
+LOG_ROTATION_SECONDS = 24 * 60 * 60
+LOG_BACKUP_COUNT = 30
+
+# Formato dos timestamps no índice de segmentos (igual ao prefixo do asctime)
+SEGMENT_TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+_compression_executor = None
+_compression_lock = threading.Lock()
+
+# Identificador da requisição corrente (definido pelo middleware da API)
+request_id_var = contextvars.ContextVar("request_id", default=None)
+
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+# Modo de logging corrente (alterado por configure_logging)
+_logging_mode = {
+    "async_mode": False,
+    "json_format": False,
+    "sample_burst": 0,
+    "sample_every": 100,
+}
+# Handlers reais (console/arquivo) de cada logger criado por setup_logger/setup_csv_logger
+_sinks = {}
+# Loggers de aplicação (recebem JSON/amostragem); loggers CSV são dados e ficam fora
+_structured_loggers = set()
+# Handlers de arquivo por caminho resolvido: loggers que gravam o mesmo arquivo
+# compartilham um único handler (e uma única rotação)
+_file_handlers = {}
+_file_handlers_lock = threading.Lock()
+_log_queue = None
+_log_listener = None
+_listener_lock = threading.Lock()
+
+# Atributos padrão do LogRecord (o restante é tratado como campo extra no JSON)
+_RECORD_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+
+def _get_compression_executor() -> ThreadPoolExecutor:
+    """Worker único e compartilhado para compressão de segmentos fora da thread de escrita."""
+    global _compression_executor
+    with _compression_lock:
+        if _compression_executor is None:
+            _compression_executor = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix="log-compress"
+            )
+        return _compression_executor
+
+
+def wait_log_compression():
+    """Aguarda a compressão dos segmentos já rotacionados (útil em testes e no shutdown)."""
+    _get_compression_executor().submit(lambda: None).result()
+
+
+def _format_segment_time(timestamp: float) -> str:
+    return time.strftime(SEGMENT_TIME_FORMAT, time.localtime(timestamp))
+
+
+def _read_first_timestamp(path: Path):
+    """Lê o timestamp (asctime) da primeira linha do arquivo, se existir."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            first_line = f.readline()
+        return time.mktime(time.strptime(first_line[:19], SEGMENT_TIME_FORMAT))
+    except (OSError, ValueError):
+        return None
+
+
+def get_log_index_path(log_file: Path) -> Path:
+    """Caminho do índice de segmentos de um arquivo de log (ex: drift_data.csv.index.json)."""
+    log_file = Path(log_file)
+    return log_file.with_name(log_file.name + ".index.json")
+
+
+def read_log_index(log_file: Path) -> list:
+    """Retorna as entradas do índice de segmentos rotacionados (mais antigo primeiro)."""
+    try:
+        with open(get_log_index_path(log_file), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return []
+
+
+def log_segments_for_window(log_file: Path, start: str = None, end: str = None) -> list:
+    """
+    Seleciona, pelo índice, apenas os segmentos que intersectam a janela [start, end].
+
+    Args:
+        log_file (Path): Arquivo de log ativo (ex: logs/drift_data.csv).
+        start (str): Início da janela ('YYYY-MM-DD' ou 'YYYY-MM-DD HH:MM:SS').
+        end (str): Fim da janela, no mesmo formato (inclusivo).
+
+    Returns:
+        list: Caminhos dos segmentos (comprimidos ou não) e do arquivo ativo, em ordem.
+    """
+    log_file = Path(log_file)
+    # Datas sem horário cobrem o dia inteiro no fim da janela
+    end = end + " 23:59:59" if end is not None and len(end) == 10 else end
+
+    paths = []
+    for entry in read_log_index(log_file):
+        if start is not None and entry["fim"] < start:
+            continue
+        if end is not None and entry["inicio"] > end:
+            continue
+        segment = log_file.parent / entry["arquivo"]
+        if segment.exists():
+            paths.append(segment)
+
+    if log_file.exists() and log_file.stat().st_size > 0:
+        first = _read_first_timestamp(log_file)
+        if end is None or first is None or _format_segment_time(first) <= end:
+            paths.append(log_file)
+    return paths
+
+
+def _report_handler_problem(message: str):
+    """
+    Reporta falhas dos próprios handlers de arquivo em logging.lastResort
+    (stderr), como os handlers da stdlib, sem passar pelos loggers que dependem
+    desses handlers.
+    """
+    if logging.lastResort is not None:
+        logging.lastResort.handle(
+            logging.makeLogRecord(
+                {
+                    "name": __name__,
+                    "levelno": logging.WARNING,
+                    "levelname": logging.getLevelName(logging.WARNING),
+                    "msg": message,
+                }
+            )
+        )
+
+
+class CompressingRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """
+    Handler de arquivo com rotação por tamanho e/ou idade do segmento.
+
+    Na rotação, o arquivo ativo é apenas renomeado (operação O(1)) para
+    '<nome>.<inicio>_<fim><sufixo>' e a compressão gzip ocorre em uma thread de
+    fundo, sem bloquear quem está registrando o log. Ao final da compressão o
+    segmento é registrado em '<nome>.index.json' com seu intervalo de tempo,
+    permitindo que ferramentas de análise leiam apenas a janela de interesse.
+    Segmentos além de backup_count são removidos (mais antigos primeiro).
+
+    Observação: assume um único processo escrevendo no arquivo (1 worker uvicorn).
+    """
+
+    def __init__(
+        self,
+        filename,
+        max_bytes: int = LOG_MAX_BYTES,
+        rotation_seconds: float = LOG_ROTATION_SECONDS,
+        backup_count: int = LOG_BACKUP_COUNT,
+        encoding: str = "utf-8",
+    ):
+        super().__init__(
+            filename, maxBytes=max_bytes, backupCount=backup_count, encoding=encoding
+        )
+        self.rotation_seconds = rotation_seconds
+        # Intervalo de tempo coberto pelo segmento ativo
+        self._segment_start = _read_first_timestamp(Path(self.baseFilename))
+        self._segment_end = None
+
+    def shouldRollover(self, record) -> bool:
+        if super().shouldRollover(record):
+            return True
+        return bool(
+            self.rotation_seconds
+            and self._segment_start is not None
+            and record.created - self._segment_start >= self.rotation_seconds
+        )
+
+    def emit(self, record):
+        super().emit(record)
+        if self._segment_start is None:
+            self._segment_start = record.created
+        self._segment_end = record.created
+
+    def _segment_path(self, start: float, end: float) -> Path:
+        source = Path(self.baseFilename)
+        stamp = (
+            f"{time.strftime('%Y%m%dT%H%M%S', time.localtime(start))}_"
+            f"{time.strftime('%Y%m%dT%H%M%S', time.localtime(end))}"
+        )
+        target = source.with_name(f"{source.stem}.{stamp}{source.suffix}")
+        counter = 1
+        while target.exists() or Path(f"{target}.gz").exists():
+            target = source.with_name(f"{source.stem}.{stamp}-{counter}{source.suffix}")
+            counter += 1
+        return target
+
+    def doRollover(self):
+        if self.stream:
+            self.stream.close()
+            self.stream = None
+
+        source = Path(self.baseFilename)
+        if source.exists() and source.stat().st_size > 0:
+            start = self._segment_start or source.stat().st_mtime
+            end = self._segment_end or time.time()
+            target = self._segment_path(start, end)
+            os.replace(source, target)
+            _get_compression_executor().submit(
+                self._compress_segment, target, start, end
+            )
+
+        self._segment_start = None
+        self._segment_end = None
+        if not self.delay:
+            self.stream = self._open()
+
+    def _compress_segment(self, segment: Path, start: float, end: float):
+        """Comprime o segmento, atualiza o índice e aplica a retenção (thread de fundo)."""
+        original_bytes = segment.stat().st_size
+        try:
+            compressed = Path(f"{segment}.gz")
+            partial = Path(f"{compressed}.tmp")
+            with open(segment, "rb") as f_in, gzip.open(partial, "wb") as f_out:
+                shutil.copyfileobj(f_in, f_out)
+            os.replace(partial, compressed)
+            segment.unlink()
+            segment = compressed
+        except OSError as e:
+            # Mantém o segmento sem compressão: ainda é indexado e legível
+            _report_handler_problem(f"Falha ao comprimir {segment}: {e}")
+
+        log_file = Path(self.baseFilename)
+        entries = read_log_index(log_file)
+        entries.append(
+            {
+                "arquivo": segment.name,
+                "inicio": _format_segment_time(start),
+                "fim": _format_segment_time(end),
+                "bytes": segment.stat().st_size,
+                "bytes_original": original_bytes,
+            }
+        )
+        if self.backupCount > 0:
+            while len(entries) > self.backupCount:
+                expired = entries.pop(0)
+                (log_file.parent / expired["arquivo"]).unlink(missing_ok=True)
+
+        # Escrita atômica: leitores nunca veem um índice parcial
+        index_path = get_log_index_path(log_file)
+        partial_index = index_path.with_name(index_path.name + ".tmp")
+        with open(partial_index, "w", encoding="utf-8") as f:
+            json.dump(entries, f, indent=2, ensure_ascii=False)
+        os.replace(partial_index, index_path)
+
+
+class RequestContextFilter(logging.Filter):
+    """Anexa o request_id corrente ao registro, ainda na thread que originou o log."""
+
+    def filter(self, record) -> bool:
+        record.request_id = request_id_var.get()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Amostragem de mensagens repetitivas sob carga.
+
+    Cada ponto de chamada (logger, arquivo, linha) pode emitir até 'burst' registros
+    por segundo; acima disso, apenas 1 a cada 'every' é mantido. O próximo registro
+    emitido carrega o campo 'suprimidos' com a contagem descartada.
+    Registros acima de WARNING (ERROR/CRITICAL) nunca são descartados.
+    """
+
+    def __init__(self, burst: int, every: int = 100, clock=time.monotonic):
+        super().__init__()
+        self.burst = burst
+        self.every = max(every, 1)
+        self.clock = clock
+        self._windows = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record) -> bool:
+        if record.levelno > logging.WARNING:
+            return True
+
+        key = (record.name, record.pathname, record.lineno)
+        second = int(self.clock())
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None or window[0] != second:
+                suppressed = window[2] if window is not None else 0
+                window = [second, 0, suppressed]
+                self._windows[key] = window
+            window[1] += 1
+            count = window[1]
+            if count > self.burst and (count - self.burst) % self.every:
+                window[2] += 1
+                return False
+            if window[2]:
+                record.suprimidos = window[2]
+                window[2] = 0
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """Formata cada registro como uma linha JSON (campos extras incluídos)."""
+
+    def format(self, record) -> str:
+        payload = {
+            "timestamp": datetime.fromtimestamp(record.created)
+            .astimezone()
+            .isoformat(timespec="milliseconds"),
+            "nivel": record.levelname,
+            "logger": record.name,
+            "mensagem": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and not key.startswith("_"):
+                payload[key] = value
+        if record.exc_info:
+            payload["excecao"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            payload["excecao"] = record.exc_text
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+class _SinkDispatcher(logging.Handler):
+    """Roteia, na thread do QueueListener, cada registro para os handlers do seu logger."""
+
+    def handle(self, record):
+        for handler in _sinks.get(record.name, ()):
+            if record.levelno >= handler.level:
+                handler.handle(record)
+        return True
+
+
+class _PreparedQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler que preserva args/exc_info para que os sinks formatem o registro."""
+
+    def prepare(self, record):
+        # O formato final (texto/JSON/CSV) é aplicado pelos sinks na thread de fundo;
+        # aqui apenas resolvemos a mensagem e o traceback, que não são serializáveis depois.
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def _get_log_queue() -> queue.SimpleQueue:
+    """Fila compartilhada e listener único em segundo plano (criados sob demanda)."""
+    global _log_queue, _log_listener
+    with _listener_lock:
+        if _log_listener is None:
+            _log_queue = queue.SimpleQueue()
+            _log_listener = logging.handlers.QueueListener(
+                _log_queue, _SinkDispatcher()
+            )
+            _log_listener.start()
+        return _log_queue
+
+
+def stop_logging_listener():
+    """Esvazia a fila e encerra o listener de logging assíncrono (se ativo)."""
+    global _log_queue, _log_listener
+    with _listener_lock:
+        if _log_listener is not None:
+            _log_listener.stop()
+            _log_listener = None
+            _log_queue = None
+
+
+atexit.register(stop_logging_listener)
+
+
+def _apply_logging_mode(logger: logging.Logger):
+    """(Re)configura handlers, formatadores e filtros de um logger conforme o modo atual."""
+    mode = _logging_mode
+    sinks = _sinks[logger.name]
+
+    for log_filter in list(logger.filters):
+        if isinstance(log_filter, (RequestContextFilter, SamplingFilter)):
+            logger.removeFilter(log_filter)
+
+    if logger.name in _structured_loggers:
+        formatter = (
+            JsonFormatter() if mode["json_format"] else logging.Formatter(TEXT_FORMAT)
+        )
+        for handler in sinks:
+            handler.setFormatter(formatter)
+        logger.addFilter(RequestContextFilter())
+        if mode["sample_burst"] > 0:
+            logger.addFilter(SamplingFilter(mode["sample_burst"], mode["sample_every"]))
+
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+    if mode["async_mode"]:
+        logger.addHandler(_PreparedQueueHandler(_get_log_queue()))
+    else:
+        for handler in sinks:
+            logger.addHandler(handler)
+
+
+def configure_logging(
+    async_mode: bool = False,
+    json_format: bool = False,
+    sample_burst: int = 0,
+    sample_every: int = 100,
+):
+    """
+    Define o modo de logging de todos os loggers criados por setup_logger/setup_csv_logger.
+
+    - async_mode: os handlers reais (console/arquivo) passam a rodar atrás de um
+      QueueHandler/QueueListener; a thread chamadora apenas enfileira o registro.
+    - json_format: loggers de aplicação emitem JSON estruturado (com request_id e
+      campos extras, ex: latencia_ms). Loggers CSV mantêm o formato de dados.
+    - sample_burst/sample_every: amostragem de mensagens repetitivas (0 desativa).
+
+    Loggers já existentes são reconfigurados; os criados depois herdam o modo.
+    """
+    _logging_mode.update(
+        async_mode=async_mode,
+        json_format=json_format,
+        sample_burst=sample_burst,
+        sample_every=sample_every,
+    )
+    if not async_mode:
+        stop_logging_listener()
+    for name in _sinks:
+        _apply_logging_mode(logging.getLogger(name))
+
+
+def _get_file_handler(
+    log_file: Path, max_bytes: int, rotation_seconds: float, backup_count: int
+) -> "CompressingRotatingFileHandler":
+    """
+    Retorna o handler do arquivo, criando-o na primeira chamada.
+
+    Cada arquivo tem um único CompressingRotatingFileHandler, anexado a todos os
+    loggers que gravam nele: handlers independentes renomeariam o arquivo na
+    rotação sem conhecer os demais, perdendo linhas. A política de rotação é a
+    do primeiro logger; uma política diferente para o mesmo arquivo é ignorada
+    com aviso (use os mesmos valores, ex: LOG_ROTATION da API).
+    """
+    path = Path(log_file).resolve()
+    policy = (max_bytes, rotation_seconds, backup_count)
+    with _file_handlers_lock:
+        handler = _file_handlers.get(path)
+        if handler is None:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            handler = CompressingRotatingFileHandler(
+                path,
+                max_bytes=max_bytes,
+                rotation_seconds=rotation_seconds,
+                backup_count=backup_count,
+            )
+            _file_handlers[path] = handler
+        elif policy != (
+            handler.maxBytes,
+            handler.rotation_seconds,
+            handler.backupCount,
+        ):
+            _report_handler_problem(
+                f"Política de rotação divergente para {path} ignorada: "
+                "o arquivo já tem um handler configurado."
+            )
+        return handler
+
 
 def setup_logger(
-    name: str, log_file: str = "app.log", level=logging.INFO
+    name: str,
+    log_file: str = "app.log",
+    level=logging.INFO,
+    max_bytes: int = LOG_MAX_BYTES,
+    rotation_seconds: float = LOG_ROTATION_SECONDS,
+    backup_count: int = LOG_BACKUP_COUNT,
 ) -> logging.Logger:
     """
     Configura e retorna um logger padronizado para a aplicação.
 
     Estratégia de Observabilidade:
     - Console (StreamHandler): Para visualização em tempo real (stdout) e logs de container (Docker).
-    - Arquivo (FileHandler): Para persistência e auditoria histórica em 'logs/'.
+    - Arquivo (CompressingRotatingFileHandler): Para persistência e auditoria histórica
+      em 'logs/', com rotação por tamanho/idade e segmentos comprimidos. Loggers
+      que gravam o mesmo arquivo compartilham o handler (ver _get_file_handler).
+    - Modo (configure_logging): texto ou JSON, síncrono ou assíncrono (fila), com
+      amostragem opcional de mensagens repetitivas.
 
     Args:
         name (str): Nome do logger (geralmente __name__ do módulo).
         log_file (str): Nome do arquivo de saída.
         level (int): Nível de log (INFO, DEBUG, WARNING, etc).
+        max_bytes (int): Tamanho máximo do segmento ativo (0 desativa).
+        rotation_seconds (float): Idade máxima do segmento ativo (0 desativa).
+        backup_count (int): Número de segmentos rotacionados mantidos.
 
     Returns:
         logging.Logger: Objeto logger configurado.
     """
-    formatter = logging.Formatter(
-        "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-    )
-
-    # 1. Handler para Console (Docker logs / Stdout)
-    console_handler = logging.StreamHandler(sys.stdout)
-    console_handler.setFormatter(formatter)
-
-    # 2. Handler para Arquivo (Persistência)
-    log_path = Path("logs")
-    log_path.mkdir(exist_ok=True)
-    file_handler = logging.FileHandler(log_path / log_file, encoding="utf-8")
-    file_handler.setFormatter(formatter)
-
     logger = logging.getLogger(name)
     logger.setLevel(level)
 
     # Evita duplicação de handlers se a função for chamada múltiplas vezes
-    if not logger.handlers:
-        logger.addHandler(console_handler)
-        logger.addHandler(file_handler)
+    if name not in _sinks:
+        # 1. Handler para Console (Docker logs / Stdout)
+        console_handler = logging.StreamHandler(sys.stdout)
+
+        # 2. Handler para Arquivo (Persistência com rotação, compartilhado por arquivo)
+        file_handler = _get_file_handler(
+            Path("logs") / log_file, max_bytes, rotation_seconds, backup_count
+        )
+
+        # Formatadores, filtros e fila assíncrona seguem o modo de configure_logging
+        _sinks[name] = [console_handler, file_handler]
+        _structured_loggers.add(name)
+        _apply_logging_mode(logger)
 
     return logger
+
+
+def setup_csv_logger(
+    name: str,
+    log_file: Path,
+    max_bytes: int = LOG_MAX_BYTES,
+    rotation_seconds: float = LOG_ROTATION_SECONDS,
+    backup_count: int = LOG_BACKUP_COUNT,
+) -> logging.Logger:
+    """
+    Configura um logger isolado que grava registros no formato CSV (dados de monitoramento).
+
+    Diferente de setup_logger, não propaga para o console: cada linha é
+    'timestamp,<mensagem>' e serve de insumo para análises offline (ex: Data Drift).
+    Os segmentos rotacionados são comprimidos e indexados por intervalo de tempo
+    (ver log_segments_for_window).
+
+    Args:
+        name (str): Nome do logger.
+        log_file (Path): Caminho do arquivo CSV de saída.
+        max_bytes (int): Tamanho máximo do segmento ativo (0 desativa).
+        rotation_seconds (float): Idade máxima do segmento ativo (0 desativa).
+        backup_count (int): Número de segmentos rotacionados mantidos.
+
+    Returns:
+        logging.Logger: Objeto logger configurado.
+    """
+    logger = logging.getLogger(name)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    if name not in _sinks:
+        file_handler = _get_file_handler(
+            log_file, max_bytes, rotation_seconds, backup_count
+        )
+        file_handler.setFormatter(logging.Formatter("%(asctime)s,%(message)s"))
+        _sinks[name] = [file_handler]
+        _apply_logging_mode(logger)
+    return logger
@@ -0,0 +1,157 @@
+import operator
+import types
+from typing import Literal, Union, get_args, get_origin
+
+import annotated_types
+import numpy as np
+import pandas as pd
+
+from src.feature_engineering import BinaryCleaner, PedraMapper
+
+# Máscara de erros com um bit por regra (uint64)
+MAX_RULES = 64
+# Restrições do Pydantic (Field(ge=..., le=...)): atributo = nome do operador
+_BOUNDS = {
+    annotated_types.Ge: "ge",
+    annotated_types.Gt: "gt",
+    annotated_types.Le: "le",
+    annotated_types.Lt: "lt",
+}
+
+
+def pipeline_spellings(field: str, values: list):
+    """
+    Grafias (minúsculas) que o pipeline aceita para os valores de um campo
+    categórico: as mesmas de PedraMapper e BinaryCleaner ('agata', 'AMETISTA',
+    'S', 'n', 'nao'...). None se o campo não passa por esses transformers.
+    """
+    pedra, binary = PedraMapper(), BinaryCleaner()
+    if field in pedra.cols_pedra:
+        mapping = pedra.pedra_map
+    elif any(keyword in field for keyword in binary.target_keywords):
+        mapping = binary.binary_map
+    else:
+        return None
+    codes = {mapping.get(str(value).lower()) for value in values} - {None}
+    return sorted(key for key, code in mapping.items() if code in codes)
+
+
+def derive_rules(schema) -> list:
+    """
+    Deriva as regras de validação em lote dos campos de um modelo Pydantic
+    (ex: AlunoInput), mantendo o schema da API como fonte única do contrato.
+
+    - Literal (ex: genero, pedra_20, Sim/Não): valores permitidos e, para
+      Pedra e Sim/Não, as grafias aceitas pelo pipeline (pipeline_spellings).
+    - float/int com ge/gt/le/lt (ex: notas 0-10): limites da faixa.
+    - Optional ou com valor padrão: nulo permitido.
+
+    Args:
+        schema: Classe do modelo Pydantic.
+
+    Returns:
+        list: Uma regra por campo: campo, tipo ('numero', 'inteiro',
+            'categoria' ou 'texto'), obrigatorio, limites [(operador, valor)]
+            valores permitidos e grafias aceitas pelo pipeline (ou None).
+    """
+    rules = []
+    for name, field in schema.model_fields.items():
+        annotation = field.annotation
+        if get_origin(annotation) in (Union, types.UnionType):
+            args = [a for a in get_args(annotation) if a is not type(None)]
+            annotation = args[0] if len(args) == 1 else None
+
+        rule = {
+            "campo": name,
+            "tipo": "texto",
+            "obrigatorio": field.is_required(),
+            "limites": [],
+            "valores": None,
+            "grafias": None,
+        }
+        if get_origin(annotation) is Literal:
+            rule["tipo"] = "categoria"
+            rule["valores"] = list(get_args(annotation))
+            rule["grafias"] = pipeline_spellings(name, rule["valores"])
+        elif annotation is int:
+            rule["tipo"] = "inteiro"
+        elif annotation is float:
+            rule["tipo"] = "numero"
+
+        for constraint in field.metadata:
+            for kind, op in _BOUNDS.items():
+                if isinstance(constraint, kind):
+                    rule["limites"].append((op, getattr(constraint, op)))
+        rules.append(rule)
+
+    if len(rules) > MAX_RULES:
+        raise ValueError(f"Máximo de {MAX_RULES} regras por máscara de erros.")
+    return rules
+
+
+def validate_frame(df: pd.DataFrame, rules: list, required: bool = True) -> np.ndarray:
+    """
+    Aplica as regras coluna a coluna em uma única passada vetorizada.
+
+    Cada linha recebe uma máscara uint64 com o bit i ligado se o campo
+    rules[i] é inválido: fora da faixa, não numérico, fora dos valores
+    permitidos ou (com 'required') nulo/ausente sendo obrigatório. Campos
+    'texto' só têm a obrigatoriedade verificada. Sem 'required' (dados brutos),
+    categorias aceitam também as grafias normalizadas pelo pipeline.
+
+    Args:
+        df (pd.DataFrame): Lote no formato de entrada (colunas = campos do schema).
+        rules (list): Regras de derive_rules.
+        required (bool): Verifica campos obrigatórios e exige a grafia exata das
+            categorias (contrato da API). False na ingestão de dados brutos, em
+            que colunas ausentes e nulos são imputados e variações de grafia
+            ('S', 'nao', 'AGATA') são normalizadas pelo pipeline.
+
+    Returns:
+        np.ndarray: Máscara de erros por linha (0 = linha válida).
+    """
+    mask = np.zeros(len(df), dtype=np.uint64)
+    for bit, rule in enumerate(rules):
+        flag = np.uint64(1 << bit)
+        check_missing = required and rule["obrigatorio"]
+        if rule["campo"] not in df.columns:
+            if check_missing:
+                mask |= flag
+            continue
+
+        values = df[rule["campo"]]
+        missing = values.isna().to_numpy()
+        if rule["tipo"] in ("numero", "inteiro"):
+            numbers = pd.to_numeric(values, errors="coerce").to_numpy(dtype=float)
+            present = ~np.isnan(numbers)
+            invalid = ~missing & ~present
+            for op, bound in rule["limites"]:
+                invalid |= present & ~getattr(operator, op)(numbers, bound)
+            if rule["tipo"] == "inteiro":
+                invalid |= present & (numbers != np.floor(numbers))
+        elif rule["tipo"] == "categoria":
+            if not required and rule.get("grafias"):
+                accepted = values.astype(str).str.lower().isin(rule["grafias"])
+            else:
+                accepted = values.isin(rule["valores"])
+            invalid = ~missing & ~accepted.to_numpy()
+        else:
+            invalid = np.zeros(len(df), dtype=bool)
+
+        if check_missing:
+            invalid |= missing
+        mask[invalid] |= flag
+    return mask
+
+
+def error_counts(mask: np.ndarray, rules: list) -> dict:
+    """Quantidade de linhas com erro em cada campo (apenas campos com erro)."""
+    bits = np.arange(len(rules), dtype=np.uint64)
+    counts = ((mask[:, None] >> bits) & np.uint64(1)).sum(axis=0)
+    return {rule["campo"]: int(count) for rule, count in zip(rules, counts) if count}
+
+
+def row_errors(mask_value, rules: list) -> list:
+    """Campos inválidos de uma linha a partir do seu valor na máscara."""
+    value = int(mask_value)
+    return [rule["campo"] for bit, rule in enumerate(rules) if value >> bit & 1]
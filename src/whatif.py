@@ -0,0 +1,210 @@
+import itertools
+import math
+
+import numpy as np
+import pandas as pd
+
+from src.feature_engineering import PedraMapper
+from src.risk_bands import BAND_NAMES, DEFAULT_THRESHOLDS, assign_bands
+
+# Features que podem ser variadas na análise de sensibilidade
+SWEEP_NUMERIC_FEATURES = [
+    "iaa",
+    "ieg",
+    "ips",
+    "ida",
+    "ipp",
+    "ipv",
+    "matem",
+    "portug",
+    "ingles",
+]
+SWEEP_PEDRA_FEATURES = ["pedra_20", "pedra_21"]
+PEDRA_VALUES = ["Quartzo", "Ágata", "Ametista", "Topázio"]
+
+
+def sweep_size(
+    feature: str,
+    valores: list = None,
+    inicio: float = 0.0,
+    fim: float = 10.0,
+    passo: float = 1.0,
+) -> int:
+    """
+    Número de valores que expand_sweep geraria, sem materializar a grade
+    (permite recusar requisições grandes antes de alocar os cenários).
+    """
+    if valores:
+        return len(dict.fromkeys(valores))
+    if feature in SWEEP_PEDRA_FEATURES:
+        return len(PEDRA_VALUES)
+    lo, hi = min(inicio, fim), max(inicio, fim)
+    # Mesmo cálculo de tamanho do np.arange em expand_sweep
+    return max(0, math.ceil((hi + passo / 2 - lo) / passo))
+
+
+def expand_sweep(
+    feature: str,
+    valores: list = None,
+    inicio: float = 0.0,
+    fim: float = 10.0,
+    passo: float = 1.0,
+) -> list:
+    """
+    Expande a variação de uma feature em uma lista de valores.
+
+    - Valores explícitos têm prioridade (grade definida pelo usuário).
+    - Indicadores numéricos: intervalo [inicio, fim] com o passo informado.
+    - Pedras: todos os níveis (Quartzo..Topázio) quando não informados.
+    """
+    if valores:
+        return list(dict.fromkeys(valores))
+    if feature in SWEEP_PEDRA_FEATURES:
+        return list(PEDRA_VALUES)
+    lo, hi = min(inicio, fim), max(inicio, fim)
+    grid = np.arange(lo, hi + passo / 2, passo)
+    return [round(float(v), 4) for v in np.clip(grid, lo, hi)]
+
+
+def change_distance(feature: str, current, values: np.ndarray) -> np.ndarray:
+    """
+    Tamanho da alteração em relação ao valor atual do aluno.
+    Indicadores: diferença absoluta (pontos na escala 0-10); Pedras: níveis ordinais.
+    Sem valor atual (ex: nota de inglês ausente), a distância é indefinida (NaN).
+    """
+    if feature in SWEEP_PEDRA_FEATURES:
+        pedra_map = PedraMapper().pedra_map
+        level = pedra_map.get(str(current).lower(), 0)
+        levels = np.array([pedra_map.get(str(v).lower(), 0) for v in values])
+        return np.abs(levels - level).astype(float)
+    if current is None or pd.isna(current):
+        return np.full(len(values), np.nan)
+    return np.abs(values.astype(float) - float(current))
+
+
+def run_whatif(
+    model,
+    base: pd.DataFrame,
+    sweeps: dict,
+    mode: str = "individual",
+    thresholds: dict = None,
+) -> dict:
+    """
+    Análise what-if vetorizada para um aluno.
+
+    Todas as combinações são expandidas em uma única matriz (uma linha por
+    cenário, mais a linha original) e pontuadas em UMA chamada predict_proba.
+
+    Modos:
+    - 'individual': cada feature é variada isoladamente (demais mantidas).
+    - 'grade': produto cartesiano das variações (superfície de probabilidade).
+
+    Para cada limiar de faixa de risco (atenção/alerta/crítico), retorna a
+    menor alteração que cruza o limiar em relação à probabilidade atual: por
+    feature no modo individual e por combinação (soma das alterações) na grade.
+
+    Args:
+        model: Pipeline treinado (predict_proba sobre dados brutos).
+        base (pd.DataFrame): Linha única com os dados do aluno.
+        sweeps (dict): Feature -> lista de valores a avaliar.
+        mode (str): 'individual' ou 'grade'.
+        thresholds (dict): Limiares das faixas (padrão: DEFAULT_THRESHOLDS).
+
+    Returns:
+        dict: Probabilidade atual, superfície de cenários e mudanças mínimas.
+    """
+    thresholds = thresholds or DEFAULT_THRESHOLDS
+    features = list(sweeps)
+    current = {f: base[f].iloc[0] if f in base.columns else None for f in features}
+
+    # 1. Expansão: matriz (cenários x features variadas) + grupo de cada cenário
+    if mode == "grade":
+        combos = list(itertools.product(*(sweeps[f] for f in features)))
+        swept = {
+            f: np.array([c[i] for c in combos], dtype=object)
+            for i, f in enumerate(features)
+        }
+        groups = np.zeros(len(combos), dtype=int)
+    else:
+        sizes = [len(sweeps[f]) for f in features]
+        n = sum(sizes)
+        swept = {f: np.full(n, current[f], dtype=object) for f in features}
+        groups = np.repeat(np.arange(len(features)), sizes)
+        offset = 0
+        for f, size in zip(features, sizes):
+            swept[f][offset : offset + size] = sweeps[f]
+            offset += size
+    n_scenarios = len(groups)
+
+    # 2. Pontuação única: linha 0 = aluno original, demais = cenários
+    X = base.loc[base.index.repeat(n_scenarios + 1)].reset_index(drop=True)
+    for f in features:
+        column = np.concatenate([[current[f]], swept[f]])
+        X[f] = pd.to_numeric(column) if f in SWEEP_NUMERIC_FEATURES else column
+    proba = np.asarray(model.predict_proba(X))[:, 1]
+    p0, scenario_proba = float(proba[0]), proba[1:]
+
+    # 3. Distância de cada cenário ao aluno original (soma sobre as features variadas)
+    distances = np.zeros(n_scenarios)
+    for i, f in enumerate(features):
+        d = change_distance(f, current[f], swept[f])
+        if mode == "grade":
+            distances += d
+        else:
+            distances = np.where(groups == i, d, distances)
+
+    # 4. Menor alteração que cruza cada limiar
+    mudancas = []
+    group_features = [features] if mode == "grade" else [[f] for f in features]
+    for name in BAND_NAMES[1:]:
+        limiar = thresholds[name]
+        crosses = (scenario_proba >= limiar) != (p0 >= limiar)
+        for g, group in enumerate(group_features):
+            candidates = np.flatnonzero(crosses & (groups == g) & ~np.isnan(distances))
+            if len(candidates) == 0:
+                continue
+            best = candidates[np.argmin(distances[candidates])]
+            mudancas.append(
+                {
+                    "limiar": name,
+                    "valor_limiar": limiar,
+                    "sentido": "reduz_risco" if p0 >= limiar else "aumenta_risco",
+                    "alteracoes": {
+                        f: {
+                            "de": _to_json(current[f]),
+                            "para": _to_json(swept[f][best]),
+                        }
+                        for f in group
+                    },
+                    "distancia": round(float(distances[best]), 4),
+                    "probabilidade": round(float(scenario_proba[best]), 4),
+                }
+            )
+
+    bands = assign_bands(proba, thresholds)
+    return {
+        "probabilidade_atual": round(p0, 4),
+        "faixa_atual": BAND_NAMES[bands[0]],
+        "modo": mode,
+        "n_cenarios": n_scenarios,
+        "superficie": [
+            {
+                "valores": {
+                    f: _to_json(swept[f][i]) for f in (group_features[groups[i]])
+                },
+                "probabilidade": round(float(scenario_proba[i]), 4),
+                "faixa": BAND_NAMES[bands[i + 1]],
+            }
+            for i in range(n_scenarios)
+        ],
+        "mudancas_minimas": mudancas,
+    }
+
+
+def _to_json(value):
+    """Converte escalares numpy/NaN para tipos serializáveis em JSON."""
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return None
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
@@ -1,6 +1,8 @@
+import pandas as pd
 from fastapi.testclient import TestClient
 from unittest.mock import patch, MagicMock
 from app.main import app
+from app.config import settings
 
 # Payload de exemplo ajustado ao app/schemas.py
 # Representa um aluno com dados completos para teste de integração da rota
@@ -35,6 +37,10 @@ def test_health_check():
         assert response.status_code == 200
         data = response.json()
         assert data["status"] == "online"
+        # O request_id é propagado (ou gerado) e devolvido no header
+        assert response.headers["X-Request-ID"]
+        response = client.get("/health", headers={"X-Request-ID": "abc-123"})
+        assert response.headers["X-Request-ID"] == "abc-123"
 
 
 def test_predict_endpoint_success():
@@ -118,3 +124,520 @@ def test_model_info_endpoint():
             data = response.json()
             assert "nome_projeto" in data
             assert "features_principais" in data
+
+
+def test_challenger_shadow_scoring(tmp_path):
+    """
+    Testa o modo Champion/Challenger com pré-processamento compartilhado.
+
+    Cenário:
+    - O challenger é o próprio classificador do champion (mesmas features).
+    - A resposta do /predict vem apenas do champion; o challenger é pontuado
+      em background e deve concordar 100% com delta zero.
+    """
+    import joblib
+    from app import main as api_main
+    from app.config import settings
+
+    champion = joblib.load(settings.MODEL_PATH)
+    challenger_path = tmp_path / "challenger_lr.joblib"
+    joblib.dump(champion[-1], challenger_path)
+
+    with patch.object(settings, "CHALLENGER_MODEL_PATHS", [challenger_path]):
+        with TestClient(app) as client:
+            response = client.post("/predict", json=sample_payload)
+            assert response.status_code == 200
+
+            api_main.challenger_runner.drain()
+            summary = client.get("/model/challengers").json()
+
+    resumo = summary["challengers"]["challenger_lr"]
+    assert resumo["predicoes"] == 1
+    assert resumo["taxa_concordancia"] == 1.0
+    assert resumo["delta_abs_max"] == 0.0
+
+
+def test_challenger_summary_without_challengers():
+    """Sem challengers configurados, o endpoint de comparação retorna 404."""
+    with TestClient(app) as client:
+        response = client.get("/model/challengers")
+        assert response.status_code == 404
+
+
+def test_challenger_queue_is_bounded():
+    """
+    Testa o limite da fila sombra.
+    Objetivo: Com o challenger travado, pontuações acima de 'max_pending' são
+    descartadas e contadas, sem bloquear quem enfileira.
+    """
+    import threading
+
+    from app.shadow import ChallengerRunner
+
+    release = threading.Event()
+    slow = MagicMock()
+    slow.predict_proba.side_effect = lambda X: release.wait(5) and [[0.5, 0.5]]
+    slow.predict.return_value = [1]
+
+    runner = ChallengerRunner({"lento": slow}, max_pending=2)
+    features = pd.DataFrame({"x": [1.0]})
+    for _ in range(5):
+        runner.submit(features, 0.5, True)
+    assert runner.dropped_count() == 3
+
+    release.set()
+    runner.drain()
+    assert runner.summary()["lento"]["predicoes"] == 2
+    # Permissões devolvidas: a fila volta a aceitar pontuações
+    runner.submit(features, 0.5, True)
+    runner.drain()
+    assert runner.dropped_count() == 3
+    runner.shutdown()
+
+
+def test_drift_endpoint():
+    """
+    Testa o endpoint /drift (agregados em memória contra o perfil de referência).
+    Após uma predição, a janela deve conter a observação e scores por feature.
+    """
+    with TestClient(app) as client:
+        client.post("/predict", json=sample_payload)
+        response = client.get("/drift", params={"janela_minutos": 5})
+        assert response.status_code == 200
+        data = response.json()
+        assert data["n_predicoes"] == 1
+        assert "ieg" in data["numericas"]
+        assert data["numericas"]["ieg"]["status"] in {"estavel", "atencao", "drift"}
+        assert "pedra_20" in data["categoricas"]
+
+
+def test_server_timing_and_slow_requests(monkeypatch):
+    """
+    Testa o middleware de tempo por requisição.
+    Objetivo: O header Server-Timing deve trazer total, handler e etapas, e
+    requisições acima do limiar devem ser amostradas com a entrada anonimizada.
+    """
+    from app import main as api_main
+
+    mock_model = MagicMock()
+    mock_model.predict.return_value = [1]
+    mock_model.predict_proba.return_value = [[0.1, 0.9]]
+    # Limiar zero: toda requisição é considerada lenta
+    monkeypatch.setattr(api_main.latency_observer, "slow_threshold_ms", 0.0)
+    monkeypatch.setattr(settings, "DEBUG_ENDPOINTS_ENABLED", True)
+
+    with patch("app.main.joblib.load", return_value=mock_model):
+        with TestClient(app) as client:
+            payload = {**sample_payload, "nome": "Maria Silva", "ra": "RA-1"}
+            response = client.post(
+                "/predict", json=payload, headers={"X-Request-ID": "lenta-1"}
+            )
+            assert response.status_code == 200
+            timing = response.headers["Server-Timing"]
+            for name in ("total;dur=", "handler;dur=", "inferencia;dur="):
+                assert name in timing
+
+            data = client.get("/debug/latency").json()
+            assert data["percentis_por_rota"]["POST /predict"]["requisicoes"] >= 1
+            sample = next(
+                s for s in data["requisicoes_lentas"] if s["request_id"] == "lenta-1"
+            )
+            assert sample["rota"] == "POST /predict"
+            assert "monitoramento" in sample["etapas_ms"]
+            assert sample["entrada"]["nome"] == "***"
+            assert sample["entrada"]["ra"] == "***"
+            assert sample["entrada"]["iaa"] == 8.5
+
+
+def test_slow_request_sample_masks_nested_identifiers(monkeypatch):
+    """
+    Testa a anonimização das entradas amostradas em corpos aninhados.
+    Objetivo: RA e nome dentro de 'aluno' (/predict/whatif) e em listas são
+    mascarados; sem habilitar explicitamente, /debug/* responde 404.
+    """
+    from app import main as api_main
+    from app.observability import anonymize_payload
+
+    with TestClient(app) as client:
+        assert client.get("/debug/latency").status_code == 404
+        assert client.get("/debug/memory").status_code == 404
+
+    monkeypatch.setattr(api_main.latency_observer, "slow_threshold_ms", 0.0)
+    monkeypatch.setattr(settings, "DEBUG_ENDPOINTS_ENABLED", True)
+    body = {
+        "aluno": {**sample_payload, "ra": "RA-123", "nome": "Maria Silva"},
+        "variacoes": [{"feature": "ieg", "passo": 0.5}],
+    }
+    with TestClient(app) as client:
+        response = client.post(
+            "/predict/whatif", json=body, headers={"X-Request-ID": "whatif-1"}
+        )
+        assert response.status_code == 200
+        data = client.get("/debug/latency").json()
+
+    sample = next(
+        s for s in data["requisicoes_lentas"] if s["request_id"] == "whatif-1"
+    )
+    assert sample["entrada"]["aluno"]["ra"] == "***"
+    assert sample["entrada"]["aluno"]["nome"] == "***"
+    assert sample["entrada"]["aluno"]["iaa"] == 8.5
+    assert "RA-123" not in str(sample) and "Maria Silva" not in str(sample)
+
+    batch = anonymize_payload(b'[{"ra": "RA-9", "ieg": 7.25}]')
+    assert batch == [{"ra": "***", "ieg": 7.2}]
+
+
+def test_predict_explain_endpoints():
+    """
+    Testa a predição explicada com o pipeline real (LogisticRegression).
+    Objetivo: A probabilidade deve coincidir com o /predict e os fatores devem
+    usar nomes de features originais, ordenados pela magnitude da contribuição.
+    """
+    with TestClient(app) as client:
+        predicted = client.post("/predict", json=sample_payload).json()
+        response = client.post("/predict/explain?top_k=3", json=sample_payload)
+        assert response.status_code == 200
+        data = response.json()
+        assert data["probabilidade_risco"] == predicted["probabilidade_risco"]
+        assert data["risco_defasagem"] == predicted["risco_defasagem"]
+
+        fatores = data["principais_fatores"]
+        assert len(fatores) == 3
+        magnitudes = [abs(f["contribuicao"]) for f in fatores]
+        assert magnitudes == sorted(magnitudes, reverse=True)
+        # Nomes originais (sem sufixos de one-hot como 'genero_Menina')
+        assert {f["feature"] for f in fatores} <= set(sample_payload) | {"n_av"}
+
+        other = {**sample_payload, "ieg": 1.0, "genero": "Menino"}
+        batch = client.post("/predict/explain/batch", json=[sample_payload, other])
+        assert batch.status_code == 200
+        assert len(batch.json()) == 2
+        assert batch.json()[0]["probabilidade_risco"] == data["probabilidade_risco"]
+
+
+def test_predict_whatif(monkeypatch):
+    """
+    Testa a análise what-if com o pipeline real.
+    Objetivo: Cenários devem ser pontuados em lote, e cada mudança mínima deve
+    de fato cruzar o limiar de risco em relação à probabilidade atual.
+    """
+    from app import main as api_main
+
+    body = {
+        "aluno": {**sample_payload, "ieg": 2.0, "ida": 2.0},
+        "variacoes": [
+            {"feature": "ieg", "passo": 0.5},
+            {"feature": "ida"},
+            {"feature": "pedra_21"},
+        ],
+    }
+    with TestClient(app) as client:
+        response = client.post("/predict/whatif", json=body)
+        assert response.status_code == 200
+        data = response.json()
+        assert data["n_cenarios"] == 21 + 11 + 4
+        assert len(data["superficie"]) == data["n_cenarios"]
+
+        p0 = data["probabilidade_atual"]
+        for mudanca in data["mudancas_minimas"]:
+            limiar = mudanca["valor_limiar"]
+            assert (mudanca["probabilidade"] >= limiar) != (p0 >= limiar)
+
+        # Valores fora do domínio da feature são rejeitados na validação
+        invalid = {**body, "variacoes": [{"feature": "pedra_21", "valores": ["Ouro"]}]}
+        assert client.post("/predict/whatif", json=invalid).status_code == 422
+
+        monkeypatch.setattr(api_main.settings, "WHATIF_MAX_SCENARIOS", 50)
+        grid = {**body, "modo": "grade"}
+        assert client.post("/predict/whatif", json=grid).status_code == 413
+
+        # Passo mínimo e tamanho da grade verificados antes de alocar os valores
+        tiny = {**body, "variacoes": [{"feature": "ieg", "passo": 1e-6}]}
+        assert client.post("/predict/whatif", json=tiny).status_code == 422
+        fine = {**body, "variacoes": [{"feature": "ieg", "passo": 0.01}]}
+        assert client.post("/predict/whatif", json=fine).status_code == 413
+
+
+def test_ranking_endpoints():
+    """
+    Testa o ranking top-k com o pipeline real.
+    Objetivo: O JSON e o CSV (formato bruto do PEDE) devem retornar os alunos
+    de maior risco em ordem decrescente, respeitando k e o agrupamento.
+    """
+    alunos = [
+        {**sample_payload, "ra": f"RA-{i}", "turma": t, "ieg": float(i)}
+        for i, t in enumerate(["A", "A", "B", "B", "B"])
+    ]
+    raw_csv = settings.BASE_DIR / "data" / "raw" / "dataset_pede_passos.csv"
+
+    with TestClient(app) as client:
+        response = client.post("/ranking?k=2&agrupar_por=turma", json=alunos)
+        assert response.status_code == 200
+        data = response.json()
+        assert data["total_alunos"] == 5
+        assert {g["grupo"] for g in data["grupos"]} == {"A", "B"}
+        for grupo in data["grupos"]:
+            probas = [a["probabilidade_risco"] for a in grupo["alunos"]]
+            assert len(probas) == 2 and probas == sorted(probas, reverse=True)
+
+        response = client.post(
+            "/ranking/csv?k=5&chunksize=100",
+            content=raw_csv.read_bytes(),
+            headers={"Content-Type": "text/csv"},
+        )
+        assert response.status_code == 200
+        data = response.json()
+        assert data["total_alunos"] == 860
+        assert data["alunos_invalidos"] == 0
+        top = data["grupos"][0]["alunos"]
+        assert [a["posicao"] for a in top] == [1, 2, 3, 4, 5]
+        assert top[0]["ra"].startswith("RA-")
+
+
+def test_score_store_incremental(monkeypatch, tmp_path):
+    """
+    Testa o score store com o pipeline real.
+    Objetivo: Reenviar o mesmo lote não deve acionar o modelo; apenas o aluno
+    alterado é reavaliado e a consulta por RA/turma lê o score armazenado, com
+    turma atualizada e faixa pelos limiares vigentes.
+    """
+    from app import main as api_main
+
+    monkeypatch.setattr(settings, "SCORE_STORE_PATH", tmp_path / "scores.db")
+    alunos = [
+        {**sample_payload, "ra": f"RA-{i}", "turma": t, "ieg": float(i)}
+        for i, t in enumerate(["A", "A", "B"])
+    ]
+
+    with TestClient(app) as client:
+        first = client.post("/scores/batch", json=alunos).json()
+        assert first["reavaliados"] == 3 and first["reaproveitados"] == 0
+
+        second = client.post("/scores/batch", json=alunos).json()
+        assert second["reavaliados"] == 0 and second["reaproveitados"] == 3
+
+        alunos[1]["ieg"] = 9.5
+        third = client.post("/scores/batch", json=alunos).json()
+        assert third["reavaliados"] == 1 and third["reaproveitados"] == 2
+
+        stored = client.get("/scores/RA-1").json()
+        assert stored["turma"] == "A" and stored["desatualizado"] is False
+        assert stored["versao_modelo"] == first["versao_modelo"]
+        assert len(client.get("/scores?turma=A").json()) == 2
+
+        # Troca de turma sem mudar as features: score reaproveitado, turma nova
+        alunos[1]["turma"] = "B"
+        moved = client.post("/scores/batch", json=alunos).json()
+        assert moved["reaproveitados"] == 3
+        assert client.get("/scores/RA-1").json()["turma"] == "B"
+        assert len(client.get("/scores?turma=B").json()) == 2
+
+        # Novos limiares: a faixa lida reflete o arquivo vigente, sem reavaliar
+        monkeypatch.setattr(
+            api_main,
+            "risk_thresholds",
+            {"atencao": 0.0, "alerta": 0.0, "critico": 0.0},
+        )
+        assert len(client.get("/scores?faixa=critico").json()) == 3
+        assert client.get("/scores?faixa=estavel").json() == []
+        assert client.get("/scores/RA-1").json()["faixa"] == "critico"
+        assert client.get("/scores/RA-99").status_code == 404
+        assert client.post("/scores/batch", json=[sample_payload]).status_code == 422
+
+
+def test_feature_cache_reuses_blocks(monkeypatch):
+    """
+    Testa o cache de features com o pipeline real.
+    Objetivo: O vetor montado a partir do cache deve ser idêntico ao pipeline;
+    reavaliar o aluno com um indicador alterado reaproveita os blocos não numéricos.
+    """
+    from app import main as api_main
+
+    # Cache frio: o aquecimento pré-carrega o payload de exemplo
+    monkeypatch.setattr(settings, "WARMUP_ENABLED", False)
+    with TestClient(app) as client:
+        cache = api_main.feature_cache
+        assert cache is not None
+        first = client.post("/predict", json=sample_payload).json()
+        changed = client.post("/predict", json={**sample_payload, "ieg": 1.0}).json()
+        assert client.post("/predict", json=sample_payload).json() == first
+        assert changed["probabilidade_risco"] != first["probabilidade_risco"]
+
+        df = pd.DataFrame([sample_payload, {**sample_payload, "genero": "Menino"}])
+        df["n_av"] = 0
+        expected = api_main.model[:-1].transform(df)
+        pd.testing.assert_frame_equal(cache.transform(df), expected)
+
+        stats = client.get("/model/info").json()["cache_features"]
+        assert stats["grupos"]["num"]["misses"] == 2
+        assert stats["grupos"]["cat"]["hits"] >= 2
+        assert stats["grupos"]["gen_num"]["hit_rate"] > 0.5
+
+
+def test_calibrated_thresholds_from_config(monkeypatch, tmp_path):
+    """
+    Testa o carregamento dos limiares calibrados (THRESHOLDS_PATH).
+    Objetivo: A decisão de risco e a mensagem devem seguir os limiares do
+    arquivo, e não as constantes padrão.
+    """
+    import json
+
+    path = tmp_path / "thresholds.json"
+    path.write_text(
+        json.dumps({"decisao": 0.95, "atencao": 0.6, "alerta": 0.88, "critico": 0.95})
+    )
+    monkeypatch.setattr(settings, "THRESHOLDS_PATH", path)
+
+    mock_model = MagicMock()
+    mock_model.predict.return_value = [1]
+    mock_model.predict_proba.return_value = [[0.1, 0.9]]
+
+    with patch("app.main.joblib.load", return_value=mock_model):
+        with TestClient(app) as client:
+            data = client.post("/predict", json=sample_payload).json()
+            assert data["risco_defasagem"] is False
+            assert "ALERTA" in data["mensagem"]
+            limiares = client.get("/model/info").json()["limiares_risco"]
+            assert limiares["decisao"] == 0.95 and limiares["critico"] == 0.95
+
+
+def test_feedback_rolling_metrics():
+    """
+    Testa o ciclo predição -> feedback -> métricas de produção.
+    Objetivo: O desfecho deve ser associado à predição servida do mesmo RA
+    (uma única vez) e refletido em /metrics e /model/info; buckets fora da
+    janela deixam de contar.
+    """
+    from app.feedback import RollingConfusion
+
+    mock_model = MagicMock()
+    mock_model.predict.return_value = [1]
+    mock_model.predict_proba.return_value = [[0.1, 0.9]]
+
+    with patch("app.main.joblib.load", return_value=mock_model):
+        with TestClient(app) as client:
+            for ra in ["RA-1", "RA-2"]:
+                client.post("/predict", json={**sample_payload, "ra": ra})
+
+            first = client.post("/feedback", json={"ra": "RA-1", "defasagem": True})
+            assert first.json()["resultado"] == "tp"
+            second = client.post("/feedback", json={"ra": "RA-2", "defasagem": False})
+            assert second.json()["resultado"] == "fp"
+            repeated = client.post("/feedback", json={"ra": "RA-1", "defasagem": True})
+            assert repeated.status_code == 404
+
+            metrics = client.get("/metrics?janela_horas=1").json()
+            assert metrics["matriz_confusao"] == {"tn": 0, "fp": 1, "fn": 0, "tp": 1}
+            assert metrics["recall"] == 1.0 and metrics["precisao"] == 0.5
+            assert metrics["por_faixa"]["critico"]["n"] == 2
+            info = client.get("/model/info").json()["metricas_producao"]
+            assert info["n"] == 2
+
+    now = [0.0]
+    rolling = RollingConfusion(
+        window_seconds=120, bucket_seconds=60, clock=lambda: now[0]
+    )
+    rolling.update(predicted=False, observed=True, faixa=0)
+    now[0] = 200.0
+    rolling.update(predicted=True, observed=True, faixa=3)
+    snapshot = rolling.snapshot()
+    assert snapshot["matriz_confusao"]["fn"] == 0 and snapshot["recall"] == 1.0
+    assert snapshot["desde_inicio"]["recall"] == 0.5
+
+
+def test_warmup_and_readiness():
+    """
+    Testa o aquecimento na inicialização e as probes de liveness/readiness.
+    Objetivo: Com o pipeline real, a API só fica pronta após aquecer todos os
+    caminhos (sem registrar predições servidas); se o aquecimento falha, a API
+    segue viva mas responde 503 na readiness.
+    """
+    from app import main as api_main
+
+    with TestClient(app) as client:
+        ready = client.get("/health/ready")
+        assert ready.status_code == 200
+        warmup = ready.json()["aquecimento"]
+        assert {"linha_a_linha", "lote", "explicacao"} <= set(warmup["caminhos_ms"])
+        assert client.get("/health").json()["ready"] is True
+        # Aquecimento fora das métricas e das predições servidas
+        assert len(api_main.served_predictions) == 0
+        assert api_main.feature_cache.stats()["hit_rate"] is None
+
+    broken_model = MagicMock()
+    broken_model.predict.side_effect = ValueError("pipeline inconsistente")
+    with patch("app.main.joblib.load", return_value=broken_model):
+        with TestClient(app) as client:
+            assert client.get("/health/live").status_code == 200
+            not_ready = client.get("/health/ready")
+            assert not_ready.status_code == 503
+            assert not_ready.json()["model_loaded"] is True
+
+
+def test_debug_memory_profiling(monkeypatch):
+    """
+    Testa o perfil de memória opt-in (/debug/memory).
+    Objetivo: Com o pipeline real e amostragem total, o endpoint deve trazer o
+    RSS, o tamanho do modelo por etapa, os maiores alocadores, o crescimento
+    desde a inicialização e o pico de alocação por rota; ao encerrar, o
+    tracemalloc é desligado.
+    """
+    import tracemalloc
+
+    monkeypatch.setattr(settings, "DEBUG_ENDPOINTS_ENABLED", True)
+    monkeypatch.setattr(settings, "MEMORY_PROFILING_ENABLED", True)
+    monkeypatch.setattr(settings, "MEMORY_SAMPLE_RATE", 1.0)
+
+    with TestClient(app) as client:
+        for _ in range(3):
+            assert client.post("/predict", json=sample_payload).status_code == 200
+        data = client.get("/debug/memory", params={"limite": 5}).json()
+
+        assert data["processo"]["rss_mb"] > 0
+        assert set(data["modelo"]["etapas_mb"]) == {
+            "pedra_mapper",
+            "binary_cleaner",
+            "preprocessor",
+            "classifier",
+        }
+        assert data["estruturas_mb"]["cache_features"] > 0
+        profile = data["perfil_alocacoes"]
+        assert profile["ativo"] is True
+        assert 0 < len(profile["maiores_alocadores"]) <= 5
+        assert "crescimento_kb" in profile["crescimento_desde_inicio"][0]
+        predict = next(v for k, v in profile["por_rota"].items() if "/predict" in k)
+        assert predict["amostradas"] == 3
+        assert predict["pico_max_kb"] >= predict["pico_p50_kb"] > 0
+
+    assert not tracemalloc.is_tracing()
+
+    # Sem o perfil ativo, o endpoint segue disponível com RSS e tamanhos
+    monkeypatch.setattr(settings, "MEMORY_PROFILING_ENABLED", False)
+    with TestClient(app) as client:
+        data = client.get("/debug/memory").json()
+        assert data["modelo"]["total_mb"] > 0
+        assert data["perfil_alocacoes"] == {"ativo": False}
+
+
+def test_memory_sizing_does_not_hold_store_lock(monkeypatch):
+    """
+    Testa a medição de memória das estruturas compartilhadas (/debug/memory).
+    Objetivo: O percurso profundo (deep_sizeof) roda fora da trava, sem
+    bloquear /predict, e o total coincide com a medição direta.
+    """
+    import src.memory
+    from app.feedback import ServedPredictionStore
+
+    store = ServedPredictionStore(max_size=100)
+    for i in range(50):
+        store.add(f"RA-{i}", 0.5, True, 1)
+    expected = src.memory.deep_sizeof(store._entries)
+
+    original = src.memory.deep_sizeof
+
+    def checked(obj, _seen=None):
+        assert not store._lock.locked()
+        return original(obj, _seen)
+
+    monkeypatch.setattr(src.memory, "deep_sizeof", checked)
+    assert store.memory_bytes() == expected
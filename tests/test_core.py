@@ -1,7 +1,42 @@
+import json
+import logging
 import pandas as pd
 import numpy as np
-from src.preprocessing import normalize_columns, create_target
-from src.feature_engineering import PedraMapper, BinaryCleaner
+from benchmarks.load_test import payloads_from_dataset, summarize_run
+from benchmarks.run import compare_to_baseline
+from src.preprocessing import normalize_columns, create_target, drop_invalid_rows
+from src.drift import (
+    StreamingDriftMonitor,
+    compute_reference_profile,
+    format_drift_record,
+    histogram_counts,
+    population_stability_index,
+)
+from src.drift_report import generate_drift_report
+from src.evaluate import (
+    TARGET_NAMES,
+    StreamingMetrics,
+    accumulate_metrics,
+    bootstrap_metrics,
+)
+from src.feature_engineering import PedraMapper, BinaryCleaner, IncrementalPreprocessor
+from src.ranking import RunningTopK
+from src.risk_bands import BAND_NAMES, assign_bands
+from src.synthetic_data import fit_synthetic_profile, write_synthetic_csv
+from src.threshold_sweep import recommend_thresholds, sweep_thresholds
+from src.validation import error_counts, row_errors, validate_frame
+from src.whatif import expand_sweep, sweep_size
+from src.utils import (
+    JsonFormatter,
+    SamplingFilter,
+    configure_logging,
+    log_segments_for_window,
+    request_id_var,
+    read_log_index,
+    setup_csv_logger,
+    setup_logger,
+    wait_log_compression,
+)
 
 
 def test_normalize_columns():
@@ -98,3 +133,682 @@ def test_create_target_drops_nan():
     # Esperamos apenas 2 linhas válidas (-1 e 0)
     assert len(df_target) == 2
     assert df_target["ALVO"].tolist() == [1, 0]
+
+
+def test_incremental_preprocessor_partial_fit():
+    """
+    Testa o pré-processador incremental.
+    Objetivo: Atualizar por lotes deve produzir as mesmas estatísticas de um ajuste
+    único, e o vocabulário categórico deve crescer sem alterar a dimensão da saída.
+    """
+    df = pd.DataFrame(
+        {
+            "ieg": [1.0, 2.0, np.nan, 4.0, 5.0, 9.0],
+            "genero": ["Menina", "Menina", "Menino", None, "Menino", "Outro"],
+        }
+    )
+    full = IncrementalPreprocessor(["ieg"], ["genero"], max_categories=3).fit(df)
+
+    inc = IncrementalPreprocessor(["ieg"], ["genero"], max_categories=3)
+    inc.partial_fit(df.iloc[:2])
+    width_before = inc.transform(df).shape[1]
+    inc.partial_fit(df.iloc[2:])
+
+    np.testing.assert_allclose(inc.mean_, full.mean_)
+    np.testing.assert_allclose(inc.scale_, full.scale_)
+    assert inc.transform(df).shape[1] == width_before
+
+    # Capacidade de 3 posições: 'Outro' (4ª categoria) é ignorada
+    assert inc.categories_["genero"] == ["Menina", "Menino", "missing"]
+    assert inc.transform(df).iloc[5, 1:].sum() == 0
+
+
+def test_reference_profile_and_psi():
+    """
+    Testa o perfil de referência de drift e o cálculo do PSI.
+    Objetivo: A própria amostra de treino deve ter PSI ~0 contra a referência,
+    enquanto uma população deslocada deve apresentar PSI alto.
+    """
+    rng = np.random.default_rng(42)
+    X = pd.DataFrame(
+        {
+            "ieg": rng.uniform(0, 10, 500),
+            "genero": rng.choice(["Menina", "Menino"], 500),
+            "pedra_20": rng.choice(["Ametista", "agata", None], 500),
+        }
+    )
+    profile = compute_reference_profile(X, rng.uniform(0, 1, 500))
+
+    ieg = profile["numericas"]["ieg"]
+    assert abs(sum(ieg["proporcoes"]) - 1) < 1e-3
+    assert set(profile["categoricas"]["pedra_20"]) == {"Ametista", "Ágata", "Sem Pedra"}
+
+    same = histogram_counts(X["ieg"], ieg["edges"])
+    shifted = histogram_counts(X["ieg"] * 0.5, ieg["edges"])
+    assert population_stability_index(ieg["proporcoes"], same) < 0.01
+    assert population_stability_index(ieg["proporcoes"], shifted) > 0.25
+
+
+def test_streaming_drift_monitor_window():
+    """
+    Testa os agregados de drift em memória com janela deslizante.
+    Objetivo: Predições fora da janela devem expirar, e uma população deslocada
+    deve ser sinalizada como drift em relação à referência.
+    """
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame(
+        {
+            "ieg": rng.uniform(0, 10, 500),
+            "genero": rng.choice(["Menina", "Menino"], 500),
+        }
+    )
+    profile = compute_reference_profile(X, rng.uniform(0, 1, 500))
+
+    now = [0.0]
+    monitor = StreamingDriftMonitor(
+        profile, window_seconds=120, bucket_seconds=60, clock=lambda: now[0]
+    )
+
+    for value in X["ieg"]:
+        monitor.update({"ieg": value, "genero": "Menina"}, 0.5)
+    snapshot = monitor.snapshot()
+    assert snapshot["n_predicoes"] == 500
+    assert snapshot["numericas"]["ieg"]["status"] == "estavel"
+    assert snapshot["categoricas"]["genero"]["status"] == "drift"
+
+    # Após 3 minutos, o bucket inicial sai da janela de 2 minutos
+    now[0] = 180.0
+    for _ in range(50):
+        monitor.update({"ieg": 9.9, "genero": "Outro"}, 0.95)
+    snapshot = monitor.snapshot()
+    assert snapshot["n_predicoes"] == 50
+    assert snapshot["numericas"]["ieg"]["status"] == "drift"
+    assert snapshot["categoricas"]["genero"]["proporcoes"]["outros"] == 1.0
+
+
+def test_drift_report_chunked(tmp_path):
+    """
+    Testa o relatório offline de drift lendo o log em blocos.
+    Objetivo: Linhas antigas (sem as colunas novas) e novas devem ser agregadas
+    por dia, com PSI e faixas de risco calculados por período.
+    """
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame(
+        {
+            "ieg": rng.uniform(0, 10, 500),
+            "genero": rng.choice(["Menina", "Menino"], 500),
+        }
+    )
+    profile = compute_reference_profile(X, rng.uniform(0, 0.5, 500))
+
+    lines = ["2024-01-01 10:00:00,123,0.9000,True,Menina,Pública,Ametista"]
+    for value in X["ieg"][:40]:
+        record = {"genero": "Menina", "ieg": round(float(value), 2)}
+        lines.append(
+            "2024-01-01 11:00:00,001," + format_drift_record(record, 0.2, False)
+        )
+    for _ in range(30):
+        record = {"genero": "Outro", "ieg": 9.9}
+        lines.append(
+            "2024-01-02 09:00:00,001," + format_drift_record(record, 0.9, True)
+        )
+    log_file = tmp_path / "drift_data.csv"
+    log_file.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+    report = generate_drift_report([log_file], profile, freq="D", chunksize=16)
+    assert report["linhas_processadas"] == 71
+
+    dia1, dia2 = report["periodos"]
+    assert dia1["periodo"] == "2024-01-01" and dia1["n_predicoes"] == 41
+    assert dia1["psi"]["ieg"] < 0.25
+    assert dia2["status"]["ieg"] == "drift"
+    assert dia2["categorias_novas"]["genero"] == 30
+    assert dia2["faixas_risco"]["critico"]["proporcao"] == 1.0
+
+
+def test_log_rotation_and_segment_index(tmp_path):
+    """
+    Testa a rotação por tamanho com compressão em segundo plano.
+    Objetivo: Segmentos rotacionados devem ser comprimidos, indexados por
+    intervalo de tempo e respeitar a retenção; a seleção por janela deve
+    devolver apenas os segmentos relevantes e o arquivo ativo.
+    """
+    log_file = tmp_path / "drift_data.csv"
+    logger = setup_csv_logger(
+        "test_rotation", log_file, max_bytes=200, rotation_seconds=0, backup_count=3
+    )
+    try:
+        for i in range(40):
+            logger.info(f"0.{i:04d},False,Menina")
+        wait_log_compression()
+
+        index = read_log_index(log_file)
+        assert len(index) == 3
+        assert all(entry["arquivo"].endswith(".csv.gz") for entry in index)
+        assert len(list(tmp_path.glob("*.gz"))) == 3
+        assert index[0]["inicio"] <= index[-1]["fim"]
+
+        segments = log_segments_for_window(log_file, start=index[-1]["inicio"])
+        assert segments[-1] == log_file
+        assert (tmp_path / index[-1]["arquivo"]) in segments
+        assert log_segments_for_window(log_file, end="2000-01-01") == []
+
+        # Segmentos comprimidos continuam legíveis pelo leitor do log de drift
+        lines = pd.read_csv(segments[0], header=None)
+        assert lines.shape[1] == 5
+    finally:
+        for handler in list(logger.handlers):
+            handler.close()
+            logger.removeHandler(handler)
+
+
+def test_loggers_sharing_a_file_keep_all_lines(tmp_path, monkeypatch, capsys):
+    """
+    Testa dois loggers gravando o mesmo arquivo através de rotações.
+    Objetivo: O handler de arquivo é compartilhado por caminho, então nenhuma
+    linha se perde quando um dos loggers rotaciona o arquivo; uma política de
+    rotação divergente é reportada via logging.lastResort (stderr).
+    """
+    import gzip
+
+    monkeypatch.chdir(tmp_path)
+    rotation = {"max_bytes": 2000, "rotation_seconds": 0, "backup_count": 0}
+    first = setup_logger("test_shared_a", "shared.log", **rotation)
+    second = setup_logger("test_shared_b", "shared.log", **rotation)
+    third = setup_logger("test_shared_c", "shared.log", max_bytes=10, backup_count=0)
+    try:
+        assert first.handlers[-1] is second.handlers[-1] is third.handlers[-1]
+        assert "Política de rotação divergente" in capsys.readouterr().err
+        for i in range(200):
+            first.info(f"linha-a-{i}")
+            second.info(f"linha-b-{i}")
+        wait_log_compression()
+
+        log_dir = tmp_path / "logs"
+        segments = sorted(log_dir.glob("shared.*.log.gz"))
+        assert len(segments) > 1
+        lines = []
+        for segment in segments:
+            with gzip.open(segment, "rt", encoding="utf-8") as f:
+                lines += f.read().splitlines()
+        lines += (log_dir / "shared.log").read_text(encoding="utf-8").splitlines()
+        assert len(lines) == 400
+        assert sum("linha-a-" in line for line in lines) == 200
+    finally:
+        for logger in (first, second, third):
+            for handler in list(logger.handlers):
+                handler.close()
+                logger.removeHandler(handler)
+
+
+def test_async_json_logging_with_sampling(tmp_path, monkeypatch):
+    """
+    Testa o modo de logging assíncrono estruturado.
+    Objetivo: Registros devem ser escritos pela thread de fundo em JSON, com
+    request_id e campos extras, e mensagens repetitivas devem ser amostradas.
+    """
+    monkeypatch.chdir(tmp_path)
+    configure_logging(async_mode=True, json_format=True, sample_burst=5)
+    try:
+        logger = setup_logger("test_async_json", "async.log")
+        token = request_id_var.set("req-1")
+        for _ in range(50):
+            logger.info("repetida", extra={"latencia_ms": 1.5})
+        logger.error("falha")
+        request_id_var.reset(token)
+    finally:
+        # Volta ao modo síncrono: esvazia a fila antes da leitura
+        configure_logging()
+
+    lines = [
+        json.loads(line)
+        for line in (tmp_path / "logs" / "async.log").read_text().splitlines()
+    ]
+    repeated = [line for line in lines if line["mensagem"] == "repetida"]
+    assert 5 <= len(repeated) < 50
+    assert repeated[0]["request_id"] == "req-1"
+    assert repeated[0]["latencia_ms"] == 1.5
+    assert lines[-1]["nivel"] == "ERROR"
+
+
+def test_sampling_filter_reports_suppressed():
+    """
+    Testa a contagem de mensagens suprimidas pela amostragem.
+    Objetivo: Após o burst, apenas 1 a cada N é mantido e o próximo registro
+    emitido carrega a quantidade descartada.
+    """
+    now = [0.0]
+    sampler = SamplingFilter(burst=2, every=3, clock=lambda: now[0])
+    records = [
+        logging.makeLogRecord({"name": "x", "levelno": logging.INFO}) for _ in range(8)
+    ]
+    kept = [sampler.filter(record) for record in records]
+    assert kept == [True, True, False, False, True, False, False, True]
+    assert records[4].suprimidos == 2
+    assert json.loads(JsonFormatter().format(records[7]))["suprimidos"] == 2
+
+    # Nova janela de 1s: o burst é restabelecido
+    now[0] = 1.0
+    assert sampler.filter(logging.makeLogRecord({"name": "x", "levelno": 20}))
+
+
+def test_running_top_k_matches_full_sort():
+    """
+    Testa o top-k incremental por grupo.
+    Objetivo: Processando os dados em blocos, o resultado deve coincidir com a
+    ordenação completa de cada grupo.
+    """
+    rng = np.random.default_rng(0)
+    scores = rng.uniform(0, 1, 1000)
+    records = pd.DataFrame({"ra": [f"RA-{i}" for i in range(1000)]})
+    turmas = rng.choice(["A", "B", "C"], 1000)
+
+    running = RunningTopK(k=5)
+    for start in range(0, 1000, 64):
+        block = slice(start, start + 64)
+        running.update(scores[block], records.iloc[block], turmas[block])
+
+    result = running.result()
+    assert running.n_seen == 1000
+    for turma in ["A", "B", "C"]:
+        expected = np.sort(scores[turmas == turma])[::-1][:5]
+        np.testing.assert_allclose(result[turma]["probabilidade_risco"], expected)
+
+
+def test_streaming_metrics_match_full_report():
+    """
+    Testa os acumuladores incrementais da avaliação.
+    Objetivo: Atualizando em blocos, o relatório e a matriz de confusão devem
+    ser idênticos aos do sklearn sobre os arrays completos.
+    """
+    from sklearn.metrics import classification_report, confusion_matrix
+
+    rng = np.random.default_rng(1)
+    y_true = rng.integers(0, 2, 1003)
+    proba = np.clip(y_true * 0.3 + rng.uniform(0, 0.7, 1003), 0, 1)
+    y_pred = (proba > 0.5).astype(int)
+
+    metrics = StreamingMetrics()
+    for start in range(0, 1003, 100):
+        block = slice(start, start + 100)
+        metrics.update(y_true[block], y_pred[block], proba[block])
+
+    expected = classification_report(
+        y_true, y_pred, target_names=TARGET_NAMES, zero_division=0
+    )
+    assert metrics.classification_report() == expected
+    np.testing.assert_array_equal(
+        metrics.confusion_matrix(), confusion_matrix(y_true, y_pred)
+    )
+    assert metrics.proba_hist.sum() == 1003
+    assert metrics.recall() == y_pred[y_true == 1].mean()
+
+
+def test_bootstrap_metrics_reproducible():
+    """
+    Testa os intervalos de confiança por bootstrap.
+    Objetivo: Com a mesma semente, o resultado independe do número de processos;
+    o intervalo contém a estimativa pontual, as contagens por faixa somam n e
+    seguem os limiares calibrados informados.
+    """
+    rng = np.random.default_rng(2)
+    y_true = rng.integers(0, 2, 170)
+    proba = rng.uniform(0, 1, 170)
+    metrics = StreamingMetrics(keep_cells=True)
+    metrics.update(y_true, (proba > 0.5).astype(int), proba)
+
+    serial = bootstrap_metrics(metrics.cells(), n_resamples=1200, n_jobs=1)
+    parallel = bootstrap_metrics(metrics.cells(), n_resamples=1200, n_jobs=2)
+    assert serial["metricas"] == parallel["metricas"]
+
+    recall = serial["metricas"]["recall_risco"]
+    assert recall["estimativa"] == round(metrics.recall(), 4)
+    assert recall["ic_inferior"] <= recall["estimativa"] <= recall["ic_superior"]
+    bands = [serial["metricas"][f"alunos_{name}"]["estimativa"] for name in BAND_NAMES]
+    assert sum(bands) == 170
+
+    # Faixas pelos limiares calibrados informados, não pelos padrões
+    calibrated = {"atencao": 0.2, "alerta": 0.4, "critico": 0.6}
+    custom = StreamingMetrics(keep_cells=True, thresholds=calibrated)
+    custom.update(y_true, (proba > 0.5).astype(int), proba)
+    result = bootstrap_metrics(custom.cells(), n_resamples=200, n_jobs=1)
+    expected = np.bincount(assign_bands(proba, calibrated), minlength=len(BAND_NAMES))
+    assert [
+        result["metricas"][f"alunos_{name}"]["estimativa"] for name in BAND_NAMES
+    ] == expected.tolist()
+    assert expected.tolist() != bands
+
+
+def test_accumulate_metrics_uses_decision_threshold():
+    """
+    Testa a avaliação com o limiar de decisão calibrado ('decisao').
+    Objetivo: A classe prevista deve ser proba >= limiar (a decisão da API), e
+    não o argmax, e o limiar deve ficar registrado no bootstrap.
+    """
+
+    class FixedProba:
+        classes_ = np.array([0, 1])
+
+        def predict_proba(self, X):
+            p = X["p"].to_numpy()
+            return np.column_stack([1 - p, p])
+
+    X = pd.DataFrame({"p": [0.1, 0.35, 0.45, 0.7, 0.9]})
+    y = pd.DataFrame({"alvo": [0, 1, 0, 1, 1]})
+
+    argmax = accumulate_metrics(FixedProba(), [(X, y)])
+    assert argmax.counts.tolist() == [2, 0, 1, 2]
+
+    calibrated = accumulate_metrics(
+        FixedProba(), [(X, y)], keep_cells=True, decision_threshold=0.3
+    )
+    assert calibrated.counts.tolist() == [1, 1, 0, 3]
+    assert calibrated.recall() == 1.0
+    ci = bootstrap_metrics(
+        calibrated.cells(),
+        n_resamples=100,
+        n_jobs=1,
+        decision_threshold=calibrated.decision_threshold,
+    )
+    assert ci["limiar_decisao"] == 0.3
+    assert ci["metricas"]["recall_risco"]["estimativa"] == 1.0
+
+
+def test_threshold_sweep_matches_sklearn_curve():
+    """
+    Testa a varredura de limiares por ordenação + somas acumuladas.
+    Objetivo: Recall/precisão por limiar devem coincidir com precision_recall_curve
+    e as recomendações devem respeitar as metas e a ordem das faixas.
+    """
+    from sklearn.metrics import precision_recall_curve
+
+    rng = np.random.default_rng(3)
+    y_true = rng.integers(0, 2, 400)
+    # Probabilidades arredondadas geram empates entre alunos
+    proba = np.round(np.clip(0.35 * y_true + rng.uniform(0, 0.65, 400), 0, 1), 2)
+
+    sweep = sweep_thresholds(y_true, proba)
+    precision, recall, thresholds = precision_recall_curve(y_true, proba)
+    np.testing.assert_allclose(sweep["limiar"][::-1], thresholds)
+    np.testing.assert_allclose(sweep["precisao"][::-1], precision[:-1])
+    np.testing.assert_allclose(sweep["recall"][::-1], recall[:-1])
+
+    recommended = recommend_thresholds(sweep, recall_target=0.9)
+    decision = np.flatnonzero(sweep["limiar"] == recommended["decisao"])[0]
+    assert sweep["recall"][decision] >= 0.9
+    assert sweep["recall"][decision - 1] < 0.9
+    cuts = [recommended[name] for name in BAND_NAMES[1:]]
+    assert cuts == sorted(cuts)
+
+
+def test_benchmark_regression_gate():
+    """
+    Testa o gate de regressão dos benchmarks.
+    Objetivo: Casos acima da tolerância sobre o melhor tempo da linha de base
+    são sinalizados; casos ausentes da base são ignorados.
+    """
+    baseline = {"casos": {"rapido": {"min_ms": 1.0}, "lento": {"min_ms": 2.0}}}
+    results = {
+        "casos": {
+            "rapido": {"min_ms": 1.2},
+            "lento": {"min_ms": 3.1},
+            "novo": {"min_ms": 5.0},
+        }
+    }
+    comparison = compare_to_baseline(results, baseline, tolerance=0.5)
+    assert [c["caso"] for c in comparison] == ["rapido", "lento"]
+    assert [c["regressao"] for c in comparison] == [False, True]
+    assert comparison[1]["razao"] == 1.55
+
+
+def test_load_test_traffic_and_summary():
+    """
+    Testa o tráfego gerado do CSV bruto e o resumo do teste de carga.
+    Objetivo: Payloads válidos para o AlunoInput; percentis, vazão e taxa de
+    erro (status >= 400 ou falha de conexão) calculados corretamente.
+    """
+    from pathlib import Path
+    from app.schemas import AlunoInput
+
+    csv_path = Path(__file__).resolve().parents[1] / "data/raw/dataset_pede_passos.csv"
+    payloads = payloads_from_dataset(csv_path)
+    assert len(payloads) > 800
+    assert all(AlunoInput(**payload) for payload in payloads[:50])
+    assert payloads[0]["ra"] == "RA-1"
+
+    run = {
+        "latencias": np.arange(1, 101) / 1000,
+        "status": [200] * 97 + [422, 500, "ConnectError"],
+        "tempo_segundos": 2.0,
+    }
+    summary = summarize_run(run, batch_size=10)
+    assert summary["vazao_rps"] == 50.0
+    assert summary["alunos_por_segundo"] == 500.0
+    assert summary["latencia_ms"]["max"] == 100.0
+    assert summary["latencia_ms"]["p50"] == 50.5
+    assert summary["taxa_erro"] == 0.03
+    assert summary["status"]["200"] == 97
+
+
+def test_synthetic_data_matches_source(tmp_path):
+    """
+    Testa o gerador de dados sintéticos do PEDE.
+    Objetivo: Mesmo formato bruto (cabeçalhos, decimais PT-BR, grafias aceitas
+    pelos transformers), marginais e correlações próximas das reais e arquivo
+    reprodutível pela semente, independente do número de processos.
+    """
+    from pathlib import Path
+    from src.preprocessing import load_dataset
+
+    source_path = (
+        Path(__file__).resolve().parents[1] / "data/raw/dataset_pede_passos.csv"
+    )
+    source = pd.read_csv(source_path, dtype=str)
+    profile = fit_synthetic_profile(source)
+
+    paths = [tmp_path / "serial.csv", tmp_path / "paralelo.csv"]
+    for path, n_jobs in zip(paths, [1, 2]):
+        write_synthetic_csv(
+            profile, path, 20_000, chunksize=6_000, n_jobs=n_jobs, variant_rate=0.05
+        )
+    assert paths[0].read_bytes() == paths[1].read_bytes()
+
+    raw = pd.read_csv(paths[0], dtype=str)
+    assert list(raw.columns) == list(source.columns)
+    assert raw["RA"].is_unique and raw["RA"].iloc[-1] == "RA-20000"
+    assert raw["IPV"].dropna().str.fullmatch(r"\d+,\d{3}").all()
+
+    real, synthetic = load_dataset(source_path), load_dataset(paths[0])
+    assert abs(synthetic["ieg"].mean() - real["ieg"].mean()) < 0.1
+    assert abs(synthetic["ingles"].isna().mean() - real["ingles"].isna().mean()) < 0.02
+    assert (
+        abs(
+            synthetic["ida"].corr(synthetic["ingles"])
+            - real["ida"].corr(real["ingles"])
+        )
+        < 0.2
+    )
+    # Variantes de grafia continuam reconhecidas pelo PedraMapper
+    assert (PedraMapper().transform(synthetic)["pedra_22"] > 0).all()
+
+
+def test_bulk_validation_matches_pydantic():
+    """
+    Testa a validação vetorizada derivada do AlunoInput.
+    Objetivo: A máscara de erros deve aceitar e rejeitar exatamente as mesmas
+    linhas que a validação Pydantic por objeto, apontando o campo violado; na
+    ingestão (required=False), nulos, colunas ausentes e as grafias aceitas
+    pelo pipeline ('agata', 'S', 'nao') são tolerados.
+    """
+    from pydantic import ValidationError
+
+    from app.schemas import ALUNO_RULES, AlunoInput
+    from benchmarks.cases import SAMPLE_PAYLOAD
+
+    variations = [
+        {},
+        {"pedra_20": None, "ingles": None},
+        {"iaa": 10.5},
+        {"matem": -0.1},
+        {"genero": "Feminino"},
+        {"pedra_21": "Diamante"},
+        {"indicado": "sim"},
+        {"ieg": "abc"},
+        {"portug": "7.5"},
+        {"fase": 2.5},
+        {"fase": 3.0},
+        {"ips": None},
+        {"iaa": 11.0, "ponto_virada": "Talvez"},
+    ]
+    rows = [{**SAMPLE_PAYLOAD, **change} for change in variations]
+    frame = pd.DataFrame(rows)
+
+    expected = []
+    for row in rows:
+        try:
+            AlunoInput(**row)
+            expected.append(True)
+        except ValidationError:
+            expected.append(False)
+
+    mask = validate_frame(frame, ALUNO_RULES)
+    assert mask.dtype == np.uint64
+    assert list(mask == 0) == expected
+    assert row_errors(mask[2], ALUNO_RULES) == ["iaa"]
+    assert row_errors(mask[12], ALUNO_RULES) == ["iaa", "ponto_virada"]
+    assert error_counts(mask, ALUNO_RULES)["iaa"] == 2
+
+    # Ingestão de dados brutos: nulo obrigatório e coluna ausente seguem para a
+    # imputação; apenas faixas e valores desconhecidos são descartados
+    raw = frame.drop(columns=["ipp"])
+    valid, counts = drop_invalid_rows(raw, ALUNO_RULES)
+    # (+2: nulo obrigatório em 'ips' e grafia 'sim', normalizada pelo pipeline)
+    assert len(valid) == len(raw) - (~np.array(expected)).sum() + 2
+    assert "ipp" not in counts and "ips" not in counts and "indicado" not in counts
+
+    # Variações de grafia normalizadas por PedraMapper/BinaryCleaner: aceitas na
+    # ingestão (ranking), rejeitadas no contrato estrito da API
+    from sklearn.dummy import DummyClassifier
+
+    from src.ranking import rank_roster
+
+    spellings = [
+        {"pedra_20": "agata", "pedra_21": "AMETISTA", "indicado": "S"},
+        {"pedra_20": "TOPAZIO", "atingiu_pv": "n", "ponto_virada": "nao"},
+        {"pedra_21": "ágata", "indicado_bolsa": "sim", "indicado": "NÃO"},
+    ]
+    variants = pd.DataFrame([{**SAMPLE_PAYLOAD, **change} for change in spellings])
+    assert (validate_frame(variants, ALUNO_RULES) != 0).all()
+    assert (validate_frame(variants, ALUNO_RULES, required=False) == 0).all()
+    model = DummyClassifier().fit(variants, [0, 1, 1])
+    ranking = rank_roster(model, [variants], k=5, rules=ALUNO_RULES)
+    assert ranking["alunos_invalidos"] == 0
+    assert ranking["total_alunos"] == 3
+
+
+def test_whatif_sweep_size_matches_grid():
+    """
+    Testa a contagem de cenários sem materializar a grade.
+    Objetivo: sweep_size deve coincidir com o tamanho de expand_sweep para
+    intervalos, passos que não dividem o intervalo, valores e Pedras.
+    """
+    cases = [
+        ("ieg", None, 0.0, 10.0, 1.0),
+        ("ieg", None, 0.0, 10.0, 0.3),
+        ("ieg", None, 2.5, 2.5, 0.5),
+        ("ida", None, 7.0, 1.0, 0.7),
+        ("matem", None, 0.0, 10.0, 0.01),
+        ("ieg", [5, 7.5, 5, 10], 0.0, 10.0, 1.0),
+        ("pedra_20", None, 0.0, 10.0, 1.0),
+    ]
+    for case in cases:
+        assert sweep_size(*case) == len(expand_sweep(*case)), case
+
+
+def test_score_store_band_filter_by_probability(tmp_path):
+    """
+    Testa o filtro por faixa do score store.
+    Objetivo: A faixa vira um intervalo de probabilidade indexado que seleciona
+    os mesmos alunos de assign_bands (inclusive nos limiares); bases antigas com
+    a coluna 'faixa' gravada são migradas.
+    """
+    import sqlite3
+
+    from src.score_store import ScoreStore
+
+    path = tmp_path / "scores.db"
+    with sqlite3.connect(path) as conn:
+        conn.execute(
+            "CREATE TABLE scores (ra TEXT PRIMARY KEY, turma TEXT, fase INTEGER, "
+            "fingerprint TEXT NOT NULL, versao_modelo TEXT NOT NULL, "
+            "probabilidade REAL NOT NULL, faixa TEXT NOT NULL, "
+            "atualizado_em TEXT NOT NULL)"
+        )
+        conn.execute("CREATE INDEX idx_faixa ON scores (faixa)")
+    store = ScoreStore(path)
+
+    thresholds = {"atencao": 0.3, "alerta": 0.5, "critico": 0.5}
+    proba = [0.0, 0.29, 0.3, 0.49, 0.5, 0.7, 1.0]
+    store.upsert(
+        [
+            {
+                "ra": f"RA-{i}",
+                "turma": "A",
+                "fase": 1,
+                "fingerprint": "f",
+                "versao_modelo": "v",
+                "probabilidade": p,
+                "atualizado_em": "2026-01-01",
+            }
+            for i, p in enumerate(proba)
+        ]
+    )
+    expected = assign_bands(proba, thresholds)
+    for band, name in enumerate(BAND_NAMES):
+        rows = store.query(faixa=name, thresholds=thresholds)
+        assert sorted(r["probabilidade"] for r in rows) == [
+            p for p, b in zip(proba, expected) if b == band
+        ]
+        assert all(r["faixa"] == name for r in rows)
+
+    with sqlite3.connect(path) as conn:
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(scores)")}
+        plan = conn.execute(
+            "EXPLAIN QUERY PLAN SELECT * FROM scores WHERE probabilidade >= 0.3"
+        ).fetchall()
+    assert "faixa" not in columns
+    assert any("idx_probabilidade" in str(step) for step in plan)
+
+
+def test_fingerprints_match_across_json_and_csv():
+    """
+    Testa o fingerprint das entradas do score store.
+    Objetivo: O mesmo aluno, com campos nulos, deve ter o mesmo fingerprint
+    vindo de JSON (None) ou de CSV (NaN), isolado ou junto de outros alunos, e
+    com a coluna ausente; uma alteração real muda o fingerprint.
+    """
+    import io
+    import json
+
+    from benchmarks.cases import SAMPLE_PAYLOAD
+    from src.score_store import input_fingerprints
+
+    numeric = ["iaa", "ieg", "ingles", "n_av"]
+    columns = numeric + ["genero", "pedra_21", "indicado"]
+    aluno = {**SAMPLE_PAYLOAD, "n_av": 0, "ingles": None, "pedra_21": None}
+    outro = {**aluno, "ingles": 7.5, "pedra_21": "Ágata"}
+
+    def from_json(records):
+        return pd.DataFrame(json.loads(json.dumps(records)))
+
+    def from_csv(records):
+        return pd.read_csv(io.StringIO(pd.DataFrame(records).to_csv(index=False)))
+
+    reference = input_fingerprints(from_json([aluno]), columns, numeric)[0]
+    assert input_fingerprints(from_csv([aluno]), columns, numeric)[0] == reference
+    for frame in (from_json([outro, aluno]), from_csv([outro, aluno])):
+        assert input_fingerprints(frame, columns, numeric)[1] == reference
+    missing = from_json([aluno]).drop(columns=["ingles", "pedra_21"])
+    assert input_fingerprints(missing, columns, numeric)[0] == reference
+    changed = from_json([{**aluno, "ieg": 1.0}])
+    assert input_fingerprints(changed, columns, numeric)[0] != reference
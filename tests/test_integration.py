@@ -1,3 +1,4 @@
+import joblib
 import pandas as pd
 import pytest
 from pathlib import Path
@@ -6,6 +7,8 @@ from pathlib import Path
 import src.preprocessing
 import src.train
 import src.evaluate
+import src.model_zoo
+import src.incremental
 
 
 @pytest.fixture
@@ -36,6 +39,31 @@ def mock_project_root(tmp_path, monkeypatch):
     return d
 
 
+def _prepare_processed_data(root: Path, n: int = 30):
+    """Gera um CSV bruto sintético e executa o preprocessing (split) sobre ele."""
+    raw_file = root / "data" / "raw" / "dataset_pede_passos.csv"
+    pd.DataFrame(
+        {
+            "RA": [f"RA-{i}" for i in range(n)],
+            "Gênero": ["Menina", "Menino"] * (n // 2),
+            "Instituição de ensino": ["Publica", "Privada", "Publica"] * (n // 3),
+            "Pedra 20": ["Ametista", "Quartzo", "Ágata"] * (n // 3),
+            "Pedra 21": ["Topázio", "Quartzo"] * (n // 2),
+            "Indicado": ["Sim", "Não", "Não"] * (n // 3),
+            "Atingiu PV": ["Sim", "Não"] * (n // 2),
+            "IAA": [float(i % 10) for i in range(n)],
+            "IEG": [float((i * 3) % 10) for i in range(n)],
+            "IDA": [float((i * 7) % 10) for i in range(n)],
+            "Matemática": [f"{i % 10},5" for i in range(n)],
+            "Defas": [-1, 0, 0] * (n // 3),
+        }
+    ).to_csv(raw_file, index=False)
+
+    df = src.preprocessing.load_dataset(raw_file)
+    df = src.preprocessing.create_target(df)
+    src.preprocessing.save_split_data(df, root / "data")
+
+
 def test_full_pipeline_execution(mock_project_root):
     """
     Teste de Integração End-to-End (Smoke Test).
@@ -106,6 +134,8 @@ def test_full_pipeline_execution(mock_project_root):
     # Verifica se o modelo foi salvo
     model_path = root / "app" / "model" / "pipeline.joblib"
     assert model_path.exists()
+    # Distribuições de referência para monitoramento de drift
+    assert (root / "app" / "model" / "reference_profile.json").exists()
 
     # 4. EXECUÇÃO DA AVALIAÇÃO
     try:
@@ -113,3 +143,120 @@ def test_full_pipeline_execution(mock_project_root):
         src.evaluate.evaluate_model()
     except Exception as e:
         pytest.fail(f"Falha no Evaluate: {e}")
+
+
+def test_hyperparameter_tuning(mock_project_root):
+    """
+    Teste de Integração do modo de tuning (GridSearchCV com cache de pré-processamento).
+
+    Critério de Sucesso:
+    A busca deve reportar o tempo de parede de cada configuração e salvar
+    o melhor pipeline sem referência ao diretório de cache temporário.
+    """
+    _prepare_processed_data(mock_project_root)
+
+    results = src.train.run_tuning(n_jobs=1, cv_folds=2)
+
+    assert len(results) > 0
+    assert {"recall_medio", "precisao_media", "tempo_total_s"} <= set(results.columns)
+    assert (results["tempo_total_s"] > 0).all()
+
+    model = joblib.load(mock_project_root / "app" / "model" / "pipeline.joblib")
+    assert model.memory is None
+    # Perfil de drift regenerado junto com o artefato otimizado
+    assert (mock_project_root / "app" / "model" / "reference_profile.json").exists()
+
+
+def test_tuning_keeps_linear_serving_artifact(mock_project_root, monkeypatch):
+    """
+    Teste de Integração do tuning com estimadores alternativos.
+
+    Critério de Sucesso:
+    Se a melhor configuração não for linear, ela é salva como challenger e o
+    artefato de produção continua sendo a melhor Regressão Logística.
+    """
+    from sklearn.dummy import DummyClassifier
+    from sklearn.linear_model import LogisticRegression
+
+    _prepare_processed_data(mock_project_root)
+    # Classe constante 1: recall máximo (vence empates por vir primeiro na grade)
+    monkeypatch.setattr(
+        src.train,
+        "get_param_grid",
+        lambda include_alternatives=False: [
+            {"classifier": [DummyClassifier(strategy="constant", constant=1)]},
+            {"classifier__C": [1.0]},
+        ],
+    )
+
+    src.train.run_tuning(n_jobs=1, cv_folds=2, include_alternatives=True)
+
+    model_dir = mock_project_root / "app" / "model"
+    served = joblib.load(model_dir / "pipeline.joblib")
+    assert isinstance(served.named_steps["classifier"], LogisticRegression)
+    assert served.memory is None
+    challenger = joblib.load(model_dir / src.train.TUNED_CHALLENGER_NAME)
+    assert isinstance(challenger.named_steps["classifier"], DummyClassifier)
+    assert (model_dir / "reference_profile.json").exists()
+
+
+def test_incremental_parity_uses_all_seen_batches(mock_project_root, monkeypatch):
+    """
+    Teste de Integração do retreino incremental.
+
+    Critério de Sucesso:
+    O refit de paridade usa X_train mais TODOS os lotes já incorporados ao
+    modelo incremental; reinicializar o modelo descarta o histórico de lotes.
+    """
+    import shutil
+
+    monkeypatch.setattr(src.incremental, "get_project_root", lambda: mock_project_root)
+    _prepare_processed_data(mock_project_root)
+    batch = mock_project_root / "data" / "raw" / "novo_ciclo.csv"
+    shutil.copy(mock_project_root / "data" / "raw" / "dataset_pede_passos.csv", batch)
+    processed = mock_project_root / "data" / "processed"
+    n_train = len(pd.read_csv(processed / "X_train.csv"))
+
+    refit_sizes = []
+    create_pipeline = src.incremental.create_pipeline
+
+    def spy(X):
+        refit_sizes.append(len(X))
+        return create_pipeline(X)
+
+    monkeypatch.setattr(src.incremental, "create_pipeline", spy)
+
+    for _ in range(2):
+        results = src.incremental.run_incremental_training(batch_path=batch, n_epochs=2)
+        assert set(results) == {"incremental", "refit_completo"}
+    assert refit_sizes == [n_train + 30, n_train + 60]
+    assert len(pd.read_csv(processed / src.incremental.SEEN_BATCHES_NAME)) == 60
+
+    src.incremental.run_incremental_training(n_epochs=2)
+    assert refit_sizes[-1] == n_train
+    assert not (processed / src.incremental.SEEN_BATCHES_NAME).exists()
+
+
+def test_model_zoo_benchmark(mock_project_root, monkeypatch):
+    """
+    Teste de Integração do benchmark de modelos.
+
+    Critério de Sucesso:
+    O relatório JSON deve ser gerado com as métricas de custo e qualidade
+    de cada candidato avaliado.
+    """
+    monkeypatch.setattr(src.model_zoo, "get_project_root", lambda: mock_project_root)
+    _prepare_processed_data(mock_project_root)
+
+    report = src.model_zoo.run_benchmark(
+        models=["logistic_regression", "hist_gradient_boosting"], n_single=5
+    )
+
+    assert [m["modelo"] for m in report["modelos"]] == [
+        "logistic_regression",
+        "hist_gradient_boosting",
+    ]
+    for result in report["modelos"]:
+        assert result["latencia_unitaria_p99_ms"] >= result["latencia_unitaria_p50_ms"]
+        assert result["tamanho_artefato_kb"] > 0
+    assert (mock_project_root / "reports" / "model_zoo.json").exists()